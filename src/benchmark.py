@@ -0,0 +1,219 @@
+"""Benchmarks de escala de los caminos calientes de StadiumView.
+
+Corre sin pantalla (QT_QPA_PLATFORM=offscreen) sobre estadios sintéticos de
+1k a 100k asientos y mide, por operación y tamaño, la mediana del tiempo y
+el pico de memoria asignada desde Python (tracemalloc; incluye los arreglos
+de NumPy pero no la memoria interna de Qt). Las operaciones que cambian
+asientos incluyen su repintado: flush_repaints corre dentro de lo medido en
+lugar de esperar al temporizador del próximo cuadro:
+
+    draw_stadium_structure         escena completa desde cero
+    handle_updates sin cambios     snapshot idéntico al aplicado
+    handle_updates disperso        snapshot con ~1 % de asientos cambiados
+    handle_updates completo        snapshot con todos los asientos cambiados
+    find_seats_in_map              grupo de MAX_GROUP_SIZE asientos
+    highlight_seats                resaltar ese grupo como Sugerido
+    reset_suggested_seats          volver a Libre los sugeridos
+
+Con --baseline compara contra resultados guardados y termina con código 1
+si alguna operación empeora más que --tolerance; --save-baseline los guarda.
+
+Ejemplo:
+    python src/benchmark.py --sizes 1000,10000,100000 --baseline src/benchmark_baseline.json
+"""
+
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import copy
+import json
+import math
+import statistics
+import sys
+import time
+import tracemalloc
+
+from PyQt5.QtWidgets import QApplication
+
+from fake_server import encode_binary, generate_estadio
+from interface import SearchControls, StadiumView, decode_binary_message
+
+CAMBIO = {"Libre": "Comprado", "Comprado": "Libre", "Reservado": "Libre"}
+
+
+def venue_shape(seats):
+    """(zonas, categorías, filas, asientos por fila) para unos `seats` asientos"""
+    zones = 4 if seats <= 10_000 else 10
+    categories = 4
+    side = max(1, round(math.sqrt(seats / (zones * categories))))
+    return zones, categories, side, side
+
+
+def changed_estadio(estadio, fraction, seed):
+    """Copia del estadio con una fracción de los asientos en otro estado"""
+    estadio = copy.deepcopy(estadio)
+    step = max(1, round(1 / fraction))
+    index = seed
+    for zona in estadio["zonas"]:
+        for asientos in zona["categorias"].values():
+            for fila in asientos:
+                for asiento in fila:
+                    if index % step == 0:
+                        asiento["estado"] = CAMBIO.get(asiento["estado"], "Libre")
+                    index += 1
+    return estadio
+
+
+def as_received(estadio, formato, version):
+    """El snapshot tal como lo entrega WebSocketClient a la vista"""
+    if formato == "binario":
+        return decode_binary_message(encode_binary(estadio, version))
+    return dict(estadio, version=version)
+
+
+def measure(operation, repeat, setup=None):
+    """Mediana del tiempo en ms (repeat corridas) y pico de memoria en MiB
+    (una corrida aparte, porque tracemalloc hace más lento lo medido)"""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        operation()
+        times.append((time.perf_counter() - started) * 1000)
+    if setup:
+        setup()
+    tracemalloc.start()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak / (1024 * 1024)
+
+
+def repainted(view, operation):
+    """La operación seguida del repintado que programó"""
+    def run():
+        operation()
+        view.flush_repaints()
+    return run
+
+
+def bench_size(seats, args):
+    zones, categories, rows, per_row = venue_shape(seats)
+    estadio = generate_estadio(zones, categories, rows, per_row, occupancy=0.3, seed=args.seed)
+    actual = zones * categories * rows * per_row
+    zona = estadio["zonas"][0]["nombre"]
+    categoria = next(iter(estadio["zonas"][0]["categorias"]))
+    group = [
+        (fila, columna)
+        for fila in range(rows)
+        for columna in range(per_row)
+    ][:SearchControls.MAX_GROUP_SIZE]
+
+    base = as_received(estadio, args.formato, 1)
+    snapshots = {
+        "sin cambios": as_received(estadio, args.formato, 2),
+        "disperso": as_received(changed_estadio(estadio, 0.01, args.seed or 0), args.formato, 2),
+        "completo": as_received(changed_estadio(estadio, 1.0, 0), args.formato, 2),
+    }
+
+    view = StadiumView(render_mode=args.render_mode)
+    results = {}
+    results["draw_stadium_structure"] = measure(
+        repainted(view, lambda: view.draw_stadium_structure(base)), args.repeat
+    )
+    for name, snapshot in snapshots.items():
+        results[f"handle_updates {name}"] = measure(
+            repainted(view, lambda snapshot=snapshot: view.handle_updates(snapshot)),
+            args.repeat,
+            setup=repainted(view, lambda: view.handle_updates(base)),
+        )
+    repainted(view, lambda: view.handle_updates(base))()
+    results["find_seats_in_map"] = measure(lambda: view.find_seats_in_map(zona, categoria, group), args.repeat)
+    seats_found = view.find_seats_in_map(zona, categoria, group)
+    highlight = repainted(view, lambda: view.highlight_seats(seats_found))
+    reset = repainted(view, view.reset_suggested_seats)
+    results["highlight_seats"] = measure(highlight, args.repeat, setup=reset)
+    results["reset_suggested_seats"] = measure(reset, args.repeat, setup=highlight)
+    view.deleteLater()
+    return actual, results
+
+
+def compare(report, baseline, tolerance):
+    """Operaciones más lentas que la base en más de `tolerance` (fracción).
+    Las de menos de 1 ms se ignoran: a esa escala domina el ruido."""
+    regressions = []
+    for size, operations in report["results"].items():
+        for operation, result in operations.items():
+            previous = baseline.get("results", {}).get(size, {}).get(operation)
+            if previous is None or previous["ms"] < 1.0:
+                continue
+            if result["ms"] > previous["ms"] * (1 + tolerance):
+                regressions.append((size, operation, previous["ms"], result["ms"]))
+    return regressions
+
+
+def print_report(report, baseline=None):
+    print(f"{'asientos':>9}  {'operación':<28} {'ms':>10} {'MiB':>8} {'base ms':>10}")
+    for size, operations in report["results"].items():
+        for operation, result in operations.items():
+            previous = (baseline or {}).get("results", {}).get(size, {}).get(operation)
+            base = f"{previous['ms']:10.2f}" if previous else f"{'-':>10}"
+            print(f"{size:>9}  {operation:<28} {result['ms']:10.2f} {result['mib']:8.2f} {base}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,30000,100000", help="Asientos por estadio, separados por comas")
+    parser.add_argument("--repeat", type=int, default=5, help="Corridas por operación (se informa la mediana)")
+    parser.add_argument("--formato", choices=["binario", "json"], default="binario",
+                        help="Forma de los snapshots que recibe handle_updates")
+    parser.add_argument("--render-mode", choices=["auto", "items", "grid"], default="auto")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="Archivo JSON con resultados anteriores para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Empeoramiento admitido respecto de la base (0.5 = 50 %%)")
+    parser.add_argument("--save-baseline", help="Guardar los resultados como nueva base en este archivo")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    report = {
+        "formato": args.formato,
+        "render_mode": args.render_mode,
+        "repeat": args.repeat,
+        "results": {},
+    }
+    for seats in (int(size) for size in args.sizes.split(",")):
+        actual, results = bench_size(seats, args)
+        report["results"][str(actual)] = {
+            operation: {"ms": round(ms, 3), "mib": round(mib, 3)}
+            for operation, (ms, mib) in results.items()
+        }
+        app.processEvents()
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if baseline:
+        regressions = compare(report, baseline, args.tolerance)
+        for size, operation, before, after in regressions:
+            print(f"REGRESIÓN {size} asientos, {operation}: {before:.2f} ms -> {after:.2f} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
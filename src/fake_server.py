@@ -0,0 +1,644 @@
+"""Backend local de reemplazo para pruebas de escala del cliente.
+
+Sirve los mismos endpoints que usa interface.py (/get_stadium_structure,
+/buscar_asientos, /reservar_asientos_temporalmente, /reservar_grupos,
+/procesar_pago, /confirmar_compra, /cancelar_reserva y /ws) sobre un estadio
+sintético de tamaño configurable, para perfilar StadiumView y
+WebSocketClient sin el servidor en Rust.
+
+Ejemplo (≈100k asientos, 5 difusiones por segundo):
+    python src/fake_server.py --zones 10 --categories 4 --rows 50 --seats 50 \\
+        --occupancy 0.4 --broadcast-rate 5
+"""
+
+import argparse
+import heapq
+import json
+import random
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import wsutil
+
+CATEGORIAS = ["VIP", "Regular", "Sol", "Platea"]
+OCUPADOS = ["Reservado", "Comprado"]
+TIEMPO_RESERVA = 300  # Segundos que dura una reserva temporal
+# Códigos del formato binario: índice de SeatState en main.rs
+CODIGOS = {
+    estado: codigo
+    for codigo, estado in enumerate(
+        ["Libre", "Reservado", "ReservadoPorUsuario", "Comprado", "ReservadoTemporalmente"]
+    )
+}
+FORMATO_BINARIO = 3
+TIPO_SNAPSHOT, TIPO_DELTA, TIPO_PARCIAL = 0, 1, 2
+UMBRAL_COMPRESION = 512
+HISTORIAL_DELTAS = 1000  # Deltas guardados para reanudar conexiones
+MAX_GRUPOS_LOTE = 200
+
+
+def category_names(count):
+    return CATEGORIAS[:count] + [f"Categoria{i + 1}" for i in range(len(CATEGORIAS), count)]
+
+
+def zone_names(count):
+    names = []
+    for i in range(count):
+        name = ""
+        i += 1
+        while i:
+            i, rest = divmod(i - 1, 26)
+            name = chr(ord("A") + rest) + name
+        names.append(name)
+    return names
+
+
+def generate_estadio(zones=4, categories=4, rows=5, seats=5, occupancy=0.0, seed=None):
+    """Genera un estadio con la misma forma JSON que el servidor en Rust"""
+    rng = random.Random(seed)
+    return {
+        "zonas": [
+            {
+                "nombre": zona,
+                "categorias": {
+                    categoria: [
+                        [
+                            {"estado": rng.choice(OCUPADOS) if rng.random() < occupancy else "Libre"}
+                            for _ in range(seats)
+                        ]
+                        for _ in range(rows)
+                    ]
+                    for categoria in category_names(categories)
+                },
+            }
+            for zona in zone_names(zones)
+        ]
+    }
+
+
+def append_name(buffer, nombre):
+    data = nombre.encode()[:255]
+    buffer.append(len(data))
+    buffer += data
+
+
+def pack_binary(tipo, version, body):
+    """Mismo encabezado que empaquetar_binario en main.rs"""
+    flags = 0
+    if len(body) >= UMBRAL_COMPRESION:
+        body = zlib.compress(body, 1)
+        flags |= 0x01
+    return b"ES" + struct.pack("<BBBQ", FORMATO_BINARIO, flags, tipo, version) + bytes(body)
+
+
+def encode_binary(estadio, version=0, bloques=None):
+    """Mismo formato que Estadio::codificar_binario en main.rs; con bloques,
+    el snapshot parcial de solo esos (zona, categoría)"""
+    zonas = []
+    for zona in estadio["zonas"]:
+        categorias = [
+            (categoria, asientos)
+            for categoria, asientos in zona["categorias"].items()
+            if bloques is None or (zona["nombre"], categoria) in bloques
+        ]
+        if categorias:
+            zonas.append((zona["nombre"], categorias))
+    body = bytearray(struct.pack("<H", len(zonas)))
+    for nombre, categorias in zonas:
+        append_name(body, nombre)
+        body.append(len(categorias))
+        for categoria, asientos in categorias:
+            append_name(body, categoria)
+            columnas = max((len(fila) for fila in asientos), default=0)
+            body += struct.pack("<HH", len(asientos), columnas)
+            for fila in asientos:
+                body += bytes(CODIGOS[asiento["estado"]] for asiento in fila)
+                body += b"\xff" * (columnas - len(fila))
+    return pack_binary(TIPO_SNAPSHOT if bloques is None else TIPO_PARCIAL, version, body)
+
+
+def encode_binary_delta(desde, version, cambios):
+    """Mismo formato que codificar_delta_binario en main.rs"""
+    body = bytearray(struct.pack("<QI", desde, len(cambios)))
+    for cambio in cambios:
+        append_name(body, cambio["zona"])
+        append_name(body, cambio["categoria"])
+        body += struct.pack("<HHB", cambio["fila"], cambio["asiento"], CODIGOS[cambio["estado"]])
+    return pack_binary(TIPO_DELTA, version, body)
+
+
+class FakeStadium:
+    """Estado del estadio sintético, sus reservas y los clientes WebSocket"""
+
+    def __init__(self, estadio, approval_rate=0.8, seed=None):
+        self.estadio = estadio
+        self.approval_rate = approval_rate
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.reservas = {}  # reserva_id -> (expiración, [(zona, categoria, fila, asiento)])
+        # Montículo (expiración, reserva_id); las reservas ya terminadas se descartan al salir
+        self.vencimientos = []
+        self.clients = {}  # socket -> lock de escritura
+        self.binary_clients = set()  # Sockets que pidieron ?formato=binario
+        # Como WsSession en main.rs: versión del último mensaje enviado a cada
+        # socket y bloques (zona, categoría) suscritos; sin entrada = todos
+        self.client_versions = {}
+        self.subscriptions = {}
+        self.clients_lock = threading.Lock()
+        self.broadcasts = 0
+        # Como en main.rs, parte de los microsegundos actuales para que las
+        # versiones de un arranque nuevo no se confundan con las del anterior
+        self.version = int(time.time() * 1_000_000)
+        self.history = deque(maxlen=HISTORIAL_DELTAS)  # (versión, cambios)
+
+    def zone(self, nombre):
+        return next((zona for zona in self.estadio["zonas"] if zona["nombre"] == nombre), None)
+
+    def seat(self, zona, categoria, fila, asiento):
+        return self.zone(zona)["categorias"][categoria][fila][asiento]
+
+    def set_state(self, cambios, zona, categoria, fila, asiento, estado):
+        """Cambia un asiento (con el lock tomado) y registra el cambio"""
+        self.seat(zona, categoria, fila, asiento)["estado"] = estado
+        cambios.append(
+            {"zona": zona, "categoria": categoria, "fila": fila, "asiento": asiento, "estado": estado}
+        )
+
+    @staticmethod
+    def occupancy(zona):
+        total = ocupados = 0
+        for asientos in zona["categorias"].values():
+            for fila in asientos:
+                total += len(fila)
+                ocupados += sum(1 for asiento in fila if asiento["estado"] != "Libre")
+        return ocupados / total if total else 1.0
+
+    def snapshot(self):
+        with self.lock:
+            return json.dumps({"version": self.version, "zonas": self.estadio["zonas"]})
+
+    def binary_snapshot(self):
+        with self.lock:
+            return encode_binary(self.estadio, self.version)
+
+    def partial_snapshot(self, bloques):
+        with self.lock:
+            zonas = []
+            for zona in self.estadio["zonas"]:
+                categorias = {
+                    categoria: asientos
+                    for categoria, asientos in zona["categorias"].items()
+                    if (zona["nombre"], categoria) in bloques
+                }
+                if categorias:
+                    zonas.append({"nombre": zona["nombre"], "categorias": categorias})
+            return json.dumps({"version": self.version, "parcial": True, "zonas": zonas})
+
+    def publish(self, cambios):
+        """Avanza la versión (con el lock tomado); devuelve el delta a difundir"""
+        if not cambios:
+            return None
+        self.version += 1
+        self.history.append((self.version, cambios))
+        return self.version, cambios
+
+    def deltas_since(self, desde):
+        """Deltas posteriores a desde, o None si el historial ya no los cubre"""
+        with self.lock:
+            if desde > self.version:
+                return None
+            if desde < self.version and (not self.history or self.history[0][0] > desde + 1):
+                return None
+            return [delta for delta in self.history if delta[0] > desde]
+
+    def buscar_asientos(self, categoria, cantidad, zona_nombre=None):
+        """Misma búsqueda que Estadio::buscar_asientos_consecutivos"""
+        with self.lock:
+            zonas = sorted(self.estadio["zonas"], key=self.occupancy)
+            for zona in zonas:
+                if zona_nombre is not None and zona["nombre"] != zona_nombre:
+                    continue
+                asientos = zona["categorias"].get(categoria)
+                if asientos is None:
+                    continue
+                for fila_idx, fila in enumerate(asientos):
+                    consecutivos = []
+                    for asiento_idx, asiento in enumerate(fila):
+                        if asiento["estado"] == "Libre":
+                            consecutivos.append((fila_idx, asiento_idx))
+                            if len(consecutivos) == cantidad:
+                                return {"zona": zona["nombre"], "categoria": categoria, "asientos": consecutivos}
+                        else:
+                            consecutivos = []
+        return None
+
+    def reservar(self, zona_nombre, categoria, asientos):
+        with self.lock:
+            zona = self.zone(zona_nombre)
+            if zona is None or categoria not in zona["categorias"]:
+                return None, "Categoría inválida."
+            matriz = zona["categorias"][categoria]
+            for fila, asiento in asientos:
+                if not (fila < len(matriz) and asiento < len(matriz[fila])):
+                    return None, "Asiento fuera de rango."
+                if matriz[fila][asiento]["estado"] != "Libre":
+                    return None, "Uno o más asientos no están disponibles."
+            cambios = []
+            for fila, asiento in asientos:
+                self.set_state(cambios, zona_nombre, categoria, fila, asiento, "ReservadoTemporalmente")
+            reserva_id = str(uuid.uuid4())
+            self.agregar_reserva(reserva_id, [(zona_nombre, categoria, fila, asiento) for fila, asiento in asientos])
+            # Difundir con el lock tomado para que los deltas salgan en orden
+            self.broadcast(self.publish(cambios))
+        return reserva_id, None
+
+    def reservar_grupos(self, grupos, parcial=False):
+        """Como reservar_grupos en main.rs: busca y reserva todos los grupos con
+        el lock tomado, en una sola reserva y una sola difusión"""
+        with self.lock:
+            cambios = []
+            resultados = []
+            for grupo in grupos:
+                encontrado = None
+                if not any(grupo["categoria"] in zona["categorias"] for zona in self.estadio["zonas"]):
+                    error = "Categoría inválida."
+                else:
+                    error = "No hay asientos consecutivos disponibles."
+                    if grupo["cantidad"] > 0:
+                        encontrado = self.buscar_asientos(grupo["categoria"], grupo["cantidad"], grupo.get("zona"))
+                if encontrado:
+                    for fila, asiento in encontrado["asientos"]:
+                        self.set_state(cambios, encontrado["zona"], grupo["categoria"], fila, asiento,
+                                       "ReservadoTemporalmente")
+                    resultados.append(dict(encontrado, ok=True))
+                else:
+                    resultados.append({"ok": False, "error": error})
+
+            if not cambios or (not parcial and not all(resultado["ok"] for resultado in resultados)):
+                for cambio in cambios:
+                    self.seat(cambio["zona"], cambio["categoria"], cambio["fila"], cambio["asiento"])["estado"] = "Libre"
+                resultados = [
+                    resultado if not resultado["ok"]
+                    else {"ok": False, "error": "No se reservó: otro grupo del lote no tiene lugar."}
+                    for resultado in resultados
+                ]
+                return {"reserva_id": None, "grupos": resultados}
+
+            reserva_id = str(uuid.uuid4())
+            self.agregar_reserva(
+                reserva_id,
+                [(cambio["zona"], cambio["categoria"], cambio["fila"], cambio["asiento"]) for cambio in cambios],
+            )
+            self.broadcast(self.publish(cambios))
+        return {"reserva_id": reserva_id, "grupos": resultados, "expira_en_s": self.expira_en_s(reserva_id)}
+
+    def agregar_reserva(self, reserva_id, asientos):
+        """Registra la reserva y su vencimiento (con el lock tomado)"""
+        expira = time.monotonic() + TIEMPO_RESERVA
+        self.reservas[reserva_id] = (expira, asientos)
+        heapq.heappush(self.vencimientos, (expira, reserva_id))
+
+    def expira_en_s(self, reserva_id):
+        """Segundos que le quedan a la reserva, como expira_en_s en main.rs"""
+        reserva = self.reservas.get(reserva_id)
+        return round(max(0.0, reserva[0] - time.monotonic()), 3) if reserva else 0.0
+
+    def finish_reserva(self, reserva_id, new_state):
+        with self.lock:
+            reserva = self.reservas.pop(reserva_id, None)
+            if reserva is None:
+                return False
+            cambios = []
+            for zona, categoria, fila, asiento in reserva[1]:
+                if self.seat(zona, categoria, fila, asiento)["estado"] == "ReservadoTemporalmente":
+                    self.set_state(cambios, zona, categoria, fila, asiento, new_state)
+            # Difundir con el lock tomado para que los deltas salgan en orden
+            self.broadcast(self.publish(cambios))
+        return True
+
+    def expire_reservas(self):
+        """Como iniciar_expiraciones en main.rs: libera todas las reservas
+        vencidas en un solo lote y una sola difusión"""
+        now = time.monotonic()
+        with self.lock:
+            cambios = []
+            while self.vencimientos and self.vencimientos[0][0] <= now:
+                expira, reserva_id = heapq.heappop(self.vencimientos)
+                reserva = self.reservas.get(reserva_id)
+                # Confirmada o cancelada antes de vencer
+                if reserva is None or reserva[0] != expira:
+                    continue
+                del self.reservas[reserva_id]
+                for zona, categoria, fila, asiento in reserva[1]:
+                    if self.seat(zona, categoria, fila, asiento)["estado"] == "ReservadoTemporalmente":
+                        self.set_state(cambios, zona, categoria, fila, asiento, "Libre")
+            self.broadcast(self.publish(cambios))
+
+    def churn(self, changes):
+        """Cambia asientos al azar para simular ventas de otras taquillas"""
+        with self.lock:
+            cambios = []
+            for _ in range(changes):
+                zona = self.random.choice(self.estadio["zonas"])
+                categoria = self.random.choice(list(zona["categorias"]))
+                matriz = zona["categorias"][categoria]
+                fila = self.random.randrange(len(matriz))
+                asiento = self.random.randrange(len(matriz[fila]))
+                estado = matriz[fila][asiento]["estado"]
+                if estado == "Libre":
+                    self.set_state(cambios, zona["nombre"], categoria, fila, asiento, "Comprado")
+                elif estado != "ReservadoTemporalmente":
+                    self.set_state(cambios, zona["nombre"], categoria, fila, asiento, "Libre")
+            # Difundir con el lock tomado para que los deltas salgan en orden
+            self.broadcast(self.publish(cambios))
+
+    def add_client(self, sock, binary=False):
+        with self.clients_lock:
+            self.clients[sock] = threading.Lock()
+            if binary:
+                self.binary_clients.add(sock)
+
+    def remove_client(self, sock):
+        with self.clients_lock:
+            self.clients.pop(sock, None)
+            self.binary_clients.discard(sock)
+            self.client_versions.pop(sock, None)
+            self.subscriptions.pop(sock, None)
+
+    def send(self, sock, opcode, payload):
+        with self.clients_lock:
+            write_lock = self.clients.get(sock)
+        if write_lock is None:
+            return
+        try:
+            with write_lock:
+                wsutil.write_frame(sock, opcode, payload)
+        except OSError:
+            self.remove_client(sock)
+
+    def send_initial(self, sock, desde=None):
+        """Al conectarse: solo los deltas que le faltan al cliente si el
+        historial los cubre, o el snapshot completo"""
+        deltas = self.deltas_since(desde) if desde is not None else None
+        if deltas is None:
+            self.send_snapshot(sock)
+            return
+        with self.clients_lock:
+            binary = sock in self.binary_clients
+            self.client_versions[sock] = desde
+        for version, cambios in deltas:
+            self.send_delta(sock, version, cambios, binary)
+
+    @staticmethod
+    def encode_delta(desde, version, cambios, binary):
+        if binary:
+            return wsutil.OP_BINARY, encode_binary_delta(desde, version, cambios)
+        return wsutil.OP_TEXT, json.dumps({"desde": desde, "version": version, "cambios": cambios}).encode()
+
+    def send_delta(self, sock, version, cambios, binary, payload=None):
+        """Envía un delta que parte de la última versión enviada al socket"""
+        with self.clients_lock:
+            desde = self.client_versions.get(sock, version - 1)
+            self.client_versions[sock] = version
+        self.send(sock, *(payload or self.encode_delta(desde, version, cambios, binary)))
+
+    def send_snapshot(self, sock):
+        """Estado completo con su versión, al conectarse o si el cliente lo pide"""
+        with self.lock:
+            with self.clients_lock:
+                binary = sock in self.binary_clients
+                self.client_versions[sock] = self.version
+            if binary:
+                self.send(sock, wsutil.OP_BINARY, self.binary_snapshot())
+            else:
+                self.send(sock, wsutil.OP_TEXT, self.snapshot().encode())
+
+    def subscribe(self, sock, bloques):
+        """Cambia los bloques que recibe el socket (None = todos). Los que
+        recién entran llegan con un snapshot parcial, sin mover su versión."""
+        with self.lock:
+            with self.clients_lock:
+                binary = sock in self.binary_clients
+                anterior = self.subscriptions.pop(sock, None)
+                if bloques is not None:
+                    self.subscriptions[sock] = bloques
+            if anterior is None:
+                return  # Ya recibía todos los bloques
+            if bloques is None:
+                self.send_snapshot(sock)
+                return
+            nuevos = bloques - anterior
+            if not nuevos:
+                return
+            if binary:
+                self.send(sock, wsutil.OP_BINARY, encode_binary(self.estadio, self.version, nuevos))
+            else:
+                self.send(sock, wsutil.OP_TEXT, self.partial_snapshot(nuevos).encode())
+
+    def broadcast(self, delta):
+        """Difunde un delta (version, cambios) a cada cliente según su suscripción"""
+        if delta is None:
+            return
+        version, cambios = delta
+        self.broadcasts += 1
+        with self.clients_lock:
+            sockets = [
+                (sock, sock in self.binary_clients, self.client_versions.get(sock), self.subscriptions.get(sock))
+                for sock in self.clients
+            ]
+        payloads = {}  # Cada formato se codifica una sola vez para los clientes al día
+        for sock, binary, desde, bloques in sockets:
+            if desde is not None and version <= desde:
+                continue
+            if bloques is None and desde in (None, version - 1):
+                if binary not in payloads:
+                    payloads[binary] = self.encode_delta(version - 1, version, cambios, binary)
+                self.send_delta(sock, version, cambios, binary, payloads[binary])
+                continue
+            visibles = cambios if bloques is None else [
+                cambio for cambio in cambios if (cambio["zona"], cambio["categoria"]) in bloques
+            ]
+            # Sin cambios visibles no se envía nada: el próximo delta parte de
+            # la misma versión del cliente
+            if visibles:
+                self.send_delta(sock, version, visibles, binary)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Encabezados y cuerpo salen en escrituras separadas: con Nagle, cada
+    # solicitud keep-alive esperaría el ACK demorado del cliente (~40 ms)
+    disable_nagle_algorithm = True
+    stadium = None  # FakeStadium, asignado en make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body, content_type="text/plain"):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply_json(self, data):
+        self.reply(200, json.dumps(data), "application/json")
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/":
+            self.reply(200, "Servidor corriendo correctamente.")
+        elif path == "/get_stadium_structure":
+            self.reply(200, self.stadium.snapshot(), "application/json")
+        elif path == "/ws" and self.headers.get("Upgrade", "").lower() == "websocket":
+            self.serve_websocket()
+        else:
+            self.reply(404, "No encontrado")
+
+    def do_POST(self):
+        info = self.read_json()
+        if self.path == "/buscar_asientos":
+            result = self.stadium.buscar_asientos(info["categoria"], info["cantidad"])
+            if result:
+                self.reply_json(result)
+            else:
+                self.reply(404, "No se encontraron asientos consecutivos disponibles")
+        elif self.path == "/reservar_asientos_temporalmente":
+            reserva_id, error = self.stadium.reservar(info["zona"], info["categoria"], info["asientos"])
+            if reserva_id:
+                self.reply_json({"reserva_id": reserva_id, "expira_en_s": self.stadium.expira_en_s(reserva_id)})
+            else:
+                self.reply(400, error)
+        elif self.path == "/reservar_grupos":
+            grupos = info.get("grupos") or []
+            if not 0 < len(grupos) <= MAX_GRUPOS_LOTE:
+                self.reply(400, "Cantidad de grupos inválida.")
+            else:
+                self.reply_json(self.stadium.reservar_grupos(grupos, info.get("parcial", False)))
+        elif self.path == "/confirmar_compra":
+            ok = self.stadium.finish_reserva(info["reserva_id"], "Comprado")
+            self.reply(200, "true" if ok else "false")
+        elif self.path == "/cancelar_reserva":
+            ok = self.stadium.finish_reserva(info["reserva_id"], "Libre")
+            self.reply(200, "true" if ok else "false")
+        elif self.path == "/procesar_pago":
+            aprobado = self.stadium.random.random() < self.stadium.approval_rate
+            self.reply(200, "true" if aprobado else "false")
+        else:
+            self.reply(404, "No encontrado")
+
+    def serve_websocket(self):
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", wsutil.accept_key(self.headers["Sec-WebSocket-Key"]))
+        self.end_headers()
+        self.wfile.flush()
+        sock = self.connection
+        query = parse_qs(urlsplit(self.path).query)
+        formato = query.get("formato", ["json"])[0]
+        try:
+            desde = int(query["desde"][0]) if "desde" in query else None
+        except ValueError:
+            desde = None
+        # Con el lock tomado ninguna difusión se adelanta a los mensajes iniciales;
+        # una vez registrado, todo cambio posterior llega como delta
+        with self.stadium.lock:
+            self.stadium.add_client(sock, binary=formato == "binario")
+            self.stadium.send_initial(sock, desde)
+        try:
+            while True:
+                _, opcode, payload = wsutil.read_frame(sock)
+                if opcode == wsutil.OP_CLOSE:
+                    break
+                if opcode == wsutil.OP_PING:
+                    self.stadium.send(sock, wsutil.OP_PONG, payload)
+                elif opcode == wsutil.OP_TEXT:
+                    try:
+                        pedido = json.loads(payload)
+                    except ValueError:
+                        continue
+                    if not isinstance(pedido, dict):
+                        continue
+                    if pedido.get("tipo") == "resync":
+                        self.stadium.send_snapshot(sock)
+                    elif pedido.get("tipo") == "suscribir":
+                        bloques = pedido.get("bloques")
+                        if bloques is not None:
+                            bloques = {(zona, categoria) for zona, categoria in bloques}
+                        self.stadium.subscribe(sock, bloques)
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            self.stadium.remove_client(sock)
+            self.close_connection = True
+
+
+def make_server(stadium, host="127.0.0.1", port=8080):
+    handler = type("FakeStadiumHandler", (Handler,), {"stadium": stadium})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def run_background(stadium, broadcast_rate, churn):
+    """Expira reservas y, si se pidió, genera difusiones periódicas"""
+    interval = 1.0 / broadcast_rate if broadcast_rate > 0 else 1.0
+    while True:
+        time.sleep(interval)
+        stadium.expire_reservas()
+        if broadcast_rate > 0:
+            stadium.churn(churn)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--zones", type=int, default=4, help="Cantidad de zonas")
+    parser.add_argument("--categories", type=int, default=4, help="Categorías por zona")
+    parser.add_argument("--rows", type=int, default=5, help="Filas por categoría")
+    parser.add_argument("--seats", type=int, default=5, help="Asientos por fila")
+    parser.add_argument("--occupancy", type=float, default=0.0, help="Fracción inicial ocupada")
+    parser.add_argument("--broadcast-rate", type=float, default=0.0,
+                        help="Difusiones por segundo con cambios aleatorios (0 = solo por ventas)")
+    parser.add_argument("--churn", type=int, default=10, help="Asientos cambiados en cada difusión")
+    parser.add_argument("--approval-rate", type=float, default=0.8, help="Probabilidad de aprobar un pago")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    estadio = generate_estadio(
+        args.zones, args.categories, args.rows, args.seats, args.occupancy, args.seed
+    )
+    stadium = FakeStadium(estadio, args.approval_rate, args.seed)
+    server = make_server(stadium, args.host, args.port)
+    threading.Thread(
+        target=run_background, args=(stadium, args.broadcast_rate, args.churn), daemon=True
+    ).start()
+    total = args.zones * args.categories * args.rows * args.seats
+    print(f"Estadio sintético de {total} asientos en http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Transporte HTTP y forma de las solicitudes al servidor del estadio,
+compartidos por la interfaz y las herramientas de prueba que corren sin Qt."""
+
+import os
+import threading
+import time
+
+BASE_URL = os.environ.get("STADIUM_API_URL", "http://127.0.0.1:8080")
+DEFAULT_TIMEOUT = (3.05, 10)  # (conexión, lectura) en segundos
+TIMEOUTS = {
+    "/get_stadium_structure": (3.05, 30),
+    "/buscar_asientos": (3.05, 10),
+    "/reservar_asientos_temporalmente": (3.05, 10),
+    "/reservar_grupos": (3.05, 15),
+    "/confirmar_compra": (3.05, 15),
+    "/procesar_pago": (3.05, 30),
+    "/cancelar_reserva": (3.05, 10),
+}
+# Solo las llamadas idempotentes se reintentan
+RETRIES = {
+    "/get_stadium_structure": 3,
+    "/buscar_asientos": 2,
+}
+
+requests = None  # Se importa con el primer HttpTransport (ver load_requests)
+
+
+def load_requests():
+    """Importa requests bajo demanda: es el import más lento del arranque y
+    con el caché caliente la primera solicitud ocurre fuera del hilo de la GUI"""
+    global requests
+    if requests is None:
+        import requests as module
+        requests = module
+    return requests
+
+
+def websocket_url(base_url, formato="json", desde=None):
+    """URL del WebSocket; desde es la versión que ya tiene el cliente"""
+    params = []
+    if formato == "binario":
+        params.append("formato=binario")
+    if desde is not None:
+        params.append(f"desde={desde}")
+    query = "?" + "&".join(params) if params else ""
+    if base_url.startswith("https://"):
+        return "wss://" + base_url[len("https://"):].rstrip("/") + "/ws" + query
+    return "ws://" + base_url[len("http://"):].rstrip("/") + "/ws" + query
+
+
+class HttpTransport:
+    """Transporte HTTP compartido con pool de conexiones keep-alive,
+    timeouts y reintentos acotados con backoff exponencial.
+
+    requests.Session no es segura entre hilos: cada hilo usa la suya y
+    todas montan el mismo HTTPAdapter, cuyo pool sí lo es."""
+
+    RETRY_STATUS = {502, 503, 504}
+
+    def __init__(self, base_url, pool_size=10):
+        self.base_url = base_url.rstrip("/")
+        load_requests()
+        self.adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+        )
+        self.local = threading.local()
+        self.sessions = []  # Todas las sesiones creadas, para cerrarlas
+        self.lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Sesión del hilo actual"""
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self.local.session = session
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def request(self, method, path, json=None, timeout=None, retries=0, backoff=0.2):
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(
+                    method, f"{self.base_url}{path}", json=json, timeout=timeout
+                )
+                if response.status_code not in self.RETRY_STATUS or attempt >= retries:
+                    response.raise_for_status()
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= retries:
+                    raise
+            time.sleep(backoff * (2 ** attempt))
+            attempt += 1
+
+    def close(self):
+        with self.lock:
+            sessions, self.sessions = self.sessions, []
+        for session in sessions:
+            session.close()
+        self.adapter.close()
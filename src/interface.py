@@ -1,13 +1,32 @@
+import time
+
+STARTUP_T0 = time.perf_counter()  # Referencia para --profile-startup
+
+import bisect
+import functools
+import hashlib
+import importlib
+import os
+import random
+import struct
 import sys
-import requests
+import threading
 import json
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
+import httputil
+from httputil import HttpTransport
 from PyQt5.QtGui import QPainter
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
     QGraphicsScene,
     QGraphicsView,
+    QGraphicsItem,
     QGraphicsRectItem,
     QGraphicsTextItem,
     QVBoxLayout,
@@ -15,25 +34,248 @@ from PyQt5.QtWidgets import (
     QLabel,
     QHBoxLayout,
     QComboBox,
+    QSpinBox,
+    QCheckBox,
     QPushButton,
     QMessageBox,
-    QLineEdit,
-    QDialog,
-    QFormLayout,
 )
 from PyQt5.QtGui import QColor, QPen, QBrush
-from PyQt5.QtCore import QRectF, Qt, QTimer, QObject, pyqtSignal, QUrl
+from PyQt5.QtCore import QRectF, Qt, QTimer, QObject, QThread, pyqtSignal, pyqtSlot, QUrl
+
+
+
+class StartupProfiler:
+    """Tiempos de las etapas del arranque, medidos desde STARTUP_T0.
+
+    Se activa con --profile-startup o STADIUM_PROFILE_STARTUP=1; cada etapa
+    se registra solo la primera vez que termina.
+    """
+
+    enabled = "--profile-startup" in sys.argv or os.environ.get("STADIUM_PROFILE_STARTUP") == "1"
+    marks = {}  # etapa -> segundos desde STARTUP_T0
+
+    @classmethod
+    def mark(cls, stage, started=None):
+        """Registra el fin de una etapa; started es su inicio (perf_counter)"""
+        if not cls.enabled or stage in cls.marks:
+            return
+        now = time.perf_counter()
+        cls.marks[stage] = now - STARTUP_T0
+        duration = f" ({(now - started) * 1000:.1f} ms)" if started is not None else ""
+        print(f"[arranque] {(now - STARTUP_T0) * 1000:8.1f} ms  {stage}{duration}")
+
+
+class Metrics:
+    """Contadores e histogramas de latencia de los caminos calientes.
+
+    Se activa con --metrics o STADIUM_METRICS=1 (o con el overlay, ver
+    MetricsOverlay). Desactivado no cuesta nada: timed() devuelve la función
+    sin envolver y el resto de los puntos de medición solo leen `enabled`.
+    Activado, escribe cada STADIUM_METRICS_INTERVAL segundos en
+    STADIUM_METRICS_FILE, en formato de texto de Prometheus o en JSON si el
+    archivo termina en .json.
+    """
+
+    overlay = "--metrics-overlay" in sys.argv or os.environ.get("STADIUM_METRICS_OVERLAY") == "1"
+    enabled = overlay or "--metrics" in sys.argv or os.environ.get("STADIUM_METRICS") == "1"
+    path = os.environ.get("STADIUM_METRICS_FILE", "stadium_metrics.prom")
+    interval_s = float(os.environ.get("STADIUM_METRICS_INTERVAL", "10"))
+    BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    counters = {}  # (nombre, etiquetas) -> valor
+    histograms = {}  # (nombre, etiquetas) -> [cuentas por bucket (+Inf al final), suma]
+    collectors = {}  # nombre -> (tipo, función que devuelve el valor al exportar)
+    lock = threading.Lock()  # También miden el hilo decodificador y el pool HTTP
+    dumper = None
+
+    @staticmethod
+    def labels(labels):
+        return ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+
+    @classmethod
+    def count(cls, name, value=1, **labels):
+        key = (name, cls.labels(labels))
+        with cls.lock:
+            cls.counters[key] = cls.counters.get(key, 0) + value
+
+    @classmethod
+    def observe(cls, name, seconds, **labels):
+        key = (name, cls.labels(labels))
+        with cls.lock:
+            histogram = cls.histograms.get(key)
+            if histogram is None:
+                histogram = cls.histograms[key] = [0] * (len(cls.BUCKETS_S) + 1) + [0.0]
+            histogram[bisect.bisect_left(cls.BUCKETS_S, seconds)] += 1
+            histogram[-1] += seconds
+
+    @classmethod
+    def timed(cls, name):
+        """Decorador que registra la duración de cada llamada en un histograma"""
+        def decorator(function):
+            if not cls.enabled:
+                return function
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    cls.observe(name, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    @classmethod
+    def register(cls, name, function, kind="gauge"):
+        """Valor leído solo al exportar, p. ej. un contador que ya lleva otra clase"""
+        if cls.enabled:
+            cls.collectors[name] = (kind, function)
+
+    @classmethod
+    def histogram(cls, name, labels=""):
+        """Copia de (cuentas por bucket, suma) de un histograma, o None"""
+        with cls.lock:
+            histogram = cls.histograms.get((name, labels))
+            return (histogram[:-1], histogram[-1]) if histogram else None
+
+    @classmethod
+    def to_prometheus(cls):
+        with cls.lock:
+            counters = dict(cls.counters)
+            histograms = {key: list(values) for key, values in cls.histograms.items()}
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        for name, (kind, function) in sorted(cls.collectors.items()):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {function()}")
+        for (name, labels), values in sorted(histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(list(cls.BUCKETS_S) + ["+Inf"], values[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {values[-1]}")
+            lines.append(f"{name}_count{suffix} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def to_json(cls):
+        def key_name(name, labels):
+            return f"{name}{{{labels}}}" if labels else name
+
+        with cls.lock:
+            data = {
+                "timestamp": time.time(),
+                "counters": {key_name(*key): value for key, value in cls.counters.items()},
+                "histograms": {
+                    key_name(*key): {
+                        "buckets": dict(zip([str(bound) for bound in cls.BUCKETS_S] + ["+Inf"], values[:-1])),
+                        "sum": values[-1],
+                        "count": sum(values[:-1]),
+                    }
+                    for key, values in cls.histograms.items()
+                },
+            }
+        data["gauges"] = {name: function() for name, (_, function) in cls.collectors.items()}
+        return json.dumps(data, indent=2)
+
+    @classmethod
+    def dump(cls):
+        """Reemplaza el archivo de métricas de una vez, para no dejarlo a medias"""
+        content = cls.to_json() if cls.path.endswith(".json") else cls.to_prometheus()
+        temp_path = cls.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write(content)
+            os.replace(temp_path, cls.path)
+        except OSError as e:
+            print(f"No se pudieron escribir las métricas: {e}")
+
+    @classmethod
+    def start(cls):
+        """Escribe las métricas periódicamente en un hilo aparte"""
+        if not cls.enabled or cls.dumper is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(cls.interval_s)
+                cls.dump()
+
+        cls.dumper = threading.Thread(target=loop, name="metrics", daemon=True)
+        cls.dumper.start()
+
+
+StartupProfiler.mark("imports")
+
+requests = None  # Se importa al configurar StadiumAPI (ver load_requests)
+
+
+def load_requests():
+    """Importa requests bajo demanda (ver httputil.load_requests)"""
+    global requests
+    requests = httputil.load_requests()
+    return requests
 
-from PyQt5.QtWebSockets import QWebSocket
 
 class StadiumAPI:
-    BASE_URL = "http://127.0.0.1:8080"
+    BASE_URL = httputil.BASE_URL
+    POOL_SIZE = int(os.environ.get("STADIUM_API_POOL_SIZE", "10"))
+    DEFAULT_TIMEOUT = httputil.DEFAULT_TIMEOUT
+    TIMEOUTS = httputil.TIMEOUTS
+    RETRIES = httputil.RETRIES
+    # "binario": snapshots WebSocket con un byte por asiento; "json": texto completo
+    WS_FORMAT = os.environ.get("STADIUM_WS_FORMAT", "binario")
+    transport = None
+
+    @classmethod
+    def configure(cls, base_url=None, pool_size=None):
+        """Cambia el servidor o el tamaño del pool y reinicia el transporte"""
+        if base_url is not None:
+            cls.BASE_URL = base_url
+        if pool_size is not None:
+            cls.POOL_SIZE = pool_size
+        if cls.transport is not None:
+            cls.transport.close()
+        load_requests()
+        cls.transport = HttpTransport(cls.BASE_URL, cls.POOL_SIZE)
+
+    @classmethod
+    def request(cls, method, path, json=None):
+        if cls.transport is None:
+            cls.configure()
+        started = time.perf_counter()
+        status = "error"  # Sin respuesta o con un código de error
+        try:
+            response = cls.transport.request(
+                method,
+                path,
+                json=json,
+                timeout=cls.TIMEOUTS.get(path, cls.DEFAULT_TIMEOUT),
+                retries=cls.RETRIES.get(path, 0),
+            )
+            status = response.status_code
+            return response
+        finally:
+            if Metrics.enabled:
+                Metrics.observe("stadium_http_request_seconds", time.perf_counter() - started, endpoint=path)
+                Metrics.count("stadium_http_requests_total", endpoint=path, status=status)
+
+    @classmethod
+    def websocket_url(cls, desde=None):
+        """URL del WebSocket; desde es la versión que ya tiene el cliente"""
+        return httputil.websocket_url(cls.BASE_URL, cls.WS_FORMAT, desde)
 
     @staticmethod
     def get_stadium_structure():
         try:
-            response = requests.get(f"{StadiumAPI.BASE_URL}/get_stadium_structure")
-            response.raise_for_status()
+            response = StadiumAPI.request("GET", "/get_stadium_structure")
             return response.json()
         except requests.RequestException as e:
             StadiumAPI.show_error(f"Error al obtener la estructura del estadio: {e}")
@@ -42,11 +284,11 @@ class StadiumAPI:
     @staticmethod
     def buscar_asientos(categoria, cantidad):
         try:
-            response = requests.post(
-                f"{StadiumAPI.BASE_URL}/buscar_asientos",
+            response = StadiumAPI.request(
+                "POST",
+                "/buscar_asientos",
                 json={"categoria": categoria, "cantidad": cantidad}
             )
-            response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
             StadiumAPI.show_error(f"Error al buscar asientos: {e}")
@@ -55,30 +297,48 @@ class StadiumAPI:
     @staticmethod
     def reservar_asientos_temporalmente(zona, categoria, asientos):
         try:
-            response = requests.post(
-                f"{StadiumAPI.BASE_URL}/reservar_asientos_temporalmente",
+            response = StadiumAPI.request(
+                "POST",
+                "/reservar_asientos_temporalmente",
                 json={
                     "zona": zona,
                     "categoria": categoria,
                     "asientos": asientos
                 }
             )
-            response.raise_for_status()
             return response.json()  # Debería contener 'reserva_id'
         except requests.RequestException as e:
             StadiumAPI.show_error(f"Error al reservar asientos temporalmente: {e}")
             return None
 
+    @staticmethod
+    def reservar_grupos(grupos, parcial=False):
+        """Busca y reserva varios grupos ({"categoria", "cantidad", "zona"
+        opcional}) en una sola solicitud; sin parcial, todos o ninguno"""
+        try:
+            response = StadiumAPI.request(
+                "POST",
+                "/reservar_grupos",
+                json={
+                    "grupos": grupos,
+                    "parcial": parcial
+                }
+            )
+            return response.json()  # 'reserva_id' (o None) y el resultado de cada grupo
+        except requests.RequestException as e:
+            StadiumAPI.show_error(f"Error al reservar el lote: {e}")
+            return None
+
     @staticmethod
     def confirmar_compra(reserva_id):
         try:
-            response = requests.post(
-                f"{StadiumAPI.BASE_URL}/confirmar_compra",
+            response = StadiumAPI.request(
+                "POST",
+                "/confirmar_compra",
                 json={
                     "reserva_id": reserva_id
                 }
             )
-            response.raise_for_status()
             content = response.text.strip()
             if content == "true":
                 return True
@@ -91,14 +351,14 @@ class StadiumAPI:
     @staticmethod
     def procesar_pago(metodo_pago, detalles):
         try:
-            response = requests.post(
-                f"{StadiumAPI.BASE_URL}/procesar_pago",
+            response = StadiumAPI.request(
+                "POST",
+                "/procesar_pago",
                 json={
                     "metodo_pago": metodo_pago,
                     "detalles": detalles
                 }
             )
-            response.raise_for_status()
             content = response.text.strip()
             if content == "true":
                 return {"aprobado": True}
@@ -111,11 +371,11 @@ class StadiumAPI:
     @staticmethod
     def cancelar_reserva(reserva_id):
         try:
-            response = requests.post(
-                f"{StadiumAPI.BASE_URL}/cancelar_reserva",
+            response = StadiumAPI.request(
+                "POST",
+                "/cancelar_reserva",
                 json={"reserva_id": reserva_id}
             )
-            response.raise_for_status()
             content = response.text.strip()
             if content == "true":
                 return True
@@ -127,6 +387,11 @@ class StadiumAPI:
 
     @staticmethod
     def show_error(message):
+        app = QApplication.instance()
+        if app is not None and QThread.currentThread() is not app.thread():
+            # Llamada desde un hilo del pool: mostrar el error en el hilo de la GUI
+            error_notifier.error.emit(message)
+            return
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Critical)
         msg.setText("Error")
@@ -135,6 +400,518 @@ class StadiumAPI:
         msg.exec_()
 
 
+class ErrorNotifier(QObject):
+    """Lleva al hilo de la GUI los errores ocurridos en hilos del pool"""
+
+    error = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.error.connect(self.show_error, Qt.QueuedConnection)
+
+    @pyqtSlot(str)
+    def show_error(self, message):
+        StadiumAPI.show_error(message)
+
+
+error_notifier = ErrorNotifier()
+
+
+class ApiCall(QObject):
+    """Llamada en curso a StadiumAPI ejecutada en el pool de hilos.
+
+    `finished` se emite en el hilo de la GUI con el resultado. Si la llamada
+    se cancela después de enviada, el resultado llega por `discarded`.
+    """
+
+    finished = pyqtSignal(object)
+    discarded = pyqtSignal(object)
+    done = pyqtSignal()
+
+    def __init__(self, future):
+        super().__init__()
+        self.future = future
+        self.cancelled = False
+        self.done.connect(self.deliver, Qt.QueuedConnection)
+        future.add_done_callback(lambda _: self.done.emit())
+
+    def cancel(self):
+        self.cancelled = True
+        self.future.cancel()
+
+    def deliver(self):
+        AsyncStadiumAPI.pending.discard(self)
+        if self.future.cancelled():
+            return
+        error = self.future.exception()
+        if error is not None:
+            # Relanzarla en un slot de Qt abortaría la aplicación; quien espera
+            # el resultado recibe None y sigue su camino de error
+            error_notifier.error.emit(f"Error inesperado: {error!r}")
+            result = None
+        else:
+            result = self.future.result()
+        if self.cancelled:
+            self.discarded.emit(result)
+        else:
+            self.finished.emit(result)
+
+
+class AsyncStadiumAPI:
+    """Variante no bloqueante de StadiumAPI sobre un pool de hilos"""
+
+    executor = None
+    pending = set()  # Mantiene vivas las llamadas hasta que terminan
+
+    @classmethod
+    def call(cls, function, *args, callback=None):
+        if cls.executor is None:
+            cls.executor = ThreadPoolExecutor(
+                max_workers=StadiumAPI.POOL_SIZE, thread_name_prefix="stadium-api"
+            )
+        call = ApiCall(cls.executor.submit(function, *args))
+        if callback is not None:
+            call.finished.connect(callback)
+        cls.pending.add(call)
+        return call
+
+    @classmethod
+    def get_stadium_structure(cls, callback=None):
+        return cls.call(StadiumAPI.get_stadium_structure, callback=callback)
+
+    @classmethod
+    def buscar_asientos(cls, categoria, cantidad, callback=None):
+        return cls.call(StadiumAPI.buscar_asientos, categoria, cantidad, callback=callback)
+
+    @classmethod
+    def reservar_asientos_temporalmente(cls, zona, categoria, asientos, callback=None):
+        return cls.call(
+            StadiumAPI.reservar_asientos_temporalmente, zona, categoria, asientos,
+            callback=callback,
+        )
+
+    @classmethod
+    def reservar_grupos(cls, grupos, parcial=False, callback=None):
+        return cls.call(StadiumAPI.reservar_grupos, grupos, parcial, callback=callback)
+
+    @classmethod
+    def confirmar_compra(cls, reserva_id, callback=None):
+        return cls.call(StadiumAPI.confirmar_compra, reserva_id, callback=callback)
+
+    @classmethod
+    def cancelar_reserva(cls, reserva_id, callback=None):
+        return cls.call(StadiumAPI.cancelar_reserva, reserva_id, callback=callback)
+
+
+# Estados de asiento y su código compacto (índice en la lista)
+SEAT_STATES = [
+    "Libre",
+    "Reservado",
+    "ReservadoPorUsuario",
+    "Comprado",
+    "ReservadoTemporalmente",
+    "Sugerido",
+]
+STATE_CODES = {state: code for code, state in enumerate(SEAT_STATES)}
+LIBRE = STATE_CODES["Libre"]
+SUGERIDO = STATE_CODES["Sugerido"]
+DESCONOCIDO = 254  # Estado no reconocido enviado por el servidor
+SIN_ASIENTO = 255  # Relleno para filas de distinto largo
+
+# Mensajes binarios del WebSocket (ver empaquetar_binario en main.rs)
+BINARY_MAGIC = b"ES"
+BINARY_VERSION = 3
+BINARY_ZLIB = 0x01
+BINARY_SNAPSHOT = 0
+BINARY_DELTA = 1
+BINARY_PARTIAL = 2  # Snapshot de solo los bloques recién suscritos
+BINARY_HEADER = struct.Struct("<2sBBBQ")  # magia, formato, flags, tipo, versión
+
+
+def known_codes(codes):
+    """Marca como DESCONOCIDO los estados que este cliente no conoce
+    (Sugerido es solo local, así que el servidor tampoco puede enviarlo)"""
+    unknown = (codes >= SUGERIDO) & (codes != SIN_ASIENTO)
+    if unknown.any():
+        codes = np.where(unknown, DESCONOCIDO, codes).astype(np.uint8)
+    return codes
+
+
+def read_name(body, offset):
+    end = offset + 1 + body[offset]
+    return body[offset + 1:end].decode(), end
+
+
+def decode_binary_message(payload):
+    """Decodifica un mensaje binario: un snapshot (completo o parcial) con una
+    matriz de códigos uint8 por categoría en lugar de listas de dicts, o un delta"""
+    magic, format_version, flags, tipo, version = BINARY_HEADER.unpack_from(payload)
+    if magic != BINARY_MAGIC or format_version != BINARY_VERSION:
+        raise ValueError("Formato binario desconocido")
+    body = payload[BINARY_HEADER.size:]
+    if flags & BINARY_ZLIB:
+        body = zlib.decompress(body)
+    if tipo == BINARY_DELTA:
+        return decode_binary_delta(body, version)
+    if tipo not in (BINARY_SNAPSHOT, BINARY_PARTIAL):
+        raise ValueError(f"Tipo de mensaje binario desconocido: {tipo}")
+
+    (zone_count,) = struct.unpack_from("<H", body, 0)
+    offset = 2
+    zonas = []
+    for _ in range(zone_count):
+        nombre, offset = read_name(body, offset)
+        category_count = body[offset]
+        offset += 1
+        categorias = {}
+        for _ in range(category_count):
+            categoria, offset = read_name(body, offset)
+            filas, columnas = struct.unpack_from("<HH", body, offset)
+            offset += 4
+            codes = np.frombuffer(body, np.uint8, filas * columnas, offset).reshape(filas, columnas)
+            offset += filas * columnas
+            categorias[categoria] = known_codes(codes)
+        zonas.append({"nombre": nombre, "categorias": categorias})
+    if tipo == BINARY_PARTIAL:
+        return {"version": version, "parcial": True, "zonas": zonas}
+    return {"version": version, "zonas": zonas}
+
+
+def decode_binary_delta(body, version):
+    desde, count = struct.unpack_from("<QI", body, 0)
+    offset = 12
+    cambios = []
+    for _ in range(count):
+        zona, offset = read_name(body, offset)
+        categoria, offset = read_name(body, offset)
+        fila, asiento, code = struct.unpack_from("<HHB", body, offset)
+        offset += 5
+        cambios.append((zona, categoria, fila, asiento, code))
+    return normalize_delta(version, cambios, desde)
+
+
+def normalize_delta(version, cambios, desde=None):
+    """Agrupa los cambios (zona, categoria, fila, asiento, código) de un delta
+    por bloque, como arreglos (filas, columnas, códigos). Con una suscripción
+    el servidor omite versiones sin cambios visibles, así que `desde` puede
+    ser anterior a version - 1."""
+    grouped = {}
+    for zona, categoria, fila, asiento, code in cambios:
+        grouped.setdefault((zona, categoria), []).append((fila, asiento, code))
+    bloques = {}
+    for key, values in grouped.items():
+        values = np.array(values, dtype=np.int64)
+        bloques[key] = (values[:, 0], values[:, 1], known_codes(values[:, 2].astype(np.uint8)))
+    if desde is None:
+        desde = version - 1
+    return {"desde": desde, "version": version, "cambios": bloques}
+
+
+def merge_deltas(older, newer):
+    """Combina dos deltas consecutivos; en cada asiento gana el más nuevo"""
+    bloques = dict(older["cambios"])
+    for key, (filas, columnas, codes) in newer["cambios"].items():
+        if key in bloques:
+            old_filas, old_columnas, old_codes = bloques[key]
+            filas = np.concatenate([old_filas, filas])
+            columnas = np.concatenate([old_columnas, columnas])
+            codes = np.concatenate([old_codes, codes])
+            # Última aparición de cada asiento (fila y columna caben en u16)
+            seat_keys = filas * 65536 + columnas
+            _, last = np.unique(seat_keys[::-1], return_index=True)
+            keep = len(seat_keys) - 1 - last
+            filas, columnas, codes = filas[keep], columnas[keep], codes[keep]
+        bloques[key] = (filas, columnas, codes)
+    return {"desde": older["desde"], "version": newer["version"], "cambios": bloques}
+
+
+class SeatStateModel:
+    """Modelo compacto con un código de estado (uint8) por asiento.
+
+    Guarda una matriz NumPy por cada (zona, categoria) y es la fuente de
+    verdad del estado de los asientos; los elementos gráficos solo lo leen.
+    Además mantiene, por bloque, contadores por estado, totales de ocupación
+    por bloque y por zona, y el conjunto de asientos de los estados escasos
+    que se resaltan y restablecen; todo se actualiza en cada cambio.
+    """
+
+    # Solo estos estados llevan conjunto de índices: son pocos asientos y
+    # replace_state los recorre; los demás se cuentan con `counts`
+    INDEXED_CODES = (SUGERIDO, STATE_CODES["ReservadoTemporalmente"])
+
+    def __init__(self):
+        self.blocks = {}  # (zona, categoria) -> np.ndarray (filas, columnas)
+        self.members = {}  # (zona, categoria) -> {código indexado: índices planos}
+        self.counts = {}  # (zona, categoria) -> np.ndarray con la cantidad por código
+        self.block_totals = {}  # (zona, categoria) -> [ocupados, asientos]
+        self.zone_totals = {}  # zona -> [ocupados, asientos]
+        self.stale = set()  # (zona, categoria) que no reciben los cambios del servidor
+
+    def clear(self):
+        self.blocks.clear()
+        self.members.clear()
+        self.counts.clear()
+        self.block_totals.clear()
+        self.zone_totals.clear()
+        self.stale.clear()
+
+    @staticmethod
+    def encode(asientos):
+        """Convierte la matriz de asientos del JSON en una matriz de códigos"""
+        if isinstance(asientos, np.ndarray):
+            return asientos
+        columnas = max((len(fila) for fila in asientos), default=0)
+        codes = np.full((len(asientos), columnas), SIN_ASIENTO, dtype=np.uint8)
+        for i, fila in enumerate(asientos):
+            codes[i, :len(fila)] = [
+                STATE_CODES.get(asiento['estado'], DESCONOCIDO) for asiento in fila
+            ]
+        return codes
+
+    @staticmethod
+    def tally(codes):
+        """(ocupados, asientos) de un arreglo de códigos"""
+        seats = codes != SIN_ASIENTO
+        free = (codes == LIBRE) | (codes == SUGERIDO)
+        return int(np.count_nonzero(seats & ~free)), int(np.count_nonzero(seats))
+
+    def add_totals(self, key, occupied, seats):
+        block = self.block_totals.setdefault(key, [0, 0])
+        zone = self.zone_totals.setdefault(key[0], [0, 0])
+        block[0] += occupied
+        block[1] += seats
+        zone[0] += occupied
+        zone[1] += seats
+
+    @staticmethod
+    def fingerprint(asientos):
+        """Huella barata de una matriz de asientos (JSON o códigos): se calcula
+        sobre los códigos para que ambos formatos del mismo estado coincidan"""
+        codes = SeatStateModel.encode(asientos)
+        return hash((codes.shape, codes.tobytes()))
+
+    @staticmethod
+    def state_name(code):
+        code = int(code)
+        if code < len(SEAT_STATES):
+            return SEAT_STATES[code]
+        return None
+
+    def load_category(self, zona, categoria, asientos):
+        codes = self.encode(asientos).copy()
+        key = (zona, categoria)
+        if key in self.block_totals:
+            occupied, seats = self.block_totals[key]
+            self.add_totals(key, -occupied, -seats)
+        self.blocks[key] = codes
+        flat = codes.ravel()
+        self.counts[key] = np.bincount(flat, minlength=256)
+        self.members[key] = {
+            code: set(np.flatnonzero(flat == code).tolist()) for code in self.INDEXED_CODES
+        }
+        self.add_totals(key, *self.tally(flat))
+        return codes
+
+    def move(self, key, indices, old_codes, new_codes):
+        """Actualiza índices y contadores para asientos que cambiaron de código"""
+        counts = self.counts[key]
+        members = self.members[key]
+        counts -= np.bincount(old_codes, minlength=256)
+        counts += np.bincount(new_codes, minlength=256)
+        old_occupied, old_seats = self.tally(old_codes)
+        new_occupied, new_seats = self.tally(new_codes)
+        self.add_totals(key, new_occupied - old_occupied, new_seats - old_seats)
+        for code in np.unique(old_codes).tolist():
+            if code in members:
+                members[code].difference_update(indices[old_codes == code].tolist())
+        for code in np.unique(new_codes).tolist():
+            if code in members:
+                members[code].update(indices[new_codes == code].tolist())
+
+    def block(self, zona, categoria):
+        return self.blocks.get((zona, categoria))
+
+    def get_state(self, zona, categoria, fila, columna):
+        return self.state_name(self.blocks[(zona, categoria)][fila, columna])
+
+    def set_state(self, zona, categoria, fila, columna, state):
+        key = (zona, categoria)
+        codes = self.blocks[key]
+        old_code = int(codes[fila, columna])
+        new_code = STATE_CODES.get(state, DESCONOCIDO)
+        if old_code == new_code:
+            return
+        codes[fila, columna] = new_code
+        index = fila * codes.shape[1] + columna
+        counts = self.counts[key]
+        counts[old_code] -= 1
+        counts[new_code] += 1
+        old_occupied, old_seats = self.tally(np.uint8(old_code))
+        new_occupied, new_seats = self.tally(np.uint8(new_code))
+        self.add_totals(key, new_occupied - old_occupied, new_seats - old_seats)
+        members = self.members[key]
+        if old_code in members:
+            members[old_code].discard(index)
+        if new_code in members:
+            members[new_code].add(index)
+
+    def apply(self, zona, categoria, asientos):
+        """Aplica una matriz recibida del servidor.
+
+        Devuelve las posiciones (filas, columnas) que cambiaron. Un asiento
+        "Sugerido" que el servidor sigue reportando "Libre" no se considera
+        un cambio, ya que la sugerencia solo existe en el cliente.
+        """
+        current = self.blocks[(zona, categoria)]
+        new = self.encode(asientos)
+        filas = min(current.shape[0], new.shape[0])
+        columnas = min(current.shape[1], new.shape[1])
+        current_view = current[:filas, :columnas]
+        new_view = new[:filas, :columnas]
+        changed = (current_view != new_view) & ~(
+            (current_view == SUGERIDO) & (new_view == LIBRE)
+        )
+        changed_filas, changed_columnas = np.nonzero(changed)
+        if len(changed_filas):
+            old_codes = current_view[changed_filas, changed_columnas]
+            new_codes = new_view[changed_filas, changed_columnas]
+            current_view[changed_filas, changed_columnas] = new_codes
+            indices = changed_filas * current.shape[1] + changed_columnas
+            self.move((zona, categoria), indices, old_codes, new_codes)
+        return changed_filas, changed_columnas
+
+    def apply_changes(self, zona, categoria, filas, columnas, codes):
+        """Aplica los asientos de un delta con las mismas reglas que apply"""
+        current = self.blocks[(zona, categoria)]
+        inside = (filas < current.shape[0]) & (columnas < current.shape[1])
+        filas, columnas, codes = filas[inside], columnas[inside], codes[inside]
+        old_codes = current[filas, columnas]
+        changed = (old_codes != codes) & ~((old_codes == SUGERIDO) & (codes == LIBRE))
+        filas, columnas = filas[changed], columnas[changed]
+        if len(filas):
+            current[filas, columnas] = codes[changed]
+            indices = filas * current.shape[1] + columnas
+            self.move((zona, categoria), indices, old_codes[changed], codes[changed])
+        return filas, columnas
+
+    def seats_in_state(self, zona, categoria, state):
+        """Índices planos (fila * columnas + columna) de los asientos en un estado"""
+        key = (zona, categoria)
+        code = STATE_CODES[state]
+        if code in self.members[key]:
+            return self.members[key][code]
+        return set(np.flatnonzero(self.blocks[key].ravel() == code).tolist())
+
+    def replace_state(self, old_state, new_state):
+        """Cambia todos los asientos de un estado a otro.
+
+        Devuelve una lista de (zona, categoria, filas, columnas) con los cambios.
+        """
+        old_code = STATE_CODES[old_state]
+        new_code = STATE_CODES[new_state]
+        changes = []
+        for (zona, categoria), codes in self.blocks.items():
+            key = (zona, categoria)
+            if not self.counts[key][old_code]:
+                continue
+            # Solo se recorren los asientos que están en el estado buscado
+            if old_code in self.members[key]:
+                indices = np.fromiter(self.members[key][old_code], dtype=np.intp)
+            else:
+                indices = np.flatnonzero(codes.ravel() == old_code)
+            filas, columnas = np.divmod(indices, codes.shape[1])
+            codes[filas, columnas] = new_code
+            self.move(
+                key,
+                indices,
+                np.full(len(indices), old_code, dtype=np.uint8),
+                np.full(len(indices), new_code, dtype=np.uint8),
+            )
+            changes.append((zona, categoria, filas, columnas))
+        return changes
+
+    def occupancy(self, zona, categoria=None):
+        """Fracción de asientos ocupados de una zona o bloque (1.0 si no tiene asientos).
+
+        La de una zona no cuenta sus bloques desactualizados (ver `stale`).
+        """
+        if categoria is None:
+            occupied, seats = self.zone_totals.get(zona, (0, 0))
+            for key in self.stale:
+                if key[0] == zona and key in self.block_totals:
+                    occupied -= self.block_totals[key][0]
+                    seats -= self.block_totals[key][1]
+        else:
+            occupied, seats = self.block_totals.get((zona, categoria), (0, 0))
+        return occupied / seats if seats else 1.0
+
+    def search_consecutive(self, categoria, cantidad, limit=1):
+        """Busca corridas de `cantidad` asientos libres en una misma fila.
+
+        Devuelve hasta `limit` candidatos con la forma de la respuesta de
+        /buscar_asientos, ordenados por ocupación de la zona (menor primero),
+        fila (más adelante primero) y cercanía al centro de la fila. Los
+        bloques desactualizados no se consideran.
+        """
+        zonas = sorted(
+            dict.fromkeys(z for (z, c) in self.blocks if c == categoria and (z, c) not in self.stale),
+            key=self.occupancy,
+        )
+        candidates = []
+        for zona in zonas:
+            codes = self.blocks[(zona, categoria)]
+            filas, columnas = codes.shape
+            if cantidad < 1 or cantidad > columnas:
+                continue
+            libres = (codes == LIBRE) | (codes == SUGERIDO)
+            # Suma acumulada por fila: una ventana es válida si suma `cantidad`
+            acumulado = np.zeros((filas, columnas + 1), dtype=np.int32)
+            np.cumsum(libres, axis=1, out=acumulado[:, 1:])
+            ventanas = (acumulado[:, cantidad:] - acumulado[:, :-cantidad]) == cantidad
+            run_filas, run_inicios = np.nonzero(ventanas)
+            if not len(run_filas):
+                continue
+            centro = np.abs(2 * run_inicios + cantidad - columnas)
+            orden = np.lexsort((centro, run_filas))[:limit - len(candidates)]
+            for fila, inicio in zip(run_filas[orden].tolist(), run_inicios[orden].tolist()):
+                candidates.append({
+                    "zona": zona,
+                    "categoria": categoria,
+                    "asientos": [(fila, columna) for columna in range(inicio, inicio + cantidad)],
+                })
+            if len(candidates) >= limit:
+                break
+        return candidates
+
+    def snapshot(self):
+        """Copia del estado con la forma de Estadio (matrices de códigos).
+
+        Las sugerencias locales se guardan como "Libre".
+        """
+        zonas = {}
+        for (zona, categoria), codes in self.blocks.items():
+            codes = codes.copy()
+            codes[codes == SUGERIDO] = LIBRE
+            zonas.setdefault(zona, {})[categoria] = codes
+        return {
+            "zonas": [
+                {"nombre": zona, "categorias": categorias} for zona, categorias in zonas.items()
+            ]
+        }
+
+    def structure(self):
+        """Zonas, categorías y dimensiones de cada bloque"""
+        return {key: codes.shape for key, codes in self.blocks.items()}
+
+    def count(self, state, zona=None, categoria=None):
+        code = STATE_CODES[state]
+        return sum(
+            int(counts[code])
+            for (z, c), counts in self.counts.items()
+            if (zona is None or z == zona) and (categoria is None or c == categoria)
+        )
+
+
 class Seat(QGraphicsRectItem):
     COLORS = {
         "Libre": QColor("green"),
@@ -144,25 +921,189 @@ class Seat(QGraphicsRectItem):
         "ReservadoTemporalmente": QColor("purple"),
         "Sugerido": QColor("blue")
     }
+    # Pinceles compartidos por todos los asientos, uno por estado
+    BRUSHES = {state: QBrush(color) for state, color in COLORS.items()}
+    DEFAULT_BRUSH = QBrush(QColor("grey"))
+    PEN = QPen(Qt.black)
 
-    def __init__(self, x, y, size, row, column, state, zona, categoria):
+    def __init__(self, x, y, size, row, column, zona, categoria, model):
         super().__init__(QRectF(x, y, size, size))
         self.row = row
         self.column = column
-        self.state = state
         self.zona = zona
         self.categoria = categoria
+        self.model = model
+        self.setPen(self.PEN)
         self.setup_appearance()
 
+    @property
+    def state(self):
+        return self.model.get_state(self.zona, self.categoria, self.row, self.column)
+
     def setup_appearance(self):
-        self.setBrush(QBrush(self.COLORS.get(self.state, QColor("grey"))))
-        self.setPen(QPen(Qt.black))
+        self.setBrush(self.BRUSHES.get(self.state, self.DEFAULT_BRUSH))
+
+    def set_state(self, new_state):
+        """Cambia el estado en el modelo sin repintar"""
+        self.model.set_state(self.zona, self.categoria, self.row, self.column, new_state)
 
     def update_state(self, new_state):
-        self.state = new_state
+        self.set_state(new_state)
         self.setup_appearance()
 
 
+# Niveles de detalle según la escala de la vista
+LOD_BLOCKS = 0.2  # Debajo de esta escala se muestran bloques agregados
+LOD_HEADERS = 0.35  # Desde esta escala se leen las etiquetas de zona y categoría
+LOD_SEAT_LABELS = 0.6  # Desde esta escala se leen las etiquetas "fila-columna"
+
+
+class ItemLayer(QGraphicsItem):
+    """Contenedor sin contenido para mostrar u ocultar un grupo de elementos"""
+
+    def __init__(self):
+        super().__init__()
+        self.setFlag(QGraphicsItem.ItemHasNoContents)
+
+    def boundingRect(self):
+        return QRectF()
+
+    def paint(self, painter, option, widget=None):
+        pass
+
+
+class BlockSummaryItem(QGraphicsRectItem):
+    """Bloque agregado de una (zona, categoria) coloreado por disponibilidad"""
+
+    def __init__(self, rect, zona, categoria, model):
+        super().__init__(rect)
+        self.zona = zona
+        self.categoria = categoria
+        self.model = model
+        self.setPen(Seat.PEN)
+        self.setVisible(False)
+
+    def setup_appearance(self):
+        disponible = 1 - self.model.occupancy(self.zona, self.categoria)
+        # De rojo (lleno) a verde (vacío)
+        self.setBrush(QBrush(QColor.fromHsvF(disponible / 3, 0.8, 0.8)))
+        self.setToolTip(f"Zona {self.zona} - {self.categoria}: {disponible:.0%} disponible")
+
+
+class SeatCell:
+    """Vista liviana de un asiento dentro de un SeatGridItem"""
+
+    def __init__(self, grid, row, column):
+        self.grid = grid
+        self.row = row
+        self.column = column
+        self.zona = grid.zona
+        self.categoria = grid.categoria
+
+    @property
+    def state(self):
+        return self.grid.model.get_state(self.zona, self.categoria, self.row, self.column)
+
+    def setup_appearance(self):
+        self.grid.update(self.grid.seat_rect(self.row, self.column))
+
+    def set_state(self, new_state):
+        """Cambia el estado en el modelo sin repintar"""
+        self.grid.model.set_state(self.zona, self.categoria, self.row, self.column, new_state)
+
+    def update_state(self, new_state):
+        self.set_state(new_state)
+        self.setup_appearance()
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, SeatCell)
+            and (self.zona, self.categoria, self.row, self.column)
+            == (other.zona, other.categoria, other.row, other.column)
+        )
+
+    def __hash__(self):
+        return hash((self.zona, self.categoria, self.row, self.column))
+
+
+class SeatGridItem(QGraphicsItem):
+    """Un solo elemento gráfico para todos los asientos de una (zona, categoria).
+
+    Pinta la grilla directamente desde SeatStateModel y traduce posiciones a
+    (fila, columna) aritméticamente, sin un elemento por asiento.
+    """
+
+    def __init__(self, x, y, size, spacing, zona, categoria, model):
+        super().__init__()
+        self.size = size
+        self.pitch = size + spacing
+        self.zona = zona
+        self.categoria = categoria
+        self.model = model
+        self.rows, self.columns = model.block(zona, categoria).shape
+        self.setPos(x, y)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+
+    def boundingRect(self):
+        return QRectF(-0.5, -0.5, self.columns * self.pitch + 1, self.rows * self.pitch + 1)
+
+    def seat_rect(self, row, column):
+        return QRectF(column * self.pitch, row * self.pitch, self.size, self.size)
+
+    def seat_at(self, pos):
+        """Devuelve (fila, columna) del asiento en la posición local o None"""
+        column = int(pos.x() // self.pitch)
+        row = int(pos.y() // self.pitch)
+        if not (0 <= row < self.rows and 0 <= column < self.columns):
+            return None
+        if pos.x() - column * self.pitch > self.size or pos.y() - row * self.pitch > self.size:
+            return None  # En el espacio entre asientos
+        if self.model.block(self.zona, self.categoria)[row, column] == SIN_ASIENTO:
+            return None
+        return row, column
+
+    def setup_appearance(self):
+        self.update()
+
+    def visible_range(self, rect):
+        """Filas y columnas que intersectan un rectángulo local"""
+        first_row = max(0, int(rect.top() // self.pitch))
+        last_row = min(self.rows, int(rect.bottom() // self.pitch) + 1)
+        first_column = max(0, int(rect.left() // self.pitch))
+        last_column = min(self.columns, int(rect.right() // self.pitch) + 1)
+        return first_row, last_row, first_column, last_column
+
+    def paint(self, painter, option, widget=None):
+        codes = self.model.block(self.zona, self.categoria)
+        first_row, last_row, first_column, last_column = self.visible_range(option.exposedRect)
+        visible = codes[first_row:last_row, first_column:last_column]
+        show_labels = option.levelOfDetailFromTransform(painter.worldTransform()) >= LOD_SEAT_LABELS
+        if not show_labels:
+            painter.setRenderHint(QPainter.Antialiasing, False)
+
+        # Un drawRects por estado en lugar de un elemento por asiento
+        painter.setPen(Seat.PEN)
+        for code in np.unique(visible).tolist():
+            if code == SIN_ASIENTO:
+                continue
+            filas, columnas = np.nonzero(visible == code)
+            painter.setBrush(Seat.BRUSHES.get(SeatStateModel.state_name(code), Seat.DEFAULT_BRUSH))
+            painter.drawRects([
+                self.seat_rect(first_row + fila, first_column + columna)
+                for fila, columna in zip(filas.tolist(), columnas.tolist())
+            ])
+
+        if not show_labels:
+            return
+        filas, columnas = np.nonzero(visible != SIN_ASIENTO)
+        for fila, columna in zip(filas.tolist(), columnas.tolist()):
+            fila += first_row
+            columna += first_column
+            # Misma posición que SeatLabel, recortado donde empieza el siguiente asiento
+            rect = QRectF(columna * self.pitch + 9, fila * self.pitch + 9, self.pitch - 9, self.pitch - 9)
+            painter.drawText(rect, Qt.AlignLeft | Qt.AlignTop, f"{fila+1}-{columna+1}")
+
+
 class SeatLabel(QGraphicsTextItem):
     """Clase para el texto/número del asiento"""
 
@@ -217,18 +1158,58 @@ class StadiumLayout:
 
 
 class StadiumView(QGraphicsView):
-    def __init__(self, estadio):
+    FRAME_INTERVAL_MS = 16  # Repintado agrupado a ~60 cuadros por segundo
+    # "items": un elemento por asiento; "grid": un elemento por categoría;
+    # "auto": grilla cuando el estadio supera GRID_THRESHOLD asientos
+    RENDER_MODE = os.environ.get("STADIUM_RENDER_MODE", "auto")
+    GRID_THRESHOLD = 5000
+    SUBSCRIPTION_DELAY_MS = 250  # Espera a que termine el paneo o el zoom
+
+    seat_clicked = pyqtSignal(str, str, int, int)  # zona, categoria, fila, columna
+    occupancy_changed = pyqtSignal()  # Como máximo una vez por cuadro
+    first_painted = pyqtSignal()
+    populated = pyqtSignal()  # La escena terminó de construirse
+    resync_needed = pyqtSignal()  # Falta una versión: hace falta un snapshot
+    connection_status = pyqtSignal(str)
+
+    def __init__(self, estadio=None, render_mode=None):
         super().__init__()
         self.scene = QGraphicsScene()
         self.setScene(self.scene)
         self.layout = StadiumLayout()
+        self.render_mode = render_mode or self.RENDER_MODE
         self.seats_map = {}  # Diccionario para mapear asientos
+        self.seat_index = {}  # Índice (zona, categoria, fila, columna) -> Seat
+        self.seat_grids = {}  # (zona, categoria) -> SeatGridItem en modo grilla
+        self.seat_layers = {}  # (zona, categoria) -> (capa de asientos, capa de etiquetas)
+        self.block_summaries = {}  # (zona, categoria) -> BlockSummaryItem
+        self.header_labels = []  # Etiquetas de zona y categoría
+        self.lod_tier = None
+        self.headers_visible = None
+        self.use_grid = False
+        self.press_pos = None
+        self.model = SeatStateModel()  # Estado de los asientos
+        self.fingerprints = {}  # (zona, categoria) -> huella del último snapshot aplicado
+        self.version = None  # Versión del servidor reflejada en el modelo
+        self.skipped_blocks = 0  # Bloques omitidos por no haber cambiado
+        self.dirty_seats = set()  # Asientos pendientes de repintar
+        self.repaint_timer = QTimer(self)
+        self.repaint_timer.setSingleShot(True)
+        self.repaint_timer.timeout.connect(self.flush_repaints)
+        self.pending_zones = []  # Zonas que faltan dibujar en populate()
+        self.populating = False
+        self.populate_started = None
+        self.painted = False
+        self.websocket_client = None  # Se conecta en start_live_updates()
+        # Bloques (zona, categoria) de los que el servidor envía cambios; None = todos
+        self.subscription = None
+        self.pinned_categories = set()  # Siempre suscritas (p. ej. la de la búsqueda)
+        self.subscription_timer = QTimer(self)
+        self.subscription_timer.setSingleShot(True)
+        self.subscription_timer.timeout.connect(self.update_subscription)
         self.setup_view()
-        self.draw_stadium_structure(estadio)
-
-        # Conexión al WebSocket
-        self.websocket_client = WebSocketClient()
-        self.websocket_client.update_received.connect(self.handle_updates)
+        if estadio is not None:
+            self.draw_stadium_structure(estadio)
 
     def setup_view(self):
         self.setRenderHint(QPainter.Antialiasing)
@@ -238,19 +1219,173 @@ class StadiumView(QGraphicsView):
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
         self.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
 
-    def draw_stadium_structure(self, estadio):
+    @staticmethod
+    def count_seats(estadio):
+        return sum(
+            len(fila)
+            for zona in estadio['zonas']
+            for asientos in zona['categorias'].values()
+            for fila in asientos
+        )
+
+    def load_model(self, estadio):
+        """Carga todos los bloques en el modelo (rápido, sin elementos gráficos)"""
+        started = time.perf_counter()
+        self.dirty_seats.clear()
+        self.model.clear()
+        self.fingerprints.clear()
+        self.version = estadio.get('version')
+        self.model.stale.update(tuple(key) for key in estadio.get('stale', ()))
+        for zona in estadio['zonas']:
+            for categoria, asientos in zona['categorias'].items():
+                key = (zona['nombre'], categoria)
+                self.model.load_category(zona['nombre'], categoria, asientos)
+                # Un bloque desactualizado nunca se omite al recibir un snapshot
+                self.fingerprints[key] = (
+                    None if key in self.model.stale else SeatStateModel.fingerprint(asientos)
+                )
+        if self.subscription is not None:
+            # Los bloques fuera de la suscripción no reciben los deltas siguientes
+            self.model.stale |= self.fingerprints.keys() - self.subscription
+        StartupProfiler.mark("modelo", started)
+
+    def clear_scene(self, estadio):
         self.layout.reset_position()
         self.scene.clear()
         self.seats_map.clear()
+        self.seat_index.clear()
+        self.seat_grids.clear()
+        self.seat_layers.clear()
+        self.block_summaries.clear()
+        self.header_labels.clear()
+        self.lod_tier = None
+        self.headers_visible = None
+        if self.render_mode == "auto":
+            self.use_grid = self.count_seats(estadio) > self.GRID_THRESHOLD
+        else:
+            self.use_grid = self.render_mode == "grid"
 
+    @Metrics.timed("stadium_draw_structure_seconds")
+    def draw_stadium_structure(self, estadio):
+        """Construye toda la escena de una vez"""
+        started = time.perf_counter()
+        self.pending_zones = []
+        self.load_model(estadio)
+        self.clear_scene(estadio)
         for zona in estadio['zonas']:
             self.draw_zone(zona)
             self.layout.advance_zone()
+        self.finish_drawing(started)
+
+    def populate(self, estadio):
+        self.load_model(estadio)
+        self.populate_scene(estadio)
+
+    def populate_scene(self, estadio):
+        """Dibuja la escena de a una zona por vuelta del bucle de eventos,
+        para no bloquear la ventana.
+
+        Solo usa la forma del estadio: el modelo ya está cargado, así que
+        búsquedas, ocupación y actualizaciones funcionan mientras tanto y
+        cada zona se dibuja con el estado vigente.
+        """
+        self.clear_scene(estadio)
+        self.pending_zones = list(estadio['zonas'])
+        self.populate_started = time.perf_counter()
+        if not self.populating:
+            self.populating = True
+            QTimer.singleShot(0, self.draw_next_zone)
+
+    @Metrics.timed("stadium_draw_zone_seconds")
+    def draw_next_zone(self):
+        if not self.pending_zones:
+            self.populating = False
+            return
+        self.draw_zone(self.pending_zones.pop(0))
+        self.layout.advance_zone()
+        self.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
+        self.lod_tier = None  # Reaplicar el nivel de detalle a los elementos nuevos
+        self.update_level_of_detail()
+        if self.pending_zones:
+            QTimer.singleShot(0, self.draw_next_zone)
+        else:
+            self.populating = False
+            self.finish_drawing(self.populate_started)
 
+    def finish_drawing(self, started):
         self.fitInView(self.scene.sceneRect(), Qt.KeepAspectRatio)
+        self.lod_tier = None
+        self.update_level_of_detail()
+        StartupProfiler.mark("escena", started)
+        self.occupancy_changed.emit()
+        self.populated.emit()
+        self.schedule_subscription_update()
+
+    def start_live_updates(self):
+        """Conecta el WebSocket; se llama una vez que la ventana ya se mostró"""
+        if self.websocket_client is None:
+            self.websocket_client = WebSocketClient(current_version=lambda: self.version)
+            self.websocket_client.update_received.connect(self.handle_updates)
+            self.websocket_client.status_changed.connect(self.connection_status)
+            self.resync_needed.connect(self.websocket_client.request_resync)
+            self.schedule_subscription_update()
+
+    def schedule_subscription_update(self):
+        self.subscription_timer.start(self.SUBSCRIPTION_DELAY_MS)
+
+    def set_pinned_categories(self, categorias):
+        self.pinned_categories = set(categorias)
+        self.schedule_subscription_update()
+
+    def visible_blocks(self):
+        area = self.mapToScene(self.viewport().rect()).boundingRect()
+        return {
+            key for key, summary in self.block_summaries.items()
+            if summary.sceneBoundingRect().intersects(area)
+        }
+
+    def update_subscription(self):
+        """Suscribe el WebSocket solo a los bloques visibles y los fijados.
+
+        Los bloques fuera de la suscripción dejan de actualizarse y quedan
+        marcados como desactualizados en el modelo: no cuentan en la ocupación
+        de la leyenda ni en la búsqueda local. Al volver a verse, el servidor
+        envía un snapshot parcial de ellos y vuelven a estar al día.
+        """
+        if self.websocket_client is None or self.populating:
+            return
+        blocks = self.visible_blocks() | {
+            key for key in self.fingerprints if key[1] in self.pinned_categories
+        }
+        subscription = None if blocks >= self.fingerprints.keys() else blocks
+        if subscription != self.subscription:
+            previous = set(self.fingerprints if self.subscription is None else self.subscription)
+            left = previous - set(self.fingerprints if subscription is None else subscription)
+            self.subscription = subscription
+            self.websocket_client.subscribe(subscription)
+            if left:
+                self.model.stale |= left
+                self.occupancy_changed.emit()
+
+    def is_subscribed(self, key):
+        return self.subscription is None or key in self.subscription
+
+    def is_live(self, categoria):
+        """Indica si el modelo tiene al día todos los bloques de la categoría"""
+        return not any(key[1] == categoria for key in self.model.stale)
+
+    @Metrics.timed("stadium_paint_seconds")
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            StartupProfiler.mark("primer pintado")
+            self.first_painted.emit()
 
     def draw_zone(self, zona):
-        self.scene.addItem(ZoneLabel(zona['nombre'], 0, self.layout.current_y))
+        zone_label = ZoneLabel(zona['nombre'], 0, self.layout.current_y)
+        self.scene.addItem(zone_label)
+        self.header_labels.append(zone_label)
         self.layout.current_y += 30
 
         for categoria_key, asientos in zona['categorias'].items():
@@ -259,8 +1394,11 @@ class StadiumView(QGraphicsView):
             self.layout.advance_category()
 
     def draw_category(self, zona_nombre, categoria, asientos):
-        self.scene.addItem(CategoryLabel(categoria, self.layout.spacing, self.layout.current_y))
+        category_label = CategoryLabel(categoria, self.layout.spacing, self.layout.current_y)
+        self.scene.addItem(category_label)
+        self.header_labels.append(category_label)
         self.layout.current_y += 30
+        block_top = self.layout.current_y
 
         # Crear entrada en el diccionario para esta zona y categoría si no existe
         if zona_nombre not in self.seats_map:
@@ -268,13 +1406,36 @@ class StadiumView(QGraphicsView):
         if categoria not in self.seats_map[zona_nombre]:
             self.seats_map[zona_nombre][categoria] = []
 
-        for i, fila in enumerate(asientos):
-            self.layout.current_x = self.layout.spacing
-            row_seats = self.draw_row(i, fila, zona_nombre, categoria)
-            self.seats_map[zona_nombre][categoria].extend(row_seats)
-            self.layout.advance_row()
+        if self.use_grid:
+            self.draw_grid(zona_nombre, categoria)
+        else:
+            layers = (ItemLayer(), ItemLayer())
+            for layer in layers:
+                self.scene.addItem(layer)
+            self.seat_layers[(zona_nombre, categoria)] = layers
+            for i, fila in enumerate(asientos):
+                self.layout.current_x = self.layout.spacing
+                row_seats = self.draw_row(i, fila, zona_nombre, categoria, *layers)
+                self.seats_map[zona_nombre][categoria].extend(row_seats)
+                self.layout.advance_row()
+
+        # Bloque agregado para los niveles de zoom más lejanos
+        columnas = self.model.block(zona_nombre, categoria).shape[1]
+        summary = BlockSummaryItem(
+            QRectF(
+                self.layout.spacing,
+                block_top,
+                columnas * (self.layout.seat_size + self.layout.spacing) - self.layout.spacing,
+                self.layout.current_y - block_top - self.layout.spacing,
+            ),
+            zona_nombre,
+            categoria,
+            self.model
+        )
+        self.scene.addItem(summary)
+        self.block_summaries[(zona_nombre, categoria)] = summary
 
-    def draw_row(self, row_num, fila, zona_nombre, categoria):
+    def draw_row(self, row_num, fila, zona_nombre, categoria, seats_layer, labels_layer):
         row_seats = []
         for col_num, asiento in enumerate(fila):
             seat = Seat(
@@ -283,63 +1444,202 @@ class StadiumView(QGraphicsView):
                 self.layout.seat_size,
                 row_num,
                 col_num,
-                asiento['estado'],
                 zona_nombre,
-                categoria
+                categoria,
+                self.model
             )
-            self.scene.addItem(seat)
-            self.scene.addItem(SeatLabel(
+            seat.setParentItem(seats_layer)
+            self.seat_index[(zona_nombre, categoria, row_num, col_num)] = seat
+            SeatLabel(
                 self.layout.current_x,
                 self.layout.current_y,
                 row_num,
                 col_num
-            ))
+            ).setParentItem(labels_layer)
             row_seats.append(seat)
             self.layout.current_x += self.layout.seat_size + self.layout.spacing
         return row_seats
 
+    def draw_grid(self, zona_nombre, categoria):
+        grid = SeatGridItem(
+            self.layout.spacing,
+            self.layout.current_y,
+            self.layout.seat_size,
+            self.layout.spacing,
+            zona_nombre,
+            categoria,
+            self.model
+        )
+        self.scene.addItem(grid)
+        self.seat_grids[(zona_nombre, categoria)] = grid
+        for _ in range(grid.rows):
+            self.layout.advance_row()
+
+    def find_seat(self, zona_nombre, categoria, fila, columna):
+        """Devuelve el asiento indicado o None si no existe"""
+        if not self.use_grid:
+            return self.seat_index.get((zona_nombre, categoria, fila, columna))
+        grid = self.seat_grids.get((zona_nombre, categoria))
+        if grid and 0 <= fila < grid.rows and 0 <= columna < grid.columns:
+            return SeatCell(grid, fila, columna)
+        return None
+
+    def seat_at(self, view_pos):
+        """Devuelve (zona, categoria, fila, columna) del asiento bajo el cursor"""
+        for item in self.items(view_pos):
+            if isinstance(item, Seat):
+                return item.zona, item.categoria, item.row, item.column
+            if isinstance(item, SeatGridItem):
+                seat = item.seat_at(item.mapFromScene(self.mapToScene(view_pos)))
+                if seat:
+                    return (item.zona, item.categoria) + seat
+        return None
+
     def find_seats_in_map(self, zona_nombre, categoria, asientos_list):
         found_seats = []
-        if zona_nombre in self.seats_map and categoria in self.seats_map[zona_nombre]:
-            for seat in self.seats_map[zona_nombre][categoria]:
-                for fila, columna in asientos_list:
-                    if seat.row == fila and seat.column == columna:
-                        found_seats.append(seat)
+        for fila, columna in asientos_list:
+            seat = self.find_seat(zona_nombre, categoria, fila, columna)
+            if seat:
+                found_seats.append(seat)
         return found_seats
 
+    def schedule_repaint(self, seats):
+        """Marca asientos para repintarlos en el próximo cuadro"""
+        self.dirty_seats.update(seats)
+        if self.dirty_seats and not self.repaint_timer.isActive():
+            self.repaint_timer.start(self.FRAME_INTERVAL_MS)
+
+    def flush_repaints(self):
+        """Aplica de una sola vez la apariencia de los asientos pendientes"""
+        dirty_seats, self.dirty_seats = self.dirty_seats, set()
+        for seat in dirty_seats:
+            seat.setup_appearance()
+        self.occupancy_changed.emit()
+
+    def refresh_seats(self, zona_nombre, categoria, filas, columnas):
+        """Programa el repintado de los asientos cuyo estado cambió en el modelo"""
+        # Los bloques que populate() todavía no dibujó toman el estado del modelo al crearse
+        summary = self.block_summaries.get((zona_nombre, categoria))
+        if len(filas) and summary and self.lod_tier == "bloques":
+            self.schedule_repaint([summary])
+        if self.use_grid:
+            grid = self.seat_grids.get((zona_nombre, categoria))
+            if len(filas) and grid:
+                self.schedule_repaint([grid])
+            return
+        seats = (
+            self.seat_index.get((zona_nombre, categoria, fila, columna))
+            for fila, columna in zip(filas.tolist(), columnas.tolist())
+        )
+        self.schedule_repaint(seat for seat in seats if seat)
+
     def reset_suggested_seats(self):
-        for zona in self.seats_map.values():
-            for categoria in zona.values():
-                for seat in categoria:
-                    if seat.state == "Sugerido":
-                        seat.update_state("Libre")
+        for zona_nombre, categoria, filas, columnas in self.model.replace_state("Sugerido", "Libre"):
+            self.refresh_seats(zona_nombre, categoria, filas, columnas)
 
     def highlight_seats(self, seats):
         self.reset_suggested_seats()
         for seat in seats:
-            seat.update_state("Sugerido")
+            seat.set_state("Sugerido")
+        self.schedule_repaint(seats)
 
+    @Metrics.timed("stadium_apply_seconds")
     def handle_updates(self, data):
+        if 'cambios' in data:
+            self.apply_delta(data)
+            return
+        # Un snapshot parcial trae bloques recién suscritos sin mover la versión:
+        # los deltas pendientes de los demás bloques siguen llegando en orden
+        if 'version' in data and not data.get('parcial'):
+            self.version = data['version']
+        stale = len(self.model.stale)
         for zona in data['zonas']:
-            zona_nombre = zona['nombre']
-            if zona_nombre in self.seats_map:
-                self.update_zone(zona_nombre, zona)
+            self.update_zone(zona['nombre'], zona)
+        if len(self.model.stale) != stale:
+            self.occupancy_changed.emit()
+
+    def apply_delta(self, delta):
+        """Aplica solo los asientos que cambiaron; si falta una versión intermedia
+        pide un snapshot y descarta los deltas hasta recibirlo"""
+        if self.version is not None and delta['version'] <= self.version:
+            return  # Ya reflejado en el modelo
+        if self.version is None or delta['desde'] != self.version:
+            self.resync_needed.emit()
+            return
+        for (zona_nombre, categoria), (filas, columnas, codes) in delta['cambios'].items():
+            if (zona_nombre, categoria) not in self.fingerprints:
+                continue
+            # El bloque ya no coincide con el último snapshot aplicado
+            self.fingerprints[(zona_nombre, categoria)] = None
+            filas, columnas = self.model.apply_changes(zona_nombre, categoria, filas, columnas, codes)
+            self.refresh_seats(zona_nombre, categoria, filas, columnas)
+        self.version = delta['version']
 
     def update_zone(self, zona_nombre, zona_data):
         for categoria_key, asientos in zona_data['categorias'].items():
             categoria = categoria_key
-            if categoria in self.seats_map[zona_nombre]:
+            if (zona_nombre, categoria) in self.fingerprints:
+                # Un bloque sin suscripción deja de estar al día con el próximo cambio
+                if self.is_subscribed((zona_nombre, categoria)):
+                    self.model.stale.discard((zona_nombre, categoria))
+                # Omitir bloques idénticos al último snapshot aplicado
+                fingerprint = SeatStateModel.fingerprint(asientos)
+                if self.fingerprints.get((zona_nombre, categoria)) == fingerprint:
+                    self.skipped_blocks += 1
+                    continue
+                self.fingerprints[(zona_nombre, categoria)] = fingerprint
                 self.update_category(zona_nombre, categoria, asientos)
 
     def update_category(self, zona_nombre, categoria, asientos_data):
-        seats_list = self.seats_map[zona_nombre][categoria]
-        for i, fila in enumerate(asientos_data):
-            for j, asiento_data in enumerate(fila):
-                seat = next((s for s in seats_list if s.row == i and s.column == j), None)
-                if seat:
-                    new_state = asiento_data['estado']
-                    if seat.state != new_state:
-                        seat.update_state(new_state)
+        filas, columnas = self.model.apply(zona_nombre, categoria, asientos_data)
+        self.refresh_seats(zona_nombre, categoria, filas, columnas)
+
+    def mousePressEvent(self, event):
+        self.press_pos = event.pos()
+        super().mousePressEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        # Un clic sin arrastre selecciona el asiento; arrastrar desplaza la vista
+        if self.press_pos is not None and (
+            (event.pos() - self.press_pos).manhattanLength() < QApplication.startDragDistance()
+        ):
+            seat = self.seat_at(event.pos())
+            if seat:
+                self.seat_clicked.emit(*seat)
+        self.press_pos = None
+
+    def update_level_of_detail(self):
+        """Elige qué se dibuja según la escala actual de la vista.
+
+        Muy lejos se ven bloques agregados por disponibilidad, a media
+        distancia los asientos sin texto y de cerca las etiquetas.
+        """
+        scale = self.transform().m11()
+        if scale < LOD_BLOCKS:
+            tier = "bloques"
+        elif scale < LOD_SEAT_LABELS:
+            tier = "asientos"
+        else:
+            tier = "etiquetas"
+        headers_visible = scale >= LOD_HEADERS
+        if tier == self.lod_tier and headers_visible == self.headers_visible:
+            return
+
+        if tier != self.lod_tier:
+            for summary in self.block_summaries.values():
+                if tier == "bloques":
+                    summary.setup_appearance()
+                summary.setVisible(tier == "bloques")
+            for grid in self.seat_grids.values():
+                grid.setVisible(tier != "bloques")
+            for seats_layer, labels_layer in self.seat_layers.values():
+                seats_layer.setVisible(tier != "bloques")
+                labels_layer.setVisible(tier == "etiquetas")
+        for label in self.header_labels:
+            label.setVisible(headers_visible)
+        self.lod_tier = tier
+        self.headers_visible = headers_visible
 
     def wheelEvent(self, event):
         """Maneja el evento de la rueda del mouse para zoom"""
@@ -347,45 +1647,326 @@ class StadiumView(QGraphicsView):
             self.scale(1.15, 1.15)
         else:
             self.scale(0.85, 0.85)
+        self.update_level_of_detail()
+        self.schedule_subscription_update()
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.schedule_subscription_update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_subscription_update()
 
 
 class WebSocketClient(QObject):
-    update_received = pyqtSignal(dict)
+    """Cliente WebSocket que decodifica los mensajes fuera del hilo de la GUI.
 
-    def __init__(self):
+    El servidor envía un snapshot al conectarse y luego deltas versionados.
+    Todo mensaje se decodifica en orden en un hilo aparte; mientras la vista
+    está ocupada, los deltas consecutivos se combinan en uno y un snapshot
+    reemplaza a todo lo pendiente.
+
+    Si la conexión se cae, reintenta con backoff exponencial con jitter y se
+    reanuda desde la versión que tiene la vista: el servidor envía solo los
+    deltas faltantes, o un snapshot si su historial ya no los cubre.
+
+    Con subscribe() el servidor envía solo los cambios de los bloques pedidos;
+    cada delta indica desde qué versión parte, ya que se omiten las versiones
+    sin cambios en esos bloques.
+    """
+
+    RECONNECT_BASE_S = 0.5
+    RECONNECT_MAX_S = 30.0
+
+    update_received = pyqtSignal(object)  # Snapshot (dict del estadio) o delta
+    decoded = pyqtSignal()
+    status_changed = pyqtSignal(str)  # Estado de la conexión para mostrar al usuario
+
+    def __init__(self, current_version=None):
         super().__init__()
+        self.current_version = current_version  # Función que devuelve la versión aplicada
+        self.subscription = None  # Bloques (zona, categoria) suscritos; None = todos
+        self.reconnects = 0
+        self.full_resyncs = 0  # Reconexiones que necesitaron un snapshot completo
+        self.last_reconnect_s = None  # Desde la caída hasta reconectar
+        self.last_resync_s = None  # Desde la caída hasta aplicar el primer mensaje
+        self.reconnect_attempt = 0
+        self.disconnected_at = None
+        self.resync_started = None
+        self.reconnect_timer = QTimer(self)
+        self.reconnect_timer.setSingleShot(True)
+        self.reconnect_timer.timeout.connect(self.open_socket)
+        self.received_messages = 0
+        self.received_bytes = 0
+        self.dropped_messages = 0  # Inválidos o pendientes reemplazados por un snapshot
+        self.merged_deltas = 0
+        self.delivered_messages = 0
+        self.resyncs = 0
+        self.resync_requested = False
+        self._pending_messages = deque()  # Mensajes (texto o bytes) sin decodificar
+        self._pending_updates = []  # Snapshots y deltas decodificados sin entregar
+        self._closing = False
+        self._condition = threading.Condition()
+        self.decoded.connect(self.deliver_update, Qt.QueuedConnection)
+        self._decoder = threading.Thread(target=self.decode_loop, name="ws-decoder", daemon=True)
+        self._decoder.start()
+        for name, attribute in (
+            ("stadium_ws_messages_total", "received_messages"),
+            ("stadium_ws_bytes_total", "received_bytes"),
+            ("stadium_ws_delivered_total", "delivered_messages"),
+            ("stadium_ws_merged_deltas_total", "merged_deltas"),
+            ("stadium_ws_dropped_messages_total", "dropped_messages"),
+            ("stadium_ws_resyncs_total", "resyncs"),
+            ("stadium_ws_reconnects_total", "reconnects"),
+        ):
+            Metrics.register(name, functools.partial(getattr, self, attribute), kind="counter")
+        Metrics.register("stadium_ws_queue_depth", lambda: self.queue_depth)
+
+        # Import diferido: QtWebSockets no hace falta para el primer pintado
+        from PyQt5.QtWebSockets import QWebSocket
         self.websocket = QWebSocket()
         self.websocket.error.connect(self.on_error)
         self.websocket.textMessageReceived.connect(self.on_message)
+        self.websocket.binaryMessageReceived.connect(self.on_binary_message)
         self.websocket.connected.connect(self.on_connected)
         self.websocket.disconnected.connect(self.on_disconnected)
-        self.websocket.open(QUrl("ws://127.0.0.1:8080/ws"))
+        self.open_socket()
+
+    def open_socket(self):
+        desde = self.current_version() if self.current_version else None
+        self.websocket.open(QUrl(StadiumAPI.websocket_url(desde)))
+
+    @property
+    def queue_depth(self):
+        """Cantidad de mensajes pendientes (sin decodificar o sin entregar)"""
+        with self._condition:
+            return len(self._pending_messages) + len(self._pending_updates)
 
     def on_connected(self):
+        StartupProfiler.mark("websocket conectado")
         print("Conectado al servidor WebSocket.")
+        self.reconnect_attempt = 0
+        self.resync_requested = False  # Un pedido anterior se perdió con la conexión
+        if self.disconnected_at is not None:
+            self.reconnects += 1
+            self.last_reconnect_s = time.monotonic() - self.disconnected_at
+            self.resync_started = self.disconnected_at
+            self.disconnected_at = None
+            self.status_changed.emit(
+                f"Reconectado en {self.last_reconnect_s:.1f} s ({self.reconnects} reconexiones)"
+            )
+        if self.subscription is not None:
+            self.send_subscription()  # La sesión nueva empieza suscrita a todo
 
     def on_disconnected(self):
         print("Desconectado del servidor WebSocket.")
+        if self.disconnected_at is None:
+            self.disconnected_at = time.monotonic()
+        self.schedule_reconnect()
+
+    def schedule_reconnect(self):
+        """Programa el próximo intento con backoff exponencial y jitter completo,
+        para que los kioscos no se reconecten todos a la vez"""
+        if self._closing or self.reconnect_timer.isActive():
+            return
+        limit = min(self.RECONNECT_MAX_S, self.RECONNECT_BASE_S * 2 ** self.reconnect_attempt)
+        delay = random.uniform(0, limit)
+        self.reconnect_attempt += 1
+        self.status_changed.emit(
+            f"Sin conexión en vivo: reintento {self.reconnect_attempt} en {delay:.1f} s"
+        )
+        self.reconnect_timer.start(int(delay * 1000))
+
+    def on_binary_message(self, message):
+        self.on_message(bytes(message))
 
     def on_message(self, message):
-        print("Mensaje recibido del WebSocket")
+        with self._condition:
+            self.received_messages += 1
+            self.received_bytes += len(message)
+            self._pending_messages.append(message)
+            self._condition.notify()
+
+    @staticmethod
+    @Metrics.timed("stadium_ws_decode_seconds")
+    def decode(message):
+        if isinstance(message, bytes):
+            return decode_binary_message(message)
         data = json.loads(message)
-        self.update_received.emit(data)
+        if "cambios" in data:
+            return normalize_delta(data["version"], (
+                (cambio["zona"], cambio["categoria"], cambio["fila"], cambio["asiento"],
+                 STATE_CODES.get(cambio["estado"], DESCONOCIDO))
+                for cambio in data["cambios"]
+            ), data.get("desde"))
+        return data
+
+    @staticmethod
+    def is_snapshot(data):
+        return "cambios" not in data and not data.get("parcial")
+
+    def decode_loop(self):
+        """Hilo decodificador: procesa los mensajes en el orden de llegada"""
+        while True:
+            with self._condition:
+                while not self._pending_messages and not self._closing:
+                    self._condition.wait()
+                if self._closing:
+                    return
+                message = self._pending_messages.popleft()
+
+            # Cualquier error de un mensaje lo descarta; el hilo nunca debe morir
+            try:
+                data = self.decode(message)
+                with self._condition:
+                    # Si ya había algo pendiente, su entrega ya está programada
+                    notify = not self._pending_updates
+                    self.queue_update(data)
+            except Exception as e:
+                print(f"Mensaje WebSocket inválido: {e!r}")
+                with self._condition:
+                    self.dropped_messages += 1
+                continue
+            if notify:
+                self.decoded.emit()
+
+    def queue_update(self, data):
+        """Agrega un mensaje decodificado a los pendientes (con el lock tomado)"""
+        updates = self._pending_updates
+        if self.is_snapshot(data):
+            self.dropped_messages += len(updates)
+            updates[:] = [data]
+        elif updates and "cambios" in updates[-1] and updates[-1]["version"] == data["desde"]:
+            updates[-1] = merge_deltas(updates[-1], data)
+            self.merged_deltas += 1
+        else:
+            updates.append(data)
+
+    def deliver_update(self):
+        with self._condition:
+            updates, self._pending_updates = self._pending_updates, []
+        for data in updates:
+            snapshot = self.is_snapshot(data)
+            if snapshot:
+                self.resync_requested = False
+            if self.resync_started is not None:
+                self.last_resync_s = time.monotonic() - self.resync_started
+                self.resync_started = None
+                if snapshot:
+                    self.full_resyncs += 1
+                self.status_changed.emit(
+                    f"Datos en vivo al día en {self.last_resync_s:.1f} s ("
+                    + ("snapshot completo" if snapshot else "reanudado con deltas")
+                    + ")"
+                )
+            self.delivered_messages += 1
+            self.update_received.emit(data)
+
+    def request_resync(self):
+        """Pide un snapshot completo, una sola vez hasta recibirlo"""
+        if self.resync_requested:
+            return
+        self.resync_requested = True
+        self.resyncs += 1
+        self.websocket.sendTextMessage(json.dumps({"tipo": "resync"}))
+
+    def subscribe(self, blocks):
+        """Pide solo los cambios de los bloques (zona, categoria) dados, o de
+        todos con None; se vuelve a enviar al reconectarse"""
+        self.subscription = None if blocks is None else set(blocks)
+        if self.websocket.isValid():
+            self.send_subscription()
+
+    def send_subscription(self):
+        bloques = None if self.subscription is None else sorted(self.subscription)
+        self.websocket.sendTextMessage(json.dumps({"tipo": "suscribir", "bloques": bloques}))
+
+    def close(self):
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self.reconnect_timer.stop()
+        self.websocket.close()
 
     def on_error(self, error):
         print(f"WebSocket error: {error}")
+        # Un intento fallido no siempre emite disconnected
+        if not self.websocket.isValid():
+            if self.disconnected_at is None:
+                self.disconnected_at = time.monotonic()
+            self.schedule_reconnect()
+
+
+class MetricsOverlay(QLabel):
+    """Tasa de mensajes WebSocket y latencia de aplicarlos, sobre la vista
+    (--metrics-overlay o STADIUM_METRICS_OVERLAY=1)"""
+
+    INTERVAL_MS = 1000
+
+    def __init__(self, view):
+        super().__init__(view.viewport())
+        self.view = view
+        self.last_time = time.monotonic()
+        self.last_messages = 0
+        self.last_apply = None
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background: rgba(0, 0, 0, 160); color: white; padding: 4px;")
+        self.move(8, 8)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(self.INTERVAL_MS)
+        self.refresh()
+
+    def refresh(self):
+        """Muestra los valores del último intervalo"""
+        now = time.monotonic()
+        elapsed = max(now - self.last_time, 1e-6)
+        self.last_time = now
+        client = self.view.websocket_client
+        messages = client.received_messages if client else 0
+        text = f"WS: {(messages - self.last_messages) / elapsed:.1f} msg/s"
+        self.last_messages = messages
+
+        apply = Metrics.histogram("stadium_apply_seconds")
+        if apply:
+            counts, total = apply
+            if self.last_apply:
+                last_counts, last_total = self.last_apply
+                counts_delta = [new - old for new, old in zip(counts, last_counts)]
+                total_delta = total - last_total
+            else:
+                counts_delta, total_delta = counts, total
+            self.last_apply = apply
+            applied = sum(counts_delta)
+            if applied:
+                # Cota superior del p95: el límite del bucket que lo contiene
+                target, cumulative = 0.95 * applied, 0
+                for bound, count in zip(list(Metrics.BUCKETS_S) + [float("inf")], counts_delta):
+                    cumulative += count
+                    if cumulative >= target:
+                        break
+                text += f" | aplicar: {total_delta / applied * 1000:.1f} ms prom., p95 ≤ {bound * 1000:g} ms"
+        self.setText(text)
+        self.adjustSize()
 
 
 class LegendWidget(QWidget):
     """Clase para el widget de la leyenda"""
 
-    def __init__(self):
+    def __init__(self, model=None):
         super().__init__()
+        self.model = model
         self.setup_legend()
 
     def setup_legend(self):
-        """Configura la leyenda de colores"""
-        layout = QHBoxLayout(self)
+        """Configura la leyenda de colores y la ocupación en vivo"""
+        main_layout = QVBoxLayout(self)
+        layout = QHBoxLayout()
+        main_layout.addLayout(layout)
+        self.occupancy_label = QLabel()
+        self.occupancy_label.setWordWrap(True)
+        main_layout.addWidget(self.occupancy_label)
         states = {
             "Libre": "green",
             "Reservado": "yellow",
@@ -400,137 +1981,86 @@ class LegendWidget(QWidget):
             label.setStyleSheet(f"color: {color}")
             layout.addWidget(label)
 
-## Plugin de pago
-class MetodoPago:
-    def iniciar_pago(self):
-        raise NotImplementedError
-
-    def validar_informacion(self):
-        raise NotImplementedError
-
-    def procesar_pago(self):
-        raise NotImplementedError
-
-
-class PagoTarjeta(MetodoPago):
-    def __init__(self):
-        self.detalles = {}
-
-    def iniciar_pago(self):
-        dialog = QDialog()
-        dialog.setWindowTitle("Pago con Tarjeta")
-        layout = QFormLayout(dialog)
-        self.numero_tarjeta = QLineEdit()
-        self.cvv = QLineEdit()
-        self.fecha_expiracion = QLineEdit()
-        layout.addRow("Número de Tarjeta:", self.numero_tarjeta)
-        layout.addRow("CVV:", self.cvv)
-        layout.addRow("Fecha de Expiración:", self.fecha_expiracion)
-        botones = QHBoxLayout()
-        boton_aceptar = QPushButton("Aceptar")
-        boton_aceptar.clicked.connect(dialog.accept)
-        boton_cancelar = QPushButton("Cancelar")
-        boton_cancelar.clicked.connect(dialog.reject)
-        botones.addWidget(boton_aceptar)
-        botones.addWidget(boton_cancelar)
-        layout.addRow(botones)
-        if dialog.exec_() == QDialog.Accepted:
-            self.detalles = {
-                "numero_tarjeta": self.numero_tarjeta.text(),
-                "cvv": self.cvv.text(),
-                "fecha_expiracion": self.fecha_expiracion.text()
-            }
-            return True
-        return False
-
-    def validar_informacion(self):
-        # Verificar que todos los campos tengan información
-        return all(self.detalles.values())
-
-    def procesar_pago(self):
-        # Llamar al servidor para procesar el pago
-        return StadiumAPI.procesar_pago("Tarjeta", self.detalles)
-
+    def update_occupancy(self):
+        """Muestra la ocupación por zona y categoría a partir de los contadores;
+        los bloques desactualizados se muestran con "?" y no cuentan en la zona"""
+        if self.model is None:
+            return
+        zonas = {}
+        for zona, categoria in self.model.counts:
+            zonas.setdefault(zona, []).append(categoria)
+        parts = []
+        for zona, categorias in zonas.items():
+            detalle = ", ".join(
+                f"{categoria} ?" if (zona, categoria) in self.model.stale
+                else f"{categoria} {self.model.occupancy(zona, categoria):.0%}"
+                for categoria in categorias
+            )
+            if all((zona, categoria) in self.model.stale for categoria in categorias):
+                total = "?"
+            else:
+                total = f"{self.model.occupancy(zona):.0%}"
+            parts.append(f"Zona {zona}: {total} ({detalle})")
+        self.occupancy_label.setText(" | ".join(parts))
 
-class PagoPayPal(MetodoPago):
-    def __init__(self):
-        self.detalles = {}
-
-    def iniciar_pago(self):
-        dialog = QDialog()
-        dialog.setWindowTitle("Pago con PayPal")
-        layout = QFormLayout(dialog)
-        self.email = QLineEdit()
-        self.password = QLineEdit()
-        layout.addRow("Email:", self.email)
-        layout.addRow("Contraseña:", self.password)
-        botones = QHBoxLayout()
-        boton_aceptar = QPushButton("Aceptar")
-        boton_aceptar.clicked.connect(dialog.accept)
-        boton_cancelar = QPushButton("Cancelar")
-        boton_cancelar.clicked.connect(dialog.reject)
-        botones.addWidget(boton_aceptar)
-        botones.addWidget(boton_cancelar)
-        layout.addRow(botones)
-        if dialog.exec_() == QDialog.Accepted:
-            self.detalles = {
-                "email": self.email.text(),
-                "password": self.password.text(),
-            }
-            return True
-        return False
 
-    def validar_informacion(self):
-        # Verificar que todos los campos tengan información
-        return all(self.detalles.values())
+class CountdownTicker(QObject):
+    """Un único QTimer de 1 s compartido por todas las cuentas regresivas;
+    corre sólo mientras haya alguna suscrita"""
 
-    def procesar_pago(self):
-        # Llamar al servidor para procesar el pago
-        return StadiumAPI.procesar_pago("PayPal", self.detalles)
+    INTERVAL_MS = 1000
+    tick = pyqtSignal()
+    _instance = None
 
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
 
-class PagoCripto(MetodoPago):
     def __init__(self):
-        self.detalles = {}
-
-    def iniciar_pago(self):
-        dialog = QDialog()
-        dialog.setWindowTitle("Pago con Criptomoneda")
-        layout = QFormLayout(dialog)
-        self.wallet_address = QLineEdit()
-        layout.addRow("Dirección de Wallet:", self.wallet_address)
-        botones = QHBoxLayout()
-        boton_aceptar = QPushButton("Aceptar")
-        boton_aceptar.clicked.connect(dialog.accept)
-        boton_cancelar = QPushButton("Cancelar")
-        boton_cancelar.clicked.connect(dialog.reject)
-        botones.addWidget(boton_aceptar)
-        botones.addWidget(boton_cancelar)
-        layout.addRow(botones)
-        if dialog.exec_() == QDialog.Accepted:
-            self.detalles = {
-                "wallet_address": self.wallet_address.text(),
-            }
-            return True
-        return False
-
-    def validar_informacion(self):
-        # Verificar que todos los campos tengan información
-        return all(self.detalles.values())
-
-    def procesar_pago(self):
-        # Llamar al servidor para procesar el pago
-        return StadiumAPI.procesar_pago("Criptomoneda", self.detalles)
+        super().__init__()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+        self.subscribers = set()
+
+    def subscribe(self, slot):
+        if slot not in self.subscribers:
+            self.subscribers.add(slot)
+            self.tick.connect(slot)
+        if not self.timer.isActive():
+            self.timer.start(self.INTERVAL_MS)
+
+    def unsubscribe(self, slot):
+        if slot in self.subscribers:
+            self.subscribers.discard(slot)
+            self.tick.disconnect(slot)
+        if not self.subscribers:
+            self.timer.stop()
 
 
 class SearchControls(QWidget):
+    MAX_GROUP_SIZE = 50
+    HOLD_SECONDS = 300  # Duración de la reserva si el servidor no informa expira_en_s
+    # Método de pago -> clase del módulo pagos
+    METODOS_PAGO = {
+        "Tarjeta": "PagoTarjeta",
+        "PayPal": "PagoPayPal",
+        "Criptomoneda": "PagoCripto",
+    }
+
     def __init__(self, stadium_view):
         super().__init__()
         self.stadium_view = stadium_view
         self.setup_ui()
         self.reserva_id = None
         self.asientos_sugeridos = []
-        self.timer = None
+        self.hold_deadline = None  # time.monotonic() en que vence la reserva
+        self.purchase_in_progress = False  # Pago o confirmación en curso: no se cancelan
+        self.expired_during_purchase = False
+        self.pending_call = None  # Llamada a la API en curso
+        self.saved_buttons = []
+        self.lote = []  # Grupos de la venta por lotes: {"categoria", "cantidad"}
 
     def setup_ui(self):
         layout = QHBoxLayout(self)
@@ -538,14 +2068,19 @@ class SearchControls(QWidget):
         # Combo para categorías
         self.categoria_combo = QComboBox()
         self.categoria_combo.addItems(["VIP", "Regular", "Sol", "Platea"])
+        # La categoría elegida se mantiene al día aunque no esté en pantalla
+        self.categoria_combo.currentTextChanged.connect(
+            lambda categoria: self.stadium_view.set_pinned_categories([categoria])
+        )
+        self.stadium_view.set_pinned_categories([self.categoria_combo.currentText()])
         layout.addWidget(QLabel("Categoría:"))
         layout.addWidget(self.categoria_combo)
 
-        # Combo para cantidad de asientos
-        self.cantidad_combo = QComboBox()
-        self.cantidad_combo.addItems(["1", "2", "3"])
+        # Cantidad de asientos del grupo
+        self.cantidad_spin = QSpinBox()
+        self.cantidad_spin.setRange(1, self.MAX_GROUP_SIZE)
         layout.addWidget(QLabel("Cantidad de asientos:"))
-        layout.addWidget(self.cantidad_combo)
+        layout.addWidget(self.cantidad_spin)
 
         # Combo para método de pago
         self.metodo_pago_combo = QComboBox()
@@ -558,6 +2093,19 @@ class SearchControls(QWidget):
         self.search_button.clicked.connect(self.search_seats)
         layout.addWidget(self.search_button)
 
+        # Venta por lotes: acumula grupos y los reserva en una sola solicitud
+        self.batch_add_button = QPushButton("Agregar al lote")
+        self.batch_add_button.clicked.connect(self.add_to_batch)
+        layout.addWidget(self.batch_add_button)
+        self.batch_reserve_button = QPushButton("Reservar lote")
+        self.batch_reserve_button.clicked.connect(self.reserve_batch)
+        self.batch_reserve_button.setEnabled(False)
+        layout.addWidget(self.batch_reserve_button)
+        self.batch_partial_check = QCheckBox("Permitir lote parcial")
+        layout.addWidget(self.batch_partial_check)
+        self.batch_label = QLabel()
+        layout.addWidget(self.batch_label)
+
         # Botón para reservar asientos
         self.reserve_button = QPushButton("Reservar")
         self.reserve_button.clicked.connect(self.reserve_seats)
@@ -576,24 +2124,63 @@ class SearchControls(QWidget):
         self.cancel_button.setEnabled(False)
         layout.addWidget(self.cancel_button)
 
+        # Tiempo que le queda a la reserva
+        self.countdown_label = QLabel()
+        layout.addWidget(self.countdown_label)
+
+        # Estado de la solicitud en curso
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
         layout.addStretch()
 
+    def start_request(self, call, message, cancellable=True):
+        """Deshabilita las acciones mientras hay una solicitud en curso"""
+        self.pending_call = call
+        action_buttons = [
+            self.search_button, self.reserve_button, self.confirm_button, self.cancel_button,
+            self.batch_add_button, self.batch_reserve_button,
+        ]
+        self.saved_buttons = [(button, button.isEnabled()) for button in action_buttons]
+        for button in action_buttons:
+            button.setEnabled(False)
+        self.cancel_button.setEnabled(cancellable)
+        self.status_label.setText(message)
+
+    def finish_request(self):
+        """Restaura las acciones al terminar la solicitud en curso"""
+        self.pending_call = None
+        for button, enabled in self.saved_buttons:
+            button.setEnabled(enabled)
+        self.saved_buttons = []
+        self.status_label.clear()
+
     def search_seats(self):
         categoria = self.categoria_combo.currentText()
-        cantidad = int(self.cantidad_combo.currentText())
+        cantidad = self.cantidad_spin.value()
+
+        if self.stadium_view.model.blocks and self.stadium_view.is_live(categoria):
+            # Buscar sobre el estado local; la reserva lo confirma con el servidor
+            candidatos = self.stadium_view.model.search_consecutive(categoria, cantidad)
+            self.show_search_result(candidatos[0] if candidatos else None)
+            return
 
-        # Usar la API para buscar asientos
-        result = StadiumAPI.buscar_asientos(categoria, cantidad)
+        # Sin estado local, usar la API sin bloquear la interfaz
+        call = AsyncStadiumAPI.buscar_asientos(categoria, cantidad, callback=self.on_search_result)
+        self.start_request(call, "Buscando asientos...")
 
+    def on_search_result(self, result):
+        self.finish_request()
+        self.show_search_result(result)
+
+    def show_search_result(self, result):
         if result:
             # Encontrar los asientos en el mapa y resaltarlos
             zona = result['zona']
             categoria = result['categoria']
-            asientos_encontrados = []
-
-            for fila, columna in result['asientos']:
-                seats = self.stadium_view.find_seats_in_map(zona, categoria, [(fila, columna)])
-                asientos_encontrados.extend(seats)
+            asientos_encontrados = self.stadium_view.find_seats_in_map(
+                zona, categoria, [(fila, columna) for fila, columna in result['asientos']]
+            )
 
             if asientos_encontrados:
                 self.stadium_view.highlight_seats(asientos_encontrados)
@@ -611,120 +2198,474 @@ class SearchControls(QWidget):
 
     def reserve_seats(self):
         # Reservar asientos temporalmente
-        reserva = StadiumAPI.reservar_asientos_temporalmente(
-            self.zona_reservada, self.categoria_reservada, self.asientos_sugeridos
+        call = AsyncStadiumAPI.reservar_asientos_temporalmente(
+            self.zona_reservada, self.categoria_reservada, self.asientos_sugeridos,
+            callback=self.on_reserve_result,
         )
+        # Si se cancela mientras tanto, liberar la reserva que llegue tarde
+        call.discarded.connect(self.release_late_reservation)
+        self.start_request(call, "Reservando asientos...")
+
+    def on_reserve_result(self, reserva):
+        self.finish_request()
         if reserva and 'reserva_id' in reserva:
             self.reserva_id = reserva['reserva_id']
             self.confirm_button.setEnabled(True)
             self.cancel_button.setEnabled(True)
             self.reserve_button.setEnabled(False)
-            self.start_timer()
+            self.start_timer(reserva.get('expira_en_s'))
         else:
             self.reserva_id = None
             self.asientos_sugeridos = []
             QMessageBox.warning(self, "Error", "No se pudieron reservar los asientos.")
 
-    def start_timer(self):
-        # Iniciar temporizador de 5 minutos
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.expire_reservation)
-        self.timer.start(300000)  # 5 minutos en milisegundos
+    def add_to_batch(self):
+        self.lote.append({
+            "categoria": self.categoria_combo.currentText(),
+            "cantidad": self.cantidad_spin.value(),
+        })
+        self.update_batch_label()
+        self.batch_reserve_button.setEnabled(self.reserva_id is None)
+        self.cancel_button.setEnabled(True)
+
+    def update_batch_label(self):
+        if self.lote:
+            asientos = sum(grupo["cantidad"] for grupo in self.lote)
+            self.batch_label.setText(f"Lote: {len(self.lote)} grupos, {asientos} asientos")
+        else:
+            self.batch_label.clear()
+
+    def reserve_batch(self):
+        """Busca y reserva todos los grupos del lote en una sola solicitud; el
+        servidor los deja en una reserva que se confirma o cancela como las demás"""
+        call = AsyncStadiumAPI.reservar_grupos(
+            self.lote, self.batch_partial_check.isChecked(), callback=self.on_batch_result
+        )
+        call.discarded.connect(self.release_late_reservation)
+        self.start_request(call, f"Reservando {len(self.lote)} grupos...")
+
+    def on_batch_result(self, result):
+        self.finish_request()
+        if not result:
+            QMessageBox.warning(self, "Error", "No se pudo reservar el lote.")
+            return
+        errores = [
+            f"Grupo {indice} ({grupo['categoria']} x{grupo['cantidad']}): {resultado.get('error')}"
+            for indice, (grupo, resultado) in enumerate(zip(self.lote, result["grupos"]), start=1)
+            if not resultado["ok"]
+        ]
+        if not result.get("reserva_id"):
+            QMessageBox.warning(self, "Lote no reservado", "\n".join(errores))
+            return
+
+        asientos = []
+        for resultado in result["grupos"]:
+            if resultado["ok"]:
+                asientos += self.stadium_view.find_seats_in_map(
+                    resultado["zona"], resultado["categoria"],
+                    [(fila, columna) for fila, columna in resultado["asientos"]],
+                )
+        self.stadium_view.highlight_seats(asientos)
+        self.reserva_id = result["reserva_id"]
+        self.lote = []
+        self.update_batch_label()
+        self.batch_reserve_button.setEnabled(False)
+        self.reserve_button.setEnabled(False)
+        self.confirm_button.setEnabled(True)
+        self.cancel_button.setEnabled(True)
+        self.start_timer(result.get("expira_en_s"))
+        if errores:
+            QMessageBox.information(
+                self, "Lote reservado en parte", "No se reservaron:\n" + "\n".join(errores)
+            )
+
+    def release_late_reservation(self, reserva):
+        if reserva and 'reserva_id' in reserva:
+            AsyncStadiumAPI.cancelar_reserva(reserva['reserva_id'])
+
+    def start_timer(self, expira_en_s=None):
+        """Cuenta regresiva hasta el vencimiento que informó el servidor"""
+        seconds = expira_en_s if expira_en_s is not None else self.HOLD_SECONDS
+        self.hold_deadline = time.monotonic() + seconds
+        self.expired_during_purchase = False
+        CountdownTicker.instance().subscribe(self.update_countdown)
+        self.update_countdown()
+
+    def stop_timer(self):
+        CountdownTicker.instance().unsubscribe(self.update_countdown)
+        self.hold_deadline = None
+        self.countdown_label.clear()
+
+    def update_countdown(self):
+        if self.hold_deadline is None:
+            return
+        remaining = self.hold_deadline - time.monotonic()
+        if remaining <= 0:
+            self.expire_reservation()
+            return
+        minutes, seconds = divmod(int(remaining + 0.999), 60)
+        self.countdown_label.setText(f"Reserva vence en {minutes}:{seconds:02d}")
 
     def expire_reservation(self):
+        self.stop_timer()
+        if self.purchase_in_progress:
+            # El cobro pudo haberse hecho: decide la respuesta del servidor
+            self.expired_during_purchase = True
+            return
+        if self.pending_call:
+            self.pending_call.cancel()
+            self.finish_request()
         # Notificar al usuario que la reserva ha expirado
         QMessageBox.information(self, "Reserva expirada", "Su reserva ha expirado.")
         self.stadium_view.reset_suggested_seats()
         self.confirm_button.setEnabled(False)
         self.cancel_button.setEnabled(False)
         self.reserve_button.setEnabled(False)
-        self.timer.stop()
         self.reserva_id = None
 
     def confirm_purchase(self):
-        # Iniciar proceso de pago
+        # Iniciar proceso de pago; los plugins se cargan recién aquí
         metodo_seleccionado = self.metodo_pago_combo.currentText()
-        if metodo_seleccionado == "Tarjeta":
-            metodo_pago = PagoTarjeta()
-        elif metodo_seleccionado == "PayPal":
-            metodo_pago = PagoPayPal()
-        else:
-            metodo_pago = PagoCripto()
+        pagos = importlib.import_module("pagos")
+        clase = getattr(pagos, self.METODOS_PAGO.get(metodo_seleccionado, "PagoCripto"))
+        metodo_pago = clase(StadiumAPI)
 
         if metodo_pago.iniciar_pago() and metodo_pago.validar_informacion():
-            pago_result = metodo_pago.procesar_pago()
-            if pago_result and pago_result.get('aprobado'):
-                # Confirmar compra en el servidor
-                confirmacion = StadiumAPI.confirmar_compra(self.reserva_id)
-                if confirmacion:
-                    QMessageBox.information(self, "Compra exitosa", "Su compra ha sido confirmada.")
-                    self.stadium_view.reset_suggested_seats()
-                    self.confirm_button.setEnabled(False)
-                    self.cancel_button.setEnabled(False)
-                    self.reserve_button.setEnabled(False)
-                    if self.timer:
-                        self.timer.stop()
-                    self.reserva_id = None
-                else:
-                    QMessageBox.warning(self, "Error", "No se pudo confirmar la compra.")
-            else:
-                QMessageBox.warning(self, "Pago rechazado", "El pago ha sido rechazado.")
+            call = AsyncStadiumAPI.call(metodo_pago.procesar_pago, callback=self.on_payment_result)
+            # Un pago enviado no se abandona: el cobro podría hacerse igual
+            self.purchase_in_progress = True
+            self.start_request(call, "Procesando pago...", cancellable=False)
         else:
             QMessageBox.warning(self, "Datos inválidos", "La información de pago es inválida.")
 
+    def on_payment_result(self, pago_result):
+        if pago_result and pago_result.get('aprobado'):
+            # Confirmar compra en el servidor; ya no se puede cancelar
+            self.pending_call = AsyncStadiumAPI.confirmar_compra(
+                self.reserva_id, callback=self.on_confirm_result
+            )
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("Confirmando compra...")
+        else:
+            self.purchase_in_progress = False
+            self.finish_request()
+            QMessageBox.warning(self, "Pago rechazado", "El pago ha sido rechazado.")
+            if self.expired_during_purchase:
+                self.expire_reservation()
+
+    def on_confirm_result(self, confirmacion):
+        self.purchase_in_progress = False
+        self.finish_request()
+        if confirmacion:
+            QMessageBox.information(self, "Compra exitosa", "Su compra ha sido confirmada.")
+            self.stadium_view.reset_suggested_seats()
+            self.confirm_button.setEnabled(False)
+            self.cancel_button.setEnabled(False)
+            self.reserve_button.setEnabled(False)
+            self.stop_timer()
+            self.reserva_id = None
+        else:
+            QMessageBox.warning(self, "Error", "No se pudo confirmar la compra.")
+            if self.expired_during_purchase:
+                self.expire_reservation()
+
     def cancel_purchase(self):
+        # Abandonar la solicitud en curso, si la hay
+        if self.pending_call:
+            self.pending_call.cancel()
+            self.finish_request()
+
         # Enviar solicitud al servidor para cancelar la reserva
         if self.reserva_id:
-            cancelacion = StadiumAPI.cancelar_reserva(self.reserva_id)
-            if cancelacion:
-                QMessageBox.information(self, "Reserva cancelada", "La reserva ha sido cancelada.")
-            else:
-                QMessageBox.warning(self, "Error", "No se pudo cancelar la reserva.")
+            AsyncStadiumAPI.cancelar_reserva(self.reserva_id, callback=self.on_cancel_result)
             self.reserva_id = None
 
-        # Restablecer los asientos sugeridos
+        # Restablecer los asientos sugeridos y el lote
         self.stadium_view.reset_suggested_seats()
+        self.lote = []
+        self.update_batch_label()
+        self.batch_reserve_button.setEnabled(False)
         self.confirm_button.setEnabled(False)
         self.cancel_button.setEnabled(False)
         self.reserve_button.setEnabled(False)
-        if self.timer:
-            self.timer.stop()
+        self.stop_timer()
+
+    def on_cancel_result(self, cancelacion):
+        if cancelacion:
+            QMessageBox.information(self, "Reserva cancelada", "La reserva ha sido cancelada.")
+        else:
+            QMessageBox.warning(self, "Error", "No se pudo cancelar la reserva.")
+
+
+class SnapshotCache:
+    """Caché en disco del último estado del estadio para arrancar en caliente.
+
+    Cada servidor tiene su archivo, con las matrices de códigos comprimidas
+    (NumPy .npz) y metadatos; también lleva la cuenta de aciertos y fallos.
+    """
+
+    FORMAT_VERSION = 1
+    DIRECTORY = os.environ.get(
+        "STADIUM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "estadio")
+    )
+
+    def __init__(self, base_url, directory=None):
+        self.directory = directory or self.DIRECTORY
+        key = hashlib.sha1(f"{base_url}|v{self.FORMAT_VERSION}".encode()).hexdigest()[:16]
+        self.path = os.path.join(self.directory, f"snapshot-{key}.npz")
+        self.stats_path = os.path.join(self.directory, "stats.json")
+        self.base_url = base_url
+        self.stats = self.load_stats()
+
+    def load_stats(self):
+        try:
+            with open(self.stats_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"hits": 0, "misses": 0, "stale_seats": 0, "last_age_s": None}
+
+    def save_stats(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.stats_path, "w", encoding="utf-8") as f:
+                json.dump(self.stats, f)
+        except OSError as e:
+            print(f"No se pudieron guardar las estadísticas del caché: {e}")
+
+    def load(self):
+        """Devuelve (estadio, antigüedad en segundos) o None si no hay caché válido"""
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(data["meta"].tobytes().decode())
+                if meta.get("format") != self.FORMAT_VERSION or meta.get("server") != self.base_url:
+                    raise ValueError("Caché de otra versión o servidor")
+                zonas = {}
+                for i, (zona, categoria) in enumerate(meta["blocks"]):
+                    zonas.setdefault(zona, {})[categoria] = data[f"b{i}"]
+        except (OSError, KeyError, ValueError) as e:
+            self.stats["misses"] += 1
+            self.save_stats()
+            if not isinstance(e, FileNotFoundError):
+                print(f"Caché inválido, se ignora: {e}")
+            return None
+
+        age = time.time() - meta["saved_at"]
+        self.stats["hits"] += 1
+        self.stats["last_age_s"] = round(age, 1)
+        self.save_stats()
+        estadio = {
+            "zonas": [{"nombre": zona, "categorias": categorias} for zona, categorias in zonas.items()]
+        }
+        if meta.get("version") is not None:
+            estadio["version"] = meta["version"]
+        if meta.get("stale"):
+            estadio["stale"] = [tuple(key) for key in meta["stale"]]
+        return estadio, age
+
+    def save(self, estadio):
+        """Guarda un estadio (JSON del servidor o SeatStateModel.snapshot()).
+
+        "version" es la versión del servidor que refleja y "stale" la lista de
+        bloques (zona, categoria) que no están al día con esa versión.
+        """
+        blocks = []
+        arrays = {}
+        for zona in estadio["zonas"]:
+            for categoria, asientos in zona["categorias"].items():
+                arrays[f"b{len(blocks)}"] = SeatStateModel.encode(asientos)
+                blocks.append((zona["nombre"], categoria))
+        meta = {
+            "format": self.FORMAT_VERSION,
+            "server": self.base_url,
+            "version": estadio.get("version"),
+            "stale": [list(key) for key in estadio.get("stale", ())],
+            "saved_at": time.time(),
+            "blocks": blocks,
+        }
+        arrays["meta"] = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"No se pudo guardar el caché: {e}")
+
+    def record_staleness(self, stale_seats):
+        self.stats["stale_seats"] = stale_seats
+        self.save_stats()
 
 
 class StadiumWindow(QMainWindow):
-    def __init__(self, estadio):
+    def __init__(self, estadio=None, cache=None, stale_age=None):
         super().__init__()
+        self.cache = cache
+        self.stale = stale_age is not None
+        self.pending_estadio = None  # Estadio a dibujar después del primer pintado
         self.setup_window()
-        self.setup_ui(estadio)
+        self.setup_ui()
+        if estadio is not None:
+            self.set_estadio(estadio)
+        else:
+            self.statusBar().showMessage("Cargando el estadio...")
+        if self.stale:
+            self.setWindowTitle("Estructura del Estadio (datos en caché)")
+            self.statusBar().showMessage(
+                f"Mostrando datos en caché de hace {stale_age:.0f} s; conectando con el servidor..."
+            )
 
     def setup_window(self):
         self.setWindowTitle("Estructura del Estadio")
         self.setGeometry(100, 100, 1000, 800)
 
-    def setup_ui(self, estadio):
+    def setup_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
 
-        # Crear la vista del estadio
-        self.stadium_view = StadiumView(estadio)
+        # Crear la vista del estadio; la escena se construye después de mostrarla
+        self.stadium_view = StadiumView()
+        self.stadium_view.first_painted.connect(self.start_deferred, Qt.QueuedConnection)
+        self.stadium_view.connection_status.connect(lambda message: self.statusBar().showMessage(message, 10000))
 
         # Agregar controles de búsqueda
         self.search_controls = SearchControls(self.stadium_view)
         layout.addWidget(self.search_controls)
-        layout.addWidget(LegendWidget())
+        if Metrics.overlay:
+            self.metrics_overlay = MetricsOverlay(self.stadium_view)
+        self.legend = LegendWidget(self.stadium_view.model)
+        self.legend.update_occupancy()
+        self.stadium_view.occupancy_changed.connect(self.legend.update_occupancy)
+        layout.addWidget(self.legend)
         layout.addWidget(self.stadium_view)
 
+    def set_estadio(self, estadio):
+        """Carga el modelo y dibuja la escena, o la deja pendiente si la
+        ventana aún no se pintó"""
+        self.stadium_view.load_model(estadio)
+        self.pending_estadio = estadio
+        if self.stadium_view.painted:
+            self.start_deferred()
+
+    def start_deferred(self):
+        """Trabajo diferido hasta después del primer pintado de la ventana"""
+        if self.pending_estadio is not None:
+            estadio, self.pending_estadio = self.pending_estadio, None
+            self.stadium_view.populate_scene(estadio)
+            self.stadium_view.start_live_updates()
+
+    def load_initial(self, estadio):
+        """Recibe la estructura cuando no había caché"""
+        if not estadio:
+            QApplication.instance().quit()
+            return
+        self.statusBar().clearMessage()
+        self.set_estadio(estadio)
+        if self.cache:
+            self.cache.save(estadio)
+
+    def reconcile(self, estadio):
+        """Reemplaza los datos en caché por el snapshot recibido del servidor"""
+        if not estadio:
+            self.statusBar().showMessage("Sin conexión con el servidor: mostrando datos en caché")
+            return
+
+        view = self.stadium_view
+        live_structure = {
+            (zona["nombre"], categoria): SeatStateModel.encode(asientos).shape
+            for zona in estadio["zonas"]
+            for categoria, asientos in zona["categorias"].items()
+        }
+        websocket_ahead = (
+            view.websocket_client is not None
+            and view.websocket_client.delivered_messages > 0
+            and (
+                estadio.get("version") is None
+                or (view.version is not None and estadio["version"] < view.version)
+            )
+        )
+        if live_structure != view.model.structure():
+            stale_seats = None
+            self.set_estadio(estadio)
+        elif websocket_ahead:
+            # El WebSocket ya entregó un estado más nuevo que esta respuesta; los
+            # bloques del caché que no recibieron deltas necesitan un snapshot
+            stale_seats = 0
+            if any(view.is_subscribed(key) for key in view.model.stale):
+                view.websocket_client.request_resync()
+        else:
+            before = view.model.snapshot()
+            view.handle_updates(estadio)
+            after = view.model.snapshot()
+            stale_seats = sum(
+                int(np.count_nonzero(antes != despues))
+                for zona_antes, zona_despues in zip(before["zonas"], after["zonas"])
+                for antes, despues in zip(
+                    zona_antes["categorias"].values(), zona_despues["categorias"].values()
+                )
+            )
+
+        self.stale = False
+        self.setWindowTitle("Estructura del Estadio")
+        if stale_seats is None:
+            message = "Datos actualizados (la estructura del estadio cambió)"
+        else:
+            message = f"Datos actualizados: {stale_seats} asientos estaban desactualizados en el caché"
+        self.statusBar().showMessage(message, 10000)
+        print(message)
+        if self.cache:
+            self.cache.record_staleness(stale_seats)
+            self.cache.save(estadio)
+
+    def closeEvent(self, event):
+        if self.cache and not self.stale:
+            view = self.stadium_view
+            snapshot = view.model.snapshot()
+            snapshot["version"] = view.version
+            snapshot["stale"] = sorted(view.model.stale)
+            self.cache.save(snapshot)
+        if self.stadium_view.websocket_client:
+            self.stadium_view.websocket_client.close()  # Sin reintentos al salir
+        super().closeEvent(event)
+
 
 def main():
     """Función principal de la aplicación"""
     app = QApplication(sys.argv)
-    estadio = StadiumAPI.get_stadium_structure()
-
-    if estadio:
-        window = StadiumWindow(estadio)
-        window.show()
-        sys.exit(app.exec_())
+    StartupProfiler.mark("QApplication")
+    if Metrics.enabled:
+        Metrics.start()
+        app.aboutToQuit.connect(Metrics.dump)
+    started = time.perf_counter()
+    cache = SnapshotCache(StadiumAPI.BASE_URL)
+    cached = cache.load()
+    StartupProfiler.mark("caché", started)
+    started = time.perf_counter()
+
+    def on_structure(estadio):
+        StartupProfiler.mark("estructura del servidor", started)
+        if cached:
+            window.reconcile(estadio)
+        else:
+            window.load_initial(estadio)
+
+    # La ventana se muestra antes de pedir la estructura; la escena se
+    # construye después del primer pintado y el WebSocket se conecta al final
+    if cached:
+        # Mostrar el caché de inmediato y reconciliar con el servidor en segundo plano
+        estadio, age = cached
+        print(
+            f"Caché: acierto (antigüedad {age:.0f} s; "
+            f"{cache.stats['hits']} aciertos, {cache.stats['misses']} fallos)"
+        )
+        window = StadiumWindow(estadio, cache, stale_age=age)
+    else:
+        print(f"Caché: fallo ({cache.stats['hits']} aciertos, {cache.stats['misses']} fallos)")
+        window = StadiumWindow(cache=cache)
+    window.show()
+    AsyncStadiumAPI.get_stadium_structure(callback=on_structure)
+    sys.exit(app.exec_())
 
 
 if __name__ == "__main__":
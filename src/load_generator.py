@@ -0,0 +1,375 @@
+"""Generador de carga sin interfaz gráfica para el servidor del estadio.
+
+Simula N compradores concurrentes que recorren el mismo flujo que
+SearchControls: buscar_asientos -> reservar_asientos_temporalmente ->
+procesar_pago -> confirmar_compra / cancelar_reserva. Reporta percentiles
+de latencia por endpoint, throughput, tasas de conflicto/rechazo y el
+retraso de difusión por WebSocket.
+
+Ejemplo:
+    python src/load_generator.py --buyers 50 --duration 30 --abandon 0.2
+"""
+
+import argparse
+import ipaddress
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+import requests
+
+import httputil
+import wsutil
+from httputil import HttpTransport
+
+
+def parse_weights(text, cast=str):
+    """Convierte "VIP=1,Sol=3" en ([VIP, Sol], [1.0, 3.0])"""
+    values, weights = [], []
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        values.append(cast(name.strip()))
+        weights.append(float(weight or 1))
+    return values, weights
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def ensure_local(url):
+    """Rechaza servidores que no estén en la máquina local"""
+    host = urlsplit(url).hostname
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except socket.gaierror as e:
+        raise SystemExit(f"No se pudo resolver {host}: {e}")
+    if not all(ipaddress.ip_address(address).is_loopback for address in addresses):
+        raise SystemExit(f"El generador de carga solo corre contra un backend local, no {host}")
+
+
+class Stats:
+    """Resultados compartidos entre los hilos de compradores"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)  # endpoint -> segundos
+        self.outcomes = defaultdict(lambda: defaultdict(int))  # endpoint -> resultado -> cantidad
+        self.journeys = defaultdict(int)  # resultado del recorrido -> cantidad
+        self.mutations = []  # (inicio, zona, categoria, asientos, estado) de cada cambio exitoso
+
+    def record(self, endpoint, elapsed, outcome):
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            self.outcomes[endpoint][outcome] += 1
+
+    def record_journey(self, outcome):
+        with self.lock:
+            self.journeys[outcome] += 1
+
+    def record_mutation(self, started, zona, categoria, asientos, estado):
+        with self.lock:
+            self.mutations.append((started, zona, categoria, asientos, estado))
+
+
+class Buyer(threading.Thread):
+    """Comprador simulado con su propio pool de conexiones"""
+
+    def __init__(self, args, stats, deadline, seed):
+        super().__init__(daemon=True)
+        self.args = args
+        self.stats = stats
+        self.deadline = deadline
+        self.random = random.Random(seed)
+        self.transport = HttpTransport(args.url, pool_size=1)
+        self.categorias, self.categoria_weights = parse_weights(args.mix)
+        self.sizes, self.size_weights = parse_weights(args.groups, int)
+
+    def call(self, path, payload):
+        """Hace una solicitud con la misma forma que StadiumAPI y la registra"""
+        started = time.perf_counter()
+        try:
+            response = self.transport.request(
+                "POST",
+                path,
+                json=payload,
+                timeout=httputil.TIMEOUTS.get(path, httputil.DEFAULT_TIMEOUT),
+            )
+        except requests.HTTPError as e:
+            status = e.response.status_code
+            outcome = {400: "conflicto", 404: "sin_asientos"}.get(status, f"http_{status}")
+            self.stats.record(path, time.perf_counter() - started, outcome)
+            return started, None
+        except requests.RequestException:
+            self.stats.record(path, time.perf_counter() - started, "error")
+            return started, None
+        self.stats.record(path, time.perf_counter() - started, "ok")
+        return started, response
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            self.stats.record_journey(self.journey())
+            if self.args.think_time:
+                time.sleep(self.random.uniform(0, self.args.think_time))
+        self.transport.close()
+
+    def journey(self):
+        categoria = self.random.choices(self.categorias, self.categoria_weights)[0]
+        cantidad = self.random.choices(self.sizes, self.size_weights)[0]
+
+        _, response = self.call("/buscar_asientos", {"categoria": categoria, "cantidad": cantidad})
+        if response is None:
+            return "sin_asientos"
+        result = response.json()
+        seats = (result["zona"], result["categoria"], result["asientos"])
+
+        started, response = self.call("/reservar_asientos_temporalmente", {
+            "zona": result["zona"],
+            "categoria": result["categoria"],
+            "asientos": result["asientos"],
+        })
+        if response is None:
+            return "conflicto"
+        self.stats.record_mutation(started, *seats, "ReservadoTemporalmente")
+        reserva_id = response.json()["reserva_id"]
+
+        if self.random.random() < self.args.abandon:
+            started, response = self.call("/cancelar_reserva", {"reserva_id": reserva_id})
+            if response is not None and response.text.strip() == "true":
+                self.stats.record_mutation(started, *seats, "Libre")
+            return "abandonado"
+
+        _, response = self.call("/procesar_pago", {
+            "metodo_pago": "Tarjeta",
+            "detalles": {"numero_tarjeta": "4111111111111111", "cvv": "123", "fecha_expiracion": "12/30"},
+        })
+        if response is None or response.text.strip() != "true":
+            started, response = self.call("/cancelar_reserva", {"reserva_id": reserva_id})
+            if response is not None and response.text.strip() == "true":
+                self.stats.record_mutation(started, *seats, "Libre")
+            return "pago_rechazado"
+
+        started, response = self.call("/confirmar_compra", {"reserva_id": reserva_id})
+        if response is None or response.text.strip() != "true":
+            return "confirmacion_fallida"
+        self.stats.record_mutation(started, *seats, "Comprado")
+        return "comprado"
+
+
+class Listener(threading.Thread):
+    """Kiosco pasivo que registra la llegada de cada difusión WebSocket y,
+    por asiento, cada cambio recibido (deltas en JSON)"""
+
+    def __init__(self, url):
+        super().__init__(daemon=True)
+        self.url = url
+        self.arrivals = []
+        self.seat_changes = defaultdict(list)  # (zona, categoria, fila, asiento) -> [(versión, estado, llegada)]
+        self.bytes_received = 0
+        self.ready = threading.Event()
+        self.error = None
+        self.sock = None
+
+    def run(self):
+        try:
+            sock = self.sock = wsutil.connect(self.url)
+        except (OSError, ValueError) as e:
+            self.error = e
+            self.ready.set()
+            return
+        sock.settimeout(None)
+        try:
+            # El primer mensaje es el snapshot inicial, no una difusión de un cambio
+            _, payload = wsutil.read_message(sock)
+            self.bytes_received += len(payload)
+        except (OSError, ConnectionError) as e:
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        try:
+            while True:
+                _, payload = wsutil.read_message(sock)
+                arrived = time.perf_counter()
+                self.arrivals.append(arrived)
+                self.bytes_received += len(payload)
+                self.record_changes(payload, arrived)
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            sock.close()
+
+    def stop(self):
+        """Corta la conexión para que run() termine; el informe solo lee
+        arrivals y seat_changes cuando el hilo ya no los modifica"""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.join()
+
+    def record_changes(self, payload, arrived):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        for cambio in message.get("cambios", ()):
+            key = (cambio["zona"], cambio["categoria"], cambio["fila"], cambio["asiento"])
+            self.seat_changes[key].append((message["version"], cambio["estado"], arrived))
+
+
+def fanout_lags(mutations, listeners):
+    """Retraso de difusión de cada cambio exitoso en cada kiosco.
+
+    Un cambio se empareja, por asiento, con la primera versión que lleva a
+    todos sus asientos al estado esperado, llegó después de iniciada la
+    solicitud y no se usó para un cambio anterior; así vale aunque el servidor
+    agrupe varios cambios en un mismo mensaje. Los cambios sin mensaje
+    (kiosco caído o cambio aún en vuelo) se omiten.
+    """
+    mutations = sorted(mutations, key=lambda mutation: mutation[0])
+    lags = []
+    for listener in listeners:
+        pending = {key: deque(changes) for key, changes in listener.seat_changes.items()}
+        for started, zona, categoria, asientos, estado in mutations:
+            queues = [pending.get((zona, categoria, fila, asiento)) for fila, asiento in asientos]
+            if not all(queues):
+                continue
+            candidates = [
+                {version: arrived for version, state, arrived in queue if state == estado and arrived >= started}
+                for queue in queues
+            ]
+            common = set(candidates[0]).intersection(*candidates[1:])
+            if not common:
+                continue
+            version = min(common)
+            for queue in queues:
+                # Consumir el mensaje emparejado y los cambios anteriores del asiento
+                while queue and queue[0][0] <= version:
+                    queue.popleft()
+            lags.append(candidates[0][version] - started)
+    return sorted(lags)
+
+
+def build_report(args, stats, listeners, elapsed):
+    endpoints = {}
+    total_requests = 0
+    for endpoint, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        outcomes = dict(stats.outcomes[endpoint])
+        total_requests += len(values)
+        endpoints[endpoint] = {
+            "solicitudes": len(values),
+            "por_segundo": len(values) / elapsed,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p90_ms": percentile(values, 0.90) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "max_ms": values[-1] * 1000,
+            "resultados": outcomes,
+            "tasa_rechazo": 1 - outcomes.get("ok", 0) / len(values),
+        }
+    reservas = stats.outcomes["/reservar_asientos_temporalmente"]
+    reservas_total = sum(reservas.values())
+    lags = fanout_lags(stats.mutations, listeners)
+    return {
+        "compradores": args.buyers,
+        "duracion_s": elapsed,
+        "solicitudes_por_segundo": total_requests / elapsed,
+        "compras_por_segundo": stats.journeys.get("comprado", 0) / elapsed,
+        "recorridos": dict(stats.journeys),
+        "tasa_conflicto_reserva": reservas.get("conflicto", 0) / reservas_total if reservas_total else 0.0,
+        "endpoints": endpoints,
+        "websocket": {
+            "kioscos": len(listeners),
+            "mensajes": sum(len(listener.arrivals) for listener in listeners),
+            "bytes": sum(listener.bytes_received for listener in listeners),
+            "cambios": len(stats.mutations),
+            "cambios_emparejados": len(lags),
+            "retraso_p50_ms": percentile(lags, 0.50) * 1000,
+            "retraso_p99_ms": percentile(lags, 0.99) * 1000,
+            "retraso_max_ms": (lags[-1] if lags else 0.0) * 1000,
+        },
+    }
+
+
+def print_report(report):
+    print(f"Compradores: {report['compradores']}  Duración: {report['duracion_s']:.1f} s")
+    print(f"Solicitudes/s: {report['solicitudes_por_segundo']:.1f}  Compras/s: {report['compras_por_segundo']:.2f}")
+    print(f"Recorridos: {report['recorridos']}")
+    print(f"Tasa de conflicto al reservar: {report['tasa_conflicto_reserva']:.1%}")
+    print()
+    print(f"{'Endpoint':<36}{'n':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'rechazo':>9}")
+    for endpoint, data in report["endpoints"].items():
+        print(
+            f"{endpoint:<36}{data['solicitudes']:>7}{data['p50_ms']:>9.1f}{data['p90_ms']:>9.1f}"
+            f"{data['p99_ms']:>9.1f}{data['max_ms']:>9.1f}{data['tasa_rechazo']:>9.1%}"
+        )
+    ws = report["websocket"]
+    print()
+    print(
+        f"WebSocket: {ws['kioscos']} kioscos, {ws['mensajes']} mensajes, {ws['bytes'] / 1e6:.1f} MB, "
+        f"retraso p50 {ws['retraso_p50_ms']:.1f} ms / p99 {ws['retraso_p99_ms']:.1f} ms "
+        f"({ws['cambios_emparejados']} de {ws['cambios'] * ws['kioscos']} cambios emparejados)"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=httputil.BASE_URL, help="URL base del backend local")
+    parser.add_argument("--buyers", type=int, default=20, help="Compradores concurrentes")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duración de la prueba en segundos")
+    parser.add_argument("--mix", default="VIP=1,Regular=3,Sol=2,Platea=2",
+                        help="Peso de cada categoría, p. ej. VIP=1,Sol=3")
+    parser.add_argument("--groups", default="1=3,2=4,3=2", help="Peso de cada tamaño de grupo")
+    parser.add_argument("--abandon", type=float, default=0.2, help="Probabilidad de abandonar la reserva")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pausa máxima entre recorridos (s)")
+    parser.add_argument("--listeners", type=int, default=5, help="Kioscos WebSocket pasivos")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", help="Guardar el reporte en este archivo JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    ensure_local(args.url)
+
+    listeners = [Listener(httputil.websocket_url(args.url)) for _ in range(args.listeners)]
+    for listener in listeners:
+        listener.start()
+    for listener in listeners:
+        listener.ready.wait()
+        if listener.error:
+            print(f"No se pudo conectar el kiosco WebSocket: {listener.error}", file=sys.stderr)
+    listeners = [listener for listener in listeners if not listener.error]
+
+    seeds = random.Random(args.seed)
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + args.duration
+    buyers = [Buyer(args, stats, deadline, seeds.random()) for _ in range(args.buyers)]
+    for buyer in buyers:
+        buyer.start()
+    for buyer in buyers:
+        buyer.join()
+    elapsed = time.monotonic() - started
+    time.sleep(0.5)  # Dar tiempo a que lleguen las últimas difusiones
+    for listener in listeners:
+        listener.stop()
+
+    report = build_report(args, stats, listeners, elapsed)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,21 @@
 use actix::prelude::*;
 use actix_web::{web, App, HttpServer, Responder, HttpResponse, get, post, Error, HttpRequest};
 use actix_web_actors::ws;
+use bytestring::ByteString;
 use serde::{Serialize, Deserialize};
-use std::collections::HashMap;
-use std::sync::{Arc, Mutex};
+use std::cmp::Reverse;
+use std::collections::{BinaryHeap, HashMap, HashSet, VecDeque};
+use std::sync::{Arc, Mutex, RwLock, RwLockWriteGuard};
+use std::sync::atomic::{AtomicUsize, Ordering};
 use actix_cors::Cors;
-use tokio::time::{sleep, Duration};
+use tokio::time::{interval, Duration, MissedTickBehavior};
 use rand::Rng;
 use uuid::Uuid;
 use log::{info, error};
-use std::time::Instant;
+use std::time::{Instant, SystemTime, UNIX_EPOCH};
+use std::io::Write;
+use flate2::write::ZlibEncoder;
+use flate2::Compression;
 
 #[derive(Debug, Clone, Copy, PartialEq, Eq, Hash, Serialize, Deserialize)]
 enum SeatState {
@@ -33,15 +39,102 @@ enum CategoriaZona {
     Platea,
 }
 
-#[derive(Debug, Serialize, Deserialize)]
+// Orden en que se toman los bloqueos de escritura dentro de cada zona
+const CATEGORIAS: [CategoriaZona; 4] = [
+    CategoriaZona::VIP,
+    CategoriaZona::Regular,
+    CategoriaZona::Sol,
+    CategoriaZona::Platea,
+];
+
+impl CategoriaZona {
+    fn desde_nombre(nombre: &str) -> Option<Self> {
+        match nombre {
+            "VIP" => Some(CategoriaZona::VIP),
+            "Regular" => Some(CategoriaZona::Regular),
+            "Sol" => Some(CategoriaZona::Sol),
+            "Platea" => Some(CategoriaZona::Platea),
+            _ => None,
+        }
+    }
+}
+
+/// Asientos de una zona y categoría. Quien lee clona el Arc y suelta el
+/// bloqueo enseguida; quien escribe copia la matriz solo si algún lector
+/// todavía usa la anterior (Arc::make_mut).
+type Bloque = RwLock<Arc<MatrizAsientos>>;
+
+#[derive(Debug)]
 struct Zone {
     nombre: String,
-    categorias: HashMap<CategoriaZona, Vec<Vec<Seat>>>,
+    categorias: HashMap<CategoriaZona, Bloque>,
+    total: usize,
+    ocupados: AtomicUsize, // Se actualiza con cada cambio (ver Escritura::marcar_asientos)
 }
 
-#[derive(Debug, Serialize, Deserialize)]
+/// Asientos de un bloque con un índice para buscar lugares consecutivos sin
+/// recorrer todas las filas: un árbol de máximos sobre la corrida de libres
+/// más larga de cada fila, que se actualiza con cada asiento que cambia
+#[derive(Debug, Clone)]
+struct MatrizAsientos {
+    filas: Vec<Vec<Seat>>,
+    corridas: Vec<usize>, // Nodo n: máximo de 2n y 2n + 1; las hojas son las filas
+}
+
+/// Versión e historial de deltas. Su bloqueo se toma solo para numerar un
+/// cambio y encolarlo, nunca para serializar.
+#[derive(Debug)]
+struct Publicacion {
+    version: u64, // Aumenta con cada cambio publicado por WebSocket
+    historial: VecDeque<(u64, Arc<Vec<CambioAsiento>>)>, // Últimos deltas, para reanudar conexiones
+}
+
+/// La estructura (zonas y categorías) no cambia después de crearse, así que
+/// no necesita bloqueo; cada bloque de asientos tiene el suyo
+#[derive(Debug)]
 struct Estadio {
     zonas: Vec<Zone>,
+    publicacion: Mutex<Publicacion>,
+}
+
+#[derive(Debug, Clone, Serialize)]
+struct CambioAsiento {
+    zona: String,
+    categoria: CategoriaZona,
+    fila: usize,
+    asiento: usize,
+    estado: SeatState,
+}
+
+#[derive(Serialize)]
+struct Delta<'a> {
+    desde: u64, // Versión que el cliente debe tener para aplicarlo
+    version: u64,
+    cambios: &'a [CambioAsiento],
+}
+
+// Bloques (zona, categoría) a los que está suscrita una sesión
+type Suscripcion = HashMap<String, HashSet<CategoriaZona>>;
+
+#[derive(Serialize)]
+struct ZonaJson<'a> {
+    nombre: &'a str,
+    categorias: HashMap<&'a CategoriaZona, &'a Vec<Vec<Seat>>>,
+}
+
+#[derive(Serialize)]
+struct SnapshotJson<'a> {
+    version: u64,
+    #[serde(skip_serializing_if = "std::ops::Not::not")]
+    parcial: bool, // Solo los bloques recién suscritos
+    zonas: Vec<ZonaJson<'a>>,
+}
+
+#[derive(Deserialize)]
+struct PedidoCliente {
+    tipo: String,
+    #[serde(default)]
+    bloques: Option<Vec<(String, CategoriaZona)>>, // None = todos los bloques
 }
 
 #[derive(Deserialize)]
@@ -64,6 +157,30 @@ struct ReservaTemporalRequest {
     asientos: Vec<(usize, usize)>, // (fila, asiento)
 }
 
+#[derive(Debug, Deserialize)]
+struct GrupoRequest {
+    categoria: String,
+    cantidad: usize,
+    #[serde(default)]
+    zona: Option<String>, // Sin zona, la menos ocupada con lugar
+}
+
+#[derive(Debug, Deserialize)]
+struct ReservaGruposRequest {
+    grupos: Vec<GrupoRequest>,
+    #[serde(default)]
+    parcial: bool, // false: se reservan todos los grupos o ninguno
+}
+
+#[derive(Serialize)]
+struct ResultadoGrupo {
+    ok: bool,
+    #[serde(flatten)]
+    asientos: Option<AvailableSeats>,
+    #[serde(skip_serializing_if = "Option::is_none")]
+    error: Option<String>,
+}
+
 #[derive(Debug, Deserialize)]
 struct ConfirmarCompraRequest {
     reserva_id: String,
@@ -87,6 +204,52 @@ struct ReservaTemporal {
     tiempo_expiracion: std::time::Instant,
 }
 
+const DURACION_RESERVA: Duration = Duration::from_secs(300); // 5 minutos
+const INTERVALO_EXPIRACION: Duration = Duration::from_secs(1); // Precisión del vencimiento
+
+/// Reservas vigentes y sus vencimientos en un montículo, revisados por una
+/// única tarea (ver iniciar_expiraciones) en lugar de una tarea por reserva
+#[derive(Debug, Default)]
+struct ReservasTemporales {
+    activas: HashMap<String, ReservaTemporal>,
+    // Las confirmadas o canceladas quedan aquí hasta su vencimiento y se ignoran
+    vencimientos: BinaryHeap<Reverse<(Instant, String)>>,
+}
+
+impl ReservasTemporales {
+    fn insert(&mut self, reserva_id: String, reserva: ReservaTemporal) {
+        self.vencimientos.push(Reverse((reserva.tiempo_expiracion, reserva_id.clone())));
+        self.activas.insert(reserva_id, reserva);
+    }
+
+    fn remove(&mut self, reserva_id: &str) -> Option<ReservaTemporal> {
+        self.activas.remove(reserva_id)
+    }
+
+    fn hay_vencidas(&self, ahora: Instant) -> bool {
+        matches!(self.vencimientos.peek(), Some(Reverse((vence, _))) if *vence <= ahora)
+    }
+
+    /// Quita y devuelve todas las reservas vencidas
+    fn quitar_vencidas(&mut self, ahora: Instant) -> Vec<ReservaTemporal> {
+        let mut vencidas = Vec::new();
+        while self.hay_vencidas(ahora) {
+            if let Some(Reverse((_, reserva_id))) = self.vencimientos.pop() {
+                if let Some(reserva) = self.activas.remove(&reserva_id) {
+                    vencidas.push(reserva);
+                }
+            }
+        }
+        vencidas
+    }
+}
+
+/// Segundos que le quedan a una reserva recién creada, para la cuenta
+/// regresiva del cliente
+fn expira_en_s(reserva: &ReservaTemporal) -> f64 {
+    reserva.tiempo_expiracion.saturating_duration_since(Instant::now()).as_secs_f64()
+}
+
 #[derive(Debug, Deserialize)]
 struct CancelarReservaRequest {
     reserva_id: String,
@@ -96,28 +259,30 @@ struct CancelarReservaRequest {
 
 impl Estadio {
     fn new() -> Self {
-        let zona_a = Zone {
-            nombre: String::from("A"),
-            categorias: Self::crear_categorias(),
-        };
-        let zona_b = Zone {
-            nombre: String::from("B"),
-            categorias: Self::crear_categorias(),
-        };
-        let zona_c = Zone {
-            nombre: String::from("C"),
-            categorias: Self::crear_categorias(),
-        };
-        let zona_d = Zone {
-            nombre: String::from("D"),
-            categorias: Self::crear_categorias(),
-        };
+        let zona_a = Zone::new("A", Self::crear_categorias());
+        let zona_b = Zone::new("B", Self::crear_categorias());
+        let zona_c = Zone::new("C", Self::crear_categorias());
+        let zona_d = Zone::new("D", Self::crear_categorias());
 
         Estadio {
             zonas: vec![zona_a, zona_b, zona_c, zona_d],
+            publicacion: Mutex::new(Publicacion {
+                version: Self::version_inicial(),
+                historial: VecDeque::new(),
+            }),
         }
     }
 
+    /// Microsegundos desde epoch al arrancar: las versiones de un arranque
+    /// nuevo quedan por encima de las del anterior y ningún cliente puede
+    /// reanudar con deltas de otro proceso
+    fn version_inicial() -> u64 {
+        SystemTime::now()
+            .duration_since(UNIX_EPOCH)
+            .map(|duracion| duracion.as_micros() as u64)
+            .unwrap_or(0)
+    }
+
     fn crear_categorias() -> HashMap<CategoriaZona, Vec<Vec<Seat>>> {
         let mut categorias = HashMap::new();
         categorias.insert(
@@ -171,85 +336,444 @@ impl Estadio {
         matriz
     }
 
-    fn calcular_ocupacion(&self, zona: &Zone) -> f64 {
-        let mut total_asientos = 0;
-        let mut asientos_ocupados = 0;
+    /// Índices de las zonas ordenados por ocupación ascendente
+    fn zonas_por_ocupacion(&self) -> Vec<usize> {
+        let mut zonas_con_ocupacion: Vec<(usize, f64)> = self
+            .zonas
+            .iter()
+            .enumerate()
+            .map(|(indice, zona)| (indice, zona.ocupacion()))
+            .collect();
+        zonas_con_ocupacion.sort_by(|a, b| a.1.partial_cmp(&b.1).unwrap());
+        zonas_con_ocupacion.into_iter().map(|(indice, _)| indice).collect()
+    }
 
-        for asientos in zona.categorias.values() {
-            for fila in asientos {
-                total_asientos += fila.len();
-                for asiento in fila {
-                    if asiento.estado != SeatState::Libre {
-                        asientos_ocupados += 1;
-                    }
+    fn indice_zona(&self, nombre: &str) -> Option<usize> {
+        self.zonas.iter().position(|zona| zona.nombre == nombre)
+    }
+
+    /// Sugerencia sin reservar: cada bloque se lee de una copia, sin frenar
+    /// a quien esté reservando en él
+    fn buscar_asientos_consecutivos(
+        &self,
+        categoria_buscar: &str,
+        cantidad: usize,
+        zona_buscar: Option<&str>,
+    ) -> Option<AvailableSeats> {
+        let categoria_zona = CategoriaZona::desde_nombre(categoria_buscar)?;
+
+        for indice in self.zonas_por_ocupacion() {
+            let zona = &self.zonas[indice];
+            if zona_buscar.map_or(false, |nombre| nombre != zona.nombre) {
+                continue;
+            }
+            if let Some(bloque) = zona.categorias.get(&categoria_zona) {
+                if let Some(asientos) = leer(bloque).buscar(cantidad) {
+                    return Some(AvailableSeats {
+                        zona: zona.nombre.clone(),
+                        categoria: categoria_buscar.to_string(),
+                        asientos,
+                    });
                 }
             }
         }
+        None
+    }
+}
+
+impl Zone {
+    fn new(nombre: &str, categorias: HashMap<CategoriaZona, Vec<Vec<Seat>>>) -> Self {
+        let asientos = categorias.values().flatten().flatten();
+        let total = asientos.clone().count();
+        let ocupados = asientos.filter(|asiento| asiento.estado != SeatState::Libre).count();
+        Zone {
+            nombre: nombre.to_string(),
+            categorias: categorias
+                .into_iter()
+                .map(|(categoria, filas)| (categoria, RwLock::new(Arc::new(MatrizAsientos::new(filas)))))
+                .collect(),
+            total,
+            ocupados: AtomicUsize::new(ocupados),
+        }
+    }
 
-        if total_asientos == 0 {
+    fn ocupacion(&self) -> f64 {
+        if self.total == 0 {
             1.0 // Si no hay asientos, consideramos la zona como llena
         } else {
-            asientos_ocupados as f64 / total_asientos as f64
+            self.ocupados.load(Ordering::Relaxed) as f64 / self.total as f64
+        }
+    }
+
+    fn contar_cambio(&self, anterior: SeatState, nuevo: SeatState) {
+        match (anterior == SeatState::Libre, nuevo == SeatState::Libre) {
+            (true, false) => { self.ocupados.fetch_add(1, Ordering::Relaxed); }
+            (false, true) => { self.ocupados.fetch_sub(1, Ordering::Relaxed); }
+            _ => {}
         }
     }
+}
+
+impl MatrizAsientos {
+    fn new(filas: Vec<Vec<Seat>>) -> Self {
+        let hojas = filas.len().next_power_of_two();
+        let mut corridas = vec![0; 2 * hojas];
+        for (fila_idx, fila) in filas.iter().enumerate() {
+            corridas[hojas + fila_idx] = corrida_mas_larga(fila);
+        }
+        for nodo in (1..hojas).rev() {
+            corridas[nodo] = corridas[2 * nodo].max(corridas[2 * nodo + 1]);
+        }
+        MatrizAsientos { filas, corridas }
+    }
+
+    /// Cambia un asiento y, si pasó de libre a ocupado o al revés, recalcula
+    /// su fila y los máximos hasta la raíz
+    fn cambiar(&mut self, fila: usize, asiento: usize, estado: SeatState) {
+        let anterior = std::mem::replace(&mut self.filas[fila][asiento].estado, estado);
+        if (anterior == SeatState::Libre) == (estado == SeatState::Libre) {
+            return;
+        }
+        let mut nodo = self.corridas.len() / 2 + fila;
+        self.corridas[nodo] = corrida_mas_larga(&self.filas[fila]);
+        while nodo > 1 {
+            nodo /= 2;
+            self.corridas[nodo] = self.corridas[2 * nodo].max(self.corridas[2 * nodo + 1]);
+        }
+    }
+
+    /// Primeros `cantidad` asientos libres consecutivos de una misma fila: el
+    /// árbol lleva a la primera fila con lugar y solo esa se recorre
+    fn buscar(&self, cantidad: usize) -> Option<Vec<(usize, usize)>> {
+        if cantidad == 0 || self.corridas[1] < cantidad {
+            return None;
+        }
+        let hojas = self.corridas.len() / 2;
+        let mut nodo = 1;
+        while nodo < hojas {
+            nodo = if self.corridas[2 * nodo] >= cantidad { 2 * nodo } else { 2 * nodo + 1 };
+        }
+        let fila_idx = nodo - hojas;
+        let mut count = 0;
+        for (asiento_idx, asiento) in self.filas[fila_idx].iter().enumerate() {
+            if asiento.estado == SeatState::Libre {
+                count += 1;
+                if count == cantidad {
+                    return Some((asiento_idx + 1 - cantidad..=asiento_idx).map(|asiento| (fila_idx, asiento)).collect());
+                }
+            } else {
+                count = 0;
+            }
+        }
+        None
+    }
+}
+
+fn corrida_mas_larga(fila: &[Seat]) -> usize {
+    let (mut mas_larga, mut actual) = (0, 0);
+    for asiento in fila {
+        actual = if asiento.estado == SeatState::Libre { actual + 1 } else { 0 };
+        mas_larga = mas_larga.max(actual);
+    }
+    mas_larga
+}
+
+/// Copia barata de los asientos de un bloque: el bloqueo de lectura dura lo
+/// que tarda clonar el Arc
+fn leer(bloque: &Bloque) -> Arc<MatrizAsientos> {
+    bloque.read().unwrap().clone()
+}
+
+// Formato binario de los mensajes para clientes que piden /ws?formato=binario
+const FORMATO_BINARIO_VERSION: u8 = 3;
+const FLAG_ZLIB: u8 = 0x01;
+const TIPO_SNAPSHOT: u8 = 0;
+const TIPO_DELTA: u8 = 1;
+const TIPO_PARCIAL: u8 = 2; // Snapshot solo de los bloques recién suscritos
+const SIN_ASIENTO: u8 = 255; // Relleno para filas más cortas que la más larga
+const UMBRAL_COMPRESION: usize = 512; // Cuerpos más chicos se envían sin comprimir
+const HISTORIAL_DELTAS: usize = 1000; // Deltas guardados para reanudar conexiones
+
+fn escribir_nombre(buffer: &mut Vec<u8>, nombre: &str) {
+    let bytes = nombre.as_bytes();
+    let largo = bytes.len().min(u8::MAX as usize);
+    buffer.push(largo as u8);
+    buffer.extend_from_slice(&bytes[..largo]);
+}
+
+/// Encabezado: "ES", versión del formato (u8), flags (u8; bit 0 = cuerpo
+/// comprimido con zlib), tipo (u8; 0 = snapshot, 1 = delta, 2 = snapshot
+/// parcial) y la versión del
+/// estadio (u64 LE), seguido del cuerpo.
+fn empaquetar_binario(tipo: u8, version: u64, cuerpo: Vec<u8>) -> Vec<u8> {
+    let mut mensaje = vec![b'E', b'S', FORMATO_BINARIO_VERSION, 0, tipo];
+    mensaje.extend_from_slice(&version.to_le_bytes());
+    if cuerpo.len() >= UMBRAL_COMPRESION {
+        let mut encoder = ZlibEncoder::new(Vec::new(), Compression::fast());
+        if encoder.write_all(&cuerpo).is_ok() {
+            if let Ok(comprimido) = encoder.finish() {
+                mensaje[3] |= FLAG_ZLIB;
+                mensaje.extend(comprimido);
+                return mensaje;
+            }
+        }
+    }
+    mensaje.extend(cuerpo);
+    mensaje
+}
+
+/// Cuerpo de un delta: versión de la que parte (u64 LE), cantidad de cambios
+/// (u32 LE) y por cambio zona y categoría (largo u8 + UTF-8), fila y asiento
+/// (u16 LE) y el estado (u8).
+fn codificar_delta_binario(desde: u64, version: u64, cambios: &[CambioAsiento]) -> Vec<u8> {
+    let mut cuerpo = Vec::with_capacity(12 + cambios.len() * 16);
+    cuerpo.extend_from_slice(&desde.to_le_bytes());
+    cuerpo.extend_from_slice(&(cambios.len() as u32).to_le_bytes());
+    for cambio in cambios {
+        escribir_nombre(&mut cuerpo, &cambio.zona);
+        escribir_nombre(&mut cuerpo, &format!("{:?}", cambio.categoria));
+        cuerpo.extend_from_slice(&(cambio.fila as u16).to_le_bytes());
+        cuerpo.extend_from_slice(&(cambio.asiento as u16).to_le_bytes());
+        cuerpo.push(cambio.estado as u8);
+    }
+    empaquetar_binario(TIPO_DELTA, version, cuerpo)
+}
+
+/// Copia del estado para serializar sin bloqueos: la versión y el Arc de
+/// cada bloque. Puede incluir cambios posteriores a `version`; no importa,
+/// porque los deltas siguientes los vuelven a aplicar en orden.
+struct Vista<'a> {
+    version: u64,
+    zonas: Vec<(&'a str, Vec<(&'a CategoriaZona, Arc<MatrizAsientos>)>)>,
+}
+
+impl Vista<'_> {
+    fn codificar_binario(&self, tipo: u8) -> Vec<u8> {
+        empaquetar_binario(tipo, self.version, self.codificar_bloques())
+    }
+
+    fn json(&self, parcial: bool) -> SnapshotJson<'_> {
+        let zonas = self.zonas.iter()
+            .map(|(nombre, categorias)| ZonaJson {
+                nombre,
+                categorias: categorias.iter().map(|(categoria, asientos)| (*categoria, &asientos.filas)).collect(),
+            })
+            .collect();
+        SnapshotJson { version: self.version, parcial, zonas }
+    }
+
+    fn codificar_json(&self, parcial: bool) -> String {
+        serde_json::to_string(&self.json(parcial)).unwrap()
+    }
+
+    /// Un byte por asiento (el índice de SeatState). Cuerpo: cantidad de
+    /// zonas (u16 LE) y por zona su nombre (largo u8 + UTF-8) y cantidad de
+    /// categorías (u8); por categoría su nombre, filas y columnas (u16 LE) y
+    /// filas * columnas bytes de estado.
+    fn codificar_bloques(&self) -> Vec<u8> {
+        let mut cuerpo = Vec::new();
+        cuerpo.extend_from_slice(&(self.zonas.len() as u16).to_le_bytes());
+        for (nombre, categorias) in &self.zonas {
+            escribir_nombre(&mut cuerpo, nombre);
+            cuerpo.push(categorias.len() as u8);
+            for (categoria, matriz) in categorias {
+                let asientos = &matriz.filas;
+                escribir_nombre(&mut cuerpo, &format!("{:?}", categoria));
+                let columnas = asientos.iter().map(|fila| fila.len()).max().unwrap_or(0);
+                cuerpo.extend_from_slice(&(asientos.len() as u16).to_le_bytes());
+                cuerpo.extend_from_slice(&(columnas as u16).to_le_bytes());
+                for fila in asientos.iter() {
+                    cuerpo.extend(fila.iter().map(|asiento| asiento.estado as u8));
+                    cuerpo.extend(std::iter::repeat(SIN_ASIENTO).take(columnas - fila.len()));
+                }
+            }
+        }
+        cuerpo
+    }
+}
+
+/// Bloqueos de escritura de varios bloques. Se toman siempre en el mismo
+/// orden (zonas del estadio y dentro de cada una CATEGORIAS) para que dos
+/// escritores nunca se esperen mutuamente.
+struct Escritura<'a> {
+    estadio: &'a Estadio,
+    bloques: HashMap<(usize, CategoriaZona), RwLockWriteGuard<'a, Arc<MatrizAsientos>>>,
+}
+
+impl Escritura<'_> {
+    fn asientos(&self, zona_nombre: &str, categoria: &CategoriaZona) -> Option<&[Vec<Seat>]> {
+        let indice = self.estadio.indice_zona(zona_nombre)?;
+        self.bloques.get(&(indice, categoria.clone())).map(|bloque| bloque.filas.as_slice())
+    }
 
+    /// Como Estadio::buscar_asientos_consecutivos, pero sobre los bloques
+    /// tomados, para ver los asientos que ya marcó esta misma escritura
     fn buscar_asientos_consecutivos(
         &self,
-        categoria_buscar: &str,
+        zonas: &[usize],
+        categoria: &CategoriaZona,
         cantidad: usize,
+        zona_buscar: Option<&str>,
     ) -> Option<AvailableSeats> {
-        let categoria_zona = match categoria_buscar {
-            "VIP" => CategoriaZona::VIP,
-            "Regular" => CategoriaZona::Regular,
-            "Sol" => CategoriaZona::Sol,
-            "Platea" => CategoriaZona::Platea,
-            _ => return None,
-        };
+        for &indice in zonas {
+            let zona = &self.estadio.zonas[indice];
+            if zona_buscar.map_or(false, |nombre| nombre != zona.nombre) {
+                continue;
+            }
+            if let Some(bloque) = self.bloques.get(&(indice, categoria.clone())) {
+                if let Some(asientos) = bloque.buscar(cantidad) {
+                    return Some(AvailableSeats {
+                        zona: zona.nombre.clone(),
+                        categoria: format!("{:?}", categoria),
+                        asientos,
+                    });
+                }
+            }
+        }
+        None
+    }
 
-        // Calcular ocupación de cada zona
-        let mut zonas_con_ocupacion: Vec<(&Zone, f64)> = self
-            .zonas
-            .iter()
-            .map(|zona| (zona, self.calcular_ocupacion(zona)))
-            .collect();
+    /// Cambia el estado de asientos de un bloque y registra los cambios
+    fn marcar_asientos(
+        &mut self,
+        zona_nombre: &str,
+        categoria: &CategoriaZona,
+        asientos: &[(usize, usize)],
+        estado: SeatState,
+        cambios: &mut Vec<CambioAsiento>,
+    ) {
+        let indice = match self.estadio.indice_zona(zona_nombre) {
+            Some(indice) => indice,
+            None => return,
+        };
+        let zona = &self.estadio.zonas[indice];
+        if let Some(bloque) = self.bloques.get_mut(&(indice, categoria.clone())) {
+            let matriz = Arc::make_mut(&mut **bloque);
+            for (fila, asiento) in asientos {
+                zona.contar_cambio(matriz.filas[*fila][*asiento].estado, estado);
+                matriz.cambiar(*fila, *asiento, estado);
+                cambios.push(CambioAsiento {
+                    zona: zona_nombre.to_string(),
+                    categoria: categoria.clone(),
+                    fila: *fila,
+                    asiento: *asiento,
+                    estado,
+                });
+            }
+        }
+    }
 
-        // Ordenar zonas por ocupación ascendente
-        zonas_con_ocupacion.sort_by(|a, b| a.1.partial_cmp(&b.1).unwrap());
+    /// Numera los cambios antes de soltar los bloques, para que los deltas
+    /// salgan en el mismo orden en que se modificaron los asientos
+    fn publicar(self, cambios: Vec<CambioAsiento>, ws_server: &Addr<WsServer>) {
+        self.estadio.publicar_cambios(cambios, ws_server);
+    }
+}
 
-        for (zona, _) in zonas_con_ocupacion {
-            if let Some(asientos) = zona.categorias.get(&categoria_zona) {
-                // Buscar en cada fila
-                for (fila_idx, fila) in asientos.iter().enumerate() {
-                    let mut asientos_consecutivos = Vec::new();
-                    let mut count = 0;
-
-                    // Buscar asientos consecutivos en la fila
-                    for (asiento_idx, asiento) in fila.iter().enumerate() {
-                        if asiento.estado == SeatState::Libre {
-                            count += 1;
-                            asientos_consecutivos.push((fila_idx, asiento_idx));
-
-                            if count == cantidad {
-                                return Some(AvailableSeats {
-                                    zona: zona.nombre.clone(),
-                                    categoria: categoria_buscar.to_string(),
-                                    asientos: asientos_consecutivos,
-                                });
-                            }
-                        } else {
-                            count = 0;
-                            asientos_consecutivos.clear();
-                        }
+impl Estadio {
+    /// Toma para escribir los bloques que cumplen `incluido`
+    fn escribir(&self, incluido: impl Fn(&str, &CategoriaZona) -> bool) -> Escritura<'_> {
+        let mut bloques = HashMap::new();
+        for (indice, zona) in self.zonas.iter().enumerate() {
+            for categoria in &CATEGORIAS {
+                if let Some(bloque) = zona.categorias.get(categoria) {
+                    if incluido(&zona.nombre, categoria) {
+                        bloques.insert((indice, categoria.clone()), bloque.write().unwrap());
                     }
                 }
             }
         }
-        None
+        Escritura { estadio: self, bloques }
+    }
+
+    /// Copia de los bloques incluidos en `filtro` (todos si es None)
+    fn vista(&self, filtro: Option<&Suscripcion>) -> Vista<'_> {
+        // La versión antes que los bloques: todo cambio numerado hasta ella
+        // ya está escrito, porque se numera con el bloque todavía tomado
+        let version = self.version();
+        let incluido = |zona: &Zone, categoria: &CategoriaZona| {
+            filtro.map_or(true, |bloques| bloques.get(&zona.nombre).map_or(false, |categorias| categorias.contains(categoria)))
+        };
+        let zonas = self.zonas.iter()
+            .map(|zona| {
+                let categorias: Vec<_> = zona.categorias.iter()
+                    .filter(|(categoria, _)| incluido(zona, categoria))
+                    .map(|(categoria, bloque)| (categoria, leer(bloque)))
+                    .collect();
+                (zona.nombre.as_str(), categorias)
+            })
+            .filter(|(_, categorias)| !categorias.is_empty())
+            .collect();
+        Vista { version, zonas }
+    }
+
+    /// Pasa a `estado` los asientos de las reservas que siguen reservados
+    /// temporalmente, con una sola difusión; devuelve cuántos cambiaron
+    fn terminar_reservas(
+        &self,
+        reservas: &[ReservaTemporal],
+        estado: SeatState,
+        ws_server: &Addr<WsServer>,
+    ) -> usize {
+        let bloques: HashSet<(&str, &CategoriaZona)> = reservas.iter()
+            .flat_map(|reserva| reserva.asientos.iter())
+            .map(|(zona, categoria, _, _)| (zona.as_str(), categoria))
+            .collect();
+        let mut escritura = self.escribir(|zona, categoria| bloques.contains(&(zona, categoria)));
+        let mut cambios = Vec::new();
+        for (zona_nombre, categoria, fila, asiento) in reservas.iter().flat_map(|reserva| reserva.asientos.iter()) {
+            let reservado = escritura.asientos(zona_nombre, categoria)
+                .map_or(false, |asientos| asientos[*fila][*asiento].estado == SeatState::ReservadoTemporalmente);
+            if reservado {
+                escritura.marcar_asientos(zona_nombre, categoria, &[(*fila, *asiento)], estado, &mut cambios);
+            }
+        }
+        let cantidad = cambios.len();
+        escritura.publicar(cambios, ws_server);
+        cantidad
+    }
+
+    fn version(&self) -> u64 {
+        self.publicacion.lock().unwrap().version
+    }
+
+    /// Avanza la versión y encola la difusión con solo los asientos que
+    /// cambiaron. Se llama con los bloques modificados todavía tomados (ver
+    /// Escritura::publicar); WsServer codifica el mensaje después, sin bloqueos.
+    fn publicar_cambios(&self, cambios: Vec<CambioAsiento>, ws_server: &Addr<WsServer>) {
+        if cambios.is_empty() {
+            return;
+        }
+        let mut publicacion = self.publicacion.lock().unwrap();
+        publicacion.version += 1;
+        let version = publicacion.version;
+        let cambios = Arc::new(cambios);
+        publicacion.historial.push_back((version, cambios.clone()));
+        if publicacion.historial.len() > HISTORIAL_DELTAS {
+            publicacion.historial.pop_front();
+        }
+        // Con el bloqueo tomado, para que WsServer los reciba en orden
+        ws_server.do_send(CambiosPublicados { desde: version - 1, version, cambios });
+    }
+
+    /// Deltas posteriores a `desde`, o None si el historial ya no los cubre
+    fn deltas_desde(&self, desde: u64) -> Option<Vec<(u64, Arc<Vec<CambioAsiento>>)>> {
+        let publicacion = self.publicacion.lock().unwrap();
+        if desde > publicacion.version {
+            return None;
+        }
+        if desde < publicacion.version {
+            match publicacion.historial.front() {
+                Some((primera, _)) if *primera <= desde + 1 => {}
+                _ => return None,
+            }
+        }
+        Some(publicacion.historial.iter().filter(|(version, _)| *version > desde).cloned().collect())
     }
 }
 
-type SharedEstadio = Arc<Mutex<Estadio>>;
-type SharedReservasTemporales = Arc<Mutex<HashMap<String, ReservaTemporal>>>;
+type SharedEstadio = Arc<Estadio>;
+type SharedReservasTemporales = Arc<Mutex<ReservasTemporales>>;
 
 #[get("/")]
 async fn health_check() -> impl Responder {
@@ -258,8 +782,9 @@ async fn health_check() -> impl Responder {
 
 #[get("/get_stadium_structure")]
 async fn get_stadium_structure(data: web::Data<SharedEstadio>) -> impl Responder {
-    let estadio = data.lock().unwrap();
-    HttpResponse::Ok().json(&*estadio)
+    // Se serializa la copia, sin frenar a quien esté reservando
+    let vista = data.vista(None);
+    HttpResponse::Ok().json(vista.json(false))
 }
 
 #[post("/cancelar_reserva")]
@@ -271,30 +796,11 @@ async fn cancelar_reserva(
 ) -> impl Responder {
     info!("Solicitud para cancelar reserva: {:?}", info);
 
-    let mut estadio = data.lock().unwrap();
-    let mut reservas_temporales = reservas.lock().unwrap();
-
-    if let Some(reserva) = reservas_temporales.remove(&info.reserva_id) {
-        for (zona_nombre, categoria, fila, asiento) in reserva.asientos {
-            for zona in &mut estadio.zonas {
-                if zona.nombre == zona_nombre {
-                    if let Some(asientos_categoria) = zona.categorias.get_mut(&categoria) {
-                        let seat = &mut asientos_categoria[fila][asiento];
-                        if seat.estado == SeatState::ReservadoTemporalmente {
-                            seat.estado = SeatState::Libre;
-                            info!(
-                                "Reserva cancelada: Asiento liberado: Zona {}, Categoría {:?}, Fila {}, Asiento {}",
-                                zona_nombre, categoria, fila, asiento
-                            );
-                        }
-                    }
-                }
-            }
-        }
-
-        // Enviar actualización a los clientes
-        let estadio_json = serde_json::to_string(&*estadio).unwrap();
-        ws_server.do_send(BroadcastMessage(estadio_json));
+    let reserva = reservas.lock().unwrap().remove(&info.reserva_id);
+    if let Some(reserva) = reserva {
+        // Enviar a los clientes solo los asientos que cambiaron
+        let liberados = data.terminar_reservas(&[reserva], SeatState::Libre, &ws_server);
+        info!("Reserva cancelada: {} asientos liberados", liberados);
 
         // Devolver true en caso de éxito
         return HttpResponse::Ok().body("true");
@@ -311,9 +817,7 @@ async fn buscar_asientos(
     data: web::Data<SharedEstadio>,
     info: web::Json<SearchRequest>,
 ) -> impl Responder {
-    let estadio = data.lock().unwrap();
-
-    match estadio.buscar_asientos_consecutivos(&info.categoria, info.cantidad) {
+    match data.buscar_asientos_consecutivos(&info.categoria, info.cantidad, None) {
         Some(asientos) => HttpResponse::Ok().json(asientos),
         None => {
             HttpResponse::NotFound().body("No se encontraron asientos consecutivos disponibles")
@@ -330,40 +834,44 @@ async fn reservar_asientos_temporalmente(
 ) -> impl Responder {
     info!("Solicitud para reservar asientos temporalmente: {:?}", info);
 
-    let mut estadio = data.lock().unwrap();
-    let mut reservas_temporales = reservas.lock().unwrap();
-
-    let categoria_zona = match info.categoria.as_str() {
-        "VIP" => CategoriaZona::VIP,
-        "Regular" => CategoriaZona::Regular,
-        "Sol" => CategoriaZona::Sol,
-        "Platea" => CategoriaZona::Platea,
-        _ => return HttpResponse::BadRequest().body("Categoría inválida."),
+    let categoria_zona = match CategoriaZona::desde_nombre(&info.categoria) {
+        Some(categoria) => categoria,
+        None => return HttpResponse::BadRequest().body("Categoría inválida."),
     };
 
-    // Verificar y actualizar el estado de los asientos
-    for zona in &mut estadio.zonas {
-        if zona.nombre == info.zona {
-            if let Some(asientos_categoria) = zona.categorias.get_mut(&categoria_zona) {
-                for (fila, asiento) in &info.asientos {
-                    if *fila < asientos_categoria.len()
-                        && *asiento < asientos_categoria[*fila].len()
-                    {
-                        let seat = &mut asientos_categoria[*fila][*asiento];
-                        if seat.estado == SeatState::Libre {
-                            seat.estado = SeatState::ReservadoTemporalmente;
-                        } else {
-                            return HttpResponse::BadRequest()
-                                .body("Uno o más asientos no están disponibles.");
-                        }
-                    } else {
-                        return HttpResponse::BadRequest().body("Asiento fuera de rango.");
-                    }
+    // Solo el bloque pedido: las reservas en otros bloques siguen en paralelo
+    let mut escritura = data.escribir(|zona, categoria| zona == info.zona && *categoria == categoria_zona);
+
+    // Verificar todos los asientos antes de modificar alguno, para no dejar
+    // cambios a medias que los clientes nunca recibirían
+    if let Some(asientos_categoria) = escritura.asientos(&info.zona, &categoria_zona) {
+        for (fila, asiento) in &info.asientos {
+            if *fila < asientos_categoria.len()
+                && *asiento < asientos_categoria[*fila].len()
+            {
+                if asientos_categoria[*fila][*asiento].estado != SeatState::Libre {
+                    return HttpResponse::BadRequest()
+                        .body("Uno o más asientos no están disponibles.");
                 }
+            } else {
+                return HttpResponse::BadRequest().body("Asiento fuera de rango.");
             }
         }
     }
 
+    // Actualizar el estado de los asientos
+    let mut cambios = Vec::new();
+    escritura.marcar_asientos(
+        &info.zona,
+        &categoria_zona,
+        &info.asientos,
+        SeatState::ReservadoTemporalmente,
+        &mut cambios,
+    );
+
+    // Enviar a los clientes solo los asientos que cambiaron
+    escritura.publicar(cambios, &ws_server);
+
     // Generar un ID único para la reserva
     let reserva_id = Uuid::new_v4().to_string();
 
@@ -374,52 +882,145 @@ async fn reservar_asientos_temporalmente(
             .iter()
             .map(|(fila, asiento)| (info.zona.clone(), categoria_zona.clone(), *fila, *asiento))
             .collect(),
-        tiempo_expiracion: std::time::Instant::now() + Duration::from_secs(300), // 5 minutos
+        tiempo_expiracion: Instant::now() + DURACION_RESERVA,
     };
+    let expira_en_s = expira_en_s(&reserva);
 
-    reservas_temporales.insert(reserva_id.clone(), reserva);
-
-    // Enviar actualización a los clientes
-    let estadio_json = serde_json::to_string(&*estadio).unwrap();
-    ws_server.do_send(BroadcastMessage(estadio_json));
+    // Se libera sola al vencer (ver iniciar_expiraciones)
+    reservas.lock().unwrap().insert(reserva_id.clone(), reserva);
 
-    // Iniciar el temporizador para liberar los asientos después de 5 minutos
-    let data_clone = data.clone();
-    let reservas_clone = reservas.clone();
-    let reserva_id_clone = reserva_id.clone();
-    let ws_server_clone = ws_server.clone();
+    HttpResponse::Ok().json(serde_json::json!({ "reserva_id": reserva_id, "expira_en_s": expira_en_s }))
+}
 
+/// Única tarea de vencimiento: cada INTERVALO_EXPIRACION libera juntas todas
+/// las reservas vencidas, con una sola difusión por tanda
+fn iniciar_expiraciones(
+    data: SharedEstadio,
+    reservas: SharedReservasTemporales,
+    ws_server: Addr<WsServer>,
+) {
     tokio::spawn(async move {
-        sleep(Duration::from_secs(300)).await; // Esperar 5 minutos
-
-        let mut estadio = data_clone.lock().unwrap();
-        let mut reservas_temporales = reservas_clone.lock().unwrap();
-
-        if let Some(reserva) = reservas_temporales.remove(&reserva_id_clone) {
-            for (zona_nombre, categoria, fila, asiento) in reserva.asientos {
-                for zona in &mut estadio.zonas {
-                    if zona.nombre == zona_nombre {
-                        if let Some(asientos_categoria) = zona.categorias.get_mut(&categoria) {
-                            let seat = &mut asientos_categoria[fila][asiento];
-                            if seat.estado == SeatState::ReservadoTemporalmente {
-                                seat.estado = SeatState::Libre;
-                                info!(
-                                    "Asiento liberado automáticamente: Zona {}, Categoría {:?}, Fila {}, Asiento {}",
-                                    zona_nombre, categoria, fila, asiento
-                                );
-                            }
-                        }
-                    }
-                }
+        let mut ticker = interval(INTERVALO_EXPIRACION);
+        ticker.set_missed_tick_behavior(MissedTickBehavior::Delay);
+        loop {
+            ticker.tick().await;
+            let vencidas = reservas.lock().unwrap().quitar_vencidas(Instant::now());
+            if vencidas.is_empty() {
+                continue;
             }
 
-            // Enviar actualización a los clientes
-            let estadio_json = serde_json::to_string(&*estadio).unwrap();
-            ws_server_clone.do_send(BroadcastMessage(estadio_json));
+            // Enviar a los clientes solo los asientos que cambiaron
+            let liberados = data.terminar_reservas(&vencidas, SeatState::Libre, &ws_server);
+            info!("{} reservas vencidas, {} asientos liberados", vencidas.len(), liberados);
         }
     });
+}
+
+const MAX_GRUPOS_LOTE: usize = 200;
+
+/// Busca y reserva temporalmente varios grupos en una sola solicitud, con los
+/// bloques de sus categorías tomados a la vez y una sola difusión. Todos los asientos quedan en una misma
+/// reserva, que se confirma o cancela con /confirmar_compra y /cancelar_reserva.
+#[post("/reservar_grupos")]
+async fn reservar_grupos(
+    data: web::Data<SharedEstadio>,
+    reservas: web::Data<SharedReservasTemporales>,
+    info: web::Json<ReservaGruposRequest>,
+    ws_server: web::Data<Addr<WsServer>>,
+) -> impl Responder {
+    info!("Solicitud para reservar {} grupos (parcial: {})", info.grupos.len(), info.parcial);
+
+    if info.grupos.is_empty() || info.grupos.len() > MAX_GRUPOS_LOTE {
+        return HttpResponse::BadRequest().body("Cantidad de grupos inválida.");
+    }
 
-    HttpResponse::Ok().json(serde_json::json!({ "reserva_id": reserva_id }))
+    let categorias: Vec<Option<CategoriaZona>> = info.grupos.iter()
+        .map(|grupo| CategoriaZona::desde_nombre(&grupo.categoria))
+        .collect();
+    // El orden de preferencia de las zonas se calcula antes de bloquear: si
+    // cambia mientras tanto solo altera qué zona se prueba primero
+    let zonas = data.zonas_por_ocupacion();
+    let mut escritura = data.escribir(|_, categoria| categorias.contains(&Some(categoria.clone())));
+
+    // Cada grupo se marca al encontrarlo para que el siguiente no tome los
+    // mismos asientos; nadie más ve estos bloques hasta soltar el bloqueo
+    let mut cambios = Vec::new();
+    let mut resultados = Vec::with_capacity(info.grupos.len());
+    for (grupo, categoria) in info.grupos.iter().zip(categorias.iter().cloned()) {
+        let encontrados = match &categoria {
+            Some(categoria) if grupo.cantidad > 0 => escritura.buscar_asientos_consecutivos(
+                &zonas,
+                categoria,
+                grupo.cantidad,
+                grupo.zona.as_deref(),
+            ),
+            _ => None,
+        };
+        match (categoria, encontrados) {
+            (Some(categoria), Some(encontrados)) => {
+                escritura.marcar_asientos(
+                    &encontrados.zona,
+                    &categoria,
+                    &encontrados.asientos,
+                    SeatState::ReservadoTemporalmente,
+                    &mut cambios,
+                );
+                resultados.push(ResultadoGrupo { ok: true, asientos: Some(encontrados), error: None });
+            }
+            (None, _) => resultados.push(ResultadoGrupo {
+                ok: false,
+                asientos: None,
+                error: Some("Categoría inválida.".to_string()),
+            }),
+            (Some(_), None) => resultados.push(ResultadoGrupo {
+                ok: false,
+                asientos: None,
+                error: Some("No hay asientos consecutivos disponibles.".to_string()),
+            }),
+        }
+    }
+
+    let fallidos = resultados.iter().filter(|resultado| !resultado.ok).count();
+    if cambios.is_empty() || (fallidos > 0 && !info.parcial) {
+        // Deshacer sin publicar: con los bloques tomados nadie vio estos cambios
+        let mut descartados = Vec::new();
+        for cambio in &cambios {
+            escritura.marcar_asientos(
+                &cambio.zona,
+                &cambio.categoria,
+                &[(cambio.fila, cambio.asiento)],
+                SeatState::Libre,
+                &mut descartados,
+            );
+        }
+        drop(escritura);
+        for resultado in resultados.iter_mut().filter(|resultado| resultado.ok) {
+            resultado.ok = false;
+            resultado.asientos = None;
+            resultado.error = Some("No se reservó: otro grupo del lote no tiene lugar.".to_string());
+        }
+        return HttpResponse::Ok().json(serde_json::json!({ "reserva_id": null, "grupos": resultados }));
+    }
+
+    let reserva_id = Uuid::new_v4().to_string();
+    let reserva = ReservaTemporal {
+        asientos: cambios
+            .iter()
+            .map(|cambio| (cambio.zona.clone(), cambio.categoria.clone(), cambio.fila, cambio.asiento))
+            .collect(),
+        tiempo_expiracion: Instant::now() + DURACION_RESERVA,
+    };
+    let expira_en_s = expira_en_s(&reserva);
+
+    // Una sola difusión con los asientos de todos los grupos
+    escritura.publicar(cambios, &ws_server);
+    reservas.lock().unwrap().insert(reserva_id.clone(), reserva);
+
+    HttpResponse::Ok().json(serde_json::json!({
+        "reserva_id": reserva_id,
+        "expira_en_s": expira_en_s,
+        "grupos": resultados,
+    }))
 }
 
 #[post("/confirmar_compra")]
@@ -431,30 +1032,11 @@ async fn confirmar_compra(
 ) -> impl Responder {
     info!("Solicitud para confirmar compra: {:?}", info);
 
-    let mut estadio = data.lock().unwrap();
-    let mut reservas_temporales = reservas.lock().unwrap();
-
-    if let Some(reserva) = reservas_temporales.remove(&info.reserva_id) {
-        for (zona_nombre, categoria, fila, asiento) in reserva.asientos {
-            for zona in &mut estadio.zonas {
-                if zona.nombre == zona_nombre {
-                    if let Some(asientos_categoria) = zona.categorias.get_mut(&categoria) {
-                        let seat = &mut asientos_categoria[fila][asiento];
-                        if seat.estado == SeatState::ReservadoTemporalmente {
-                            seat.estado = SeatState::Comprado;
-                            info!(
-                                "Asiento comprado: Zona {}, Categoría {:?}, Fila {}, Asiento {}",
-                                zona_nombre, categoria, fila, asiento
-                            );
-                        }
-                    }
-                }
-            }
-        }
-
-        // Enviar actualización a los clientes
-        let estadio_json = serde_json::to_string(&*estadio).unwrap();
-        ws_server.do_send(BroadcastMessage(estadio_json));
+    let reserva = reservas.lock().unwrap().remove(&info.reserva_id);
+    if let Some(reserva) = reserva {
+        // Enviar a los clientes solo los asientos que cambiaron
+        let comprados = data.terminar_reservas(&[reserva], SeatState::Comprado, &ws_server);
+        info!("Compra confirmada: {} asientos", comprados);
 
         // Devolver true en caso de éxito
         return HttpResponse::Ok().body("true");
@@ -482,14 +1064,47 @@ async fn procesar_pago(info: web::Json<ProcesarPagoRequest>) -> impl Responder {
 
 // Definiciones para WebSocket
 
+#[derive(Message, Clone)]
+#[rtype(result = "()")]
+struct BroadcastMessage {
+    desde: u64,
+    version: u64,
+    cambios: Arc<Vec<CambioAsiento>>, // Para filtrar por suscripción
+    // Compartidos entre sesiones sin copiarse; None si ninguna sesión
+    // conectada usa ese formato
+    texto: Option<ByteString>,
+    binario: Option<web::Bytes>,
+}
+
+impl BroadcastMessage {
+    fn delta(desde: u64, version: u64, cambios: Arc<Vec<CambioAsiento>>, texto: bool, binario: bool) -> Self {
+        BroadcastMessage {
+            desde,
+            version,
+            texto: texto.then(|| {
+                ByteString::from(serde_json::to_string(&Delta { desde, version, cambios: &cambios }).unwrap())
+            }),
+            binario: binario.then(|| web::Bytes::from(codificar_delta_binario(desde, version, &cambios))),
+            cambios,
+        }
+    }
+}
+
+/// Cambios recién numerados. WsServer los codifica una sola vez por formato
+/// en uso, fuera de los bloqueos del estadio, y los reparte a las sesiones.
 #[derive(Message)]
 #[rtype(result = "()")]
-struct BroadcastMessage(String);
+struct CambiosPublicados {
+    desde: u64,
+    version: u64,
+    cambios: Arc<Vec<CambioAsiento>>,
+}
 
 #[derive(Message)]
 #[rtype(result = "usize")]
 struct Connect {
     addr: Recipient<BroadcastMessage>,
+    binario: bool,
 }
 
 #[derive(Message)]
@@ -502,6 +1117,107 @@ struct WsSession {
     id: usize,
     hb: Instant,
     addr: Addr<WsServer>,
+    binario: bool, // Recibe los mensajes en formato binario en lugar de JSON
+    desde: Option<u64>, // Versión que ya tiene el cliente al reconectarse
+    estadio: SharedEstadio,
+    version_cliente: u64, // Versión del último mensaje enviado al cliente
+    suscripcion: Option<Suscripcion>, // None = todos los bloques
+}
+
+impl WsSession {
+    /// Envía el estado completo con su versión; los deltas siguientes parten de ella
+    fn enviar_snapshot(&mut self, ctx: &mut ws::WebsocketContext<Self>) {
+        let estadio = self.estadio.clone();
+        self.escribir_snapshot(&estadio.vista(None), ctx);
+    }
+
+    fn escribir_snapshot(&mut self, vista: &Vista, ctx: &mut ws::WebsocketContext<Self>) {
+        if self.binario {
+            ctx.binary(vista.codificar_binario(TIPO_SNAPSHOT));
+        } else {
+            ctx.text(vista.codificar_json(false));
+        }
+        self.version_cliente = vista.version;
+    }
+
+    fn escribir_delta(&mut self, version: u64, cambios: &[CambioAsiento], ctx: &mut ws::WebsocketContext<Self>) {
+        let desde = self.version_cliente;
+        if self.binario {
+            ctx.binary(codificar_delta_binario(desde, version, cambios));
+        } else {
+            ctx.text(serde_json::to_string(&Delta { desde, version, cambios }).unwrap());
+        }
+        self.version_cliente = version;
+    }
+
+    /// Al conectarse: si el cliente indicó su versión y el historial la cubre,
+    /// solo los deltas que le faltan; si no, el snapshot completo
+    fn enviar_inicial(&mut self, ctx: &mut ws::WebsocketContext<Self>) {
+        let estadio = self.estadio.clone();
+        match self.desde.and_then(|desde| estadio.deltas_desde(desde).map(|deltas| (desde, deltas))) {
+            Some((desde, deltas)) => {
+                self.version_cliente = desde;
+                for (version, cambios) in deltas {
+                    self.escribir_delta(version, &cambios, ctx);
+                }
+            }
+            None => self.escribir_snapshot(&estadio.vista(None), ctx),
+        }
+    }
+
+    fn suscrito(&self, cambio: &CambioAsiento) -> bool {
+        match &self.suscripcion {
+            Some(bloques) => bloques
+                .get(&cambio.zona)
+                .map_or(false, |categorias| categorias.contains(&cambio.categoria)),
+            None => true,
+        }
+    }
+
+    /// Cambia los bloques que recibe el cliente. Los que recién entran llegan
+    /// con un snapshot parcial, porque el cliente no recibió sus cambios.
+    fn suscribir(&mut self, bloques: Option<Vec<(String, CategoriaZona)>>, ctx: &mut ws::WebsocketContext<Self>) {
+        let nueva = bloques.map(|lista| {
+            let mut suscripcion = Suscripcion::new();
+            for (zona, categoria) in lista {
+                suscripcion.entry(zona).or_default().insert(categoria);
+            }
+            suscripcion
+        });
+        let anterior = std::mem::replace(&mut self.suscripcion, nueva);
+        let anterior = match anterior {
+            Some(anterior) => anterior,
+            None => return, // Ya recibía todos los bloques
+        };
+        let nuevos = match &self.suscripcion {
+            Some(actual) => {
+                let mut nuevos = Suscripcion::new();
+                for (zona, categorias) in actual {
+                    let previas = anterior.get(zona);
+                    let agregadas: HashSet<CategoriaZona> = categorias.iter()
+                        .filter(|categoria| previas.map_or(true, |previas| !previas.contains(*categoria)))
+                        .cloned()
+                        .collect();
+                    if !agregadas.is_empty() {
+                        nuevos.insert(zona.clone(), agregadas);
+                    }
+                }
+                nuevos
+            }
+            None => return self.enviar_snapshot(ctx), // Vuelve a recibir todo
+        };
+        if nuevos.is_empty() {
+            return;
+        }
+        // La versión del cliente no avanza: los deltas pendientes de sus otros
+        // bloques siguen llegando en orden
+        let vista = self.estadio.vista(Some(&nuevos));
+        if self.binario {
+            ctx.binary(vista.codificar_binario(TIPO_PARCIAL));
+        } else {
+            ctx.text(vista.codificar_json(true));
+        }
+    }
 }
 
 impl Actor for WsSession {
@@ -514,12 +1230,15 @@ impl Actor for WsSession {
         self.addr
             .send(Connect {
                 addr: addr.recipient(),
+                binario: self.binario,
             })
             .into_actor(self)
             .then(|res, act, ctx| {
                 match res {
                     Ok(id) => {
                         act.id = id;
+                        // Ya registrada: todo cambio posterior llega como delta
+                        act.enviar_inicial(ctx);
                     }
                     _ => {
                         ctx.stop();
@@ -540,7 +1259,28 @@ impl Handler<BroadcastMessage> for WsSession {
     type Result = ();
 
     fn handle(&mut self, msg: BroadcastMessage, ctx: &mut Self::Context) {
-        ctx.text(msg.0);
+        if msg.version <= self.version_cliente {
+            return; // Ya incluido en el snapshot o los deltas enviados al conectarse
+        }
+        if self.suscripcion.is_none() && msg.desde == self.version_cliente {
+            // Caso común: el mensaje ya codificado sirve tal cual
+            match (self.binario, msg.binario, msg.texto) {
+                (true, Some(binario), _) => ctx.binary(binario),
+                (false, _, Some(texto)) => ctx.text(texto),
+                _ => return self.escribir_delta(msg.version, &msg.cambios, ctx),
+            }
+            self.version_cliente = msg.version;
+            return;
+        }
+        let cambios: Vec<CambioAsiento> = msg.cambios.iter()
+            .filter(|cambio| self.suscrito(cambio))
+            .cloned()
+            .collect();
+        // Sin cambios visibles no se envía nada y el próximo delta parte de la
+        // misma versión del cliente
+        if !cambios.is_empty() {
+            self.escribir_delta(msg.version, &cambios, ctx);
+        }
     }
 }
 
@@ -554,8 +1294,14 @@ impl StreamHandler<Result<ws::Message, ws::ProtocolError>> for WsSession {
             Ok(ws::Message::Pong(_)) => {
                 self.hb = Instant::now();
             }
-            Ok(ws::Message::Text(_text)) => {
-                // Aquí puedes manejar mensajes entrantes del cliente si es necesario
+            Ok(ws::Message::Text(text)) => {
+                // "resync": el cliente detectó una versión faltante y pide un
+                // snapshot; "suscribir": los bloques visibles o fijados
+                match serde_json::from_str::<PedidoCliente>(&text) {
+                    Ok(pedido) if pedido.tipo == "resync" => self.enviar_snapshot(ctx),
+                    Ok(pedido) if pedido.tipo == "suscribir" => self.suscribir(pedido.bloques, ctx),
+                    _ => (),
+                }
             }
             Ok(ws::Message::Close(_)) => {
                 ctx.stop();
@@ -566,7 +1312,7 @@ impl StreamHandler<Result<ws::Message, ws::ProtocolError>> for WsSession {
 }
 
 struct WsServer {
-    sessions: HashMap<usize, Recipient<BroadcastMessage>>,
+    sessions: HashMap<usize, (Recipient<BroadcastMessage>, bool)>, // (destino, binario)
     next_id: usize,
 }
 
@@ -589,7 +1335,7 @@ impl Handler<Connect> for WsServer {
     fn handle(&mut self, msg: Connect, _: &mut Context<Self>) -> usize {
         let id = self.next_id;
         self.next_id += 1;
-        self.sessions.insert(id, msg.addr);
+        self.sessions.insert(id, (msg.addr, msg.binario));
         id
     }
 }
@@ -602,12 +1348,16 @@ impl Handler<Disconnect> for WsServer {
     }
 }
 
-impl Handler<BroadcastMessage> for WsServer {
+impl Handler<CambiosPublicados> for WsServer {
     type Result = ();
 
-    fn handle(&mut self, msg: BroadcastMessage, _: &mut Context<Self>) {
-        for addr in self.sessions.values() {
-            let _ = addr.do_send(BroadcastMessage(msg.0.clone()));
+    fn handle(&mut self, msg: CambiosPublicados, _: &mut Context<Self>) {
+        // Solo se codifican los formatos que negoció alguna sesión
+        let texto = self.sessions.values().any(|(_, binario)| !binario);
+        let binario = self.sessions.values().any(|(_, binario)| *binario);
+        let mensaje = BroadcastMessage::delta(msg.desde, msg.version, msg.cambios, texto, binario);
+        for (addr, _) in self.sessions.values() {
+            let _ = addr.do_send(mensaje.clone());
         }
     }
 }
@@ -618,11 +1368,18 @@ async fn ws_index(
     req: HttpRequest,
     stream: web::Payload,
     srv: web::Data<Addr<WsServer>>,
+    data: web::Data<SharedEstadio>,
+    query: web::Query<HashMap<String, String>>,
 ) -> Result<HttpResponse, Error> {
     let ws_session = WsSession {
         id: 0,
         hb: Instant::now(),
         addr: srv.get_ref().clone(),
+        binario: query.get("formato").map(|formato| formato == "binario").unwrap_or(false),
+        desde: query.get("desde").and_then(|desde| desde.parse().ok()),
+        estadio: data.get_ref().clone(),
+        version_cliente: 0,
+        suscripcion: None,
     };
 
     ws::start(ws_session, &req, stream)
@@ -632,10 +1389,11 @@ async fn ws_index(
 async fn main() -> std::io::Result<()> {
     env_logger::init();
 
-    let estadio = Arc::new(Mutex::new(Estadio::new()));
-    let reservas_temporales = Arc::new(Mutex::new(HashMap::<String, ReservaTemporal>::new()));
+    let estadio = Arc::new(Estadio::new());
+    let reservas_temporales = Arc::new(Mutex::new(ReservasTemporales::default()));
 
     let ws_server = WsServer::new().start();
+    iniciar_expiraciones(estadio.clone(), reservas_temporales.clone(), ws_server.clone());
 
     HttpServer::new(move || {
         let cors = Cors::default()
@@ -653,6 +1411,7 @@ async fn main() -> std::io::Result<()> {
             .service(get_stadium_structure)
             .service(buscar_asientos)
             .service(reservar_asientos_temporalmente)
+            .service(reservar_grupos)
             .service(confirmar_compra)
             .service(procesar_pago)
             .service(cancelar_reserva) // Agrega este servicio
@@ -0,0 +1,128 @@
+"""Plugins de pago. Se importan recién al confirmar la primera compra para
+no cargarlos durante el arranque de la interfaz."""
+
+from PyQt5.QtWidgets import (
+    QDialog,
+    QFormLayout,
+    QHBoxLayout,
+    QLineEdit,
+    QPushButton,
+)
+
+
+## Plugin de pago
+class MetodoPago:
+    def __init__(self, api):
+        self.api = api  # StadiumAPI; se inyecta para no importar interface
+        self.detalles = {}
+
+    def iniciar_pago(self):
+        raise NotImplementedError
+
+    def validar_informacion(self):
+        raise NotImplementedError
+
+    def procesar_pago(self):
+        raise NotImplementedError
+
+
+class PagoTarjeta(MetodoPago):
+    def iniciar_pago(self):
+        dialog = QDialog()
+        dialog.setWindowTitle("Pago con Tarjeta")
+        layout = QFormLayout(dialog)
+        self.numero_tarjeta = QLineEdit()
+        self.cvv = QLineEdit()
+        self.fecha_expiracion = QLineEdit()
+        layout.addRow("Número de Tarjeta:", self.numero_tarjeta)
+        layout.addRow("CVV:", self.cvv)
+        layout.addRow("Fecha de Expiración:", self.fecha_expiracion)
+        botones = QHBoxLayout()
+        boton_aceptar = QPushButton("Aceptar")
+        boton_aceptar.clicked.connect(dialog.accept)
+        boton_cancelar = QPushButton("Cancelar")
+        boton_cancelar.clicked.connect(dialog.reject)
+        botones.addWidget(boton_aceptar)
+        botones.addWidget(boton_cancelar)
+        layout.addRow(botones)
+        if dialog.exec_() == QDialog.Accepted:
+            self.detalles = {
+                "numero_tarjeta": self.numero_tarjeta.text(),
+                "cvv": self.cvv.text(),
+                "fecha_expiracion": self.fecha_expiracion.text()
+            }
+            return True
+        return False
+
+    def validar_informacion(self):
+        # Verificar que todos los campos tengan información
+        return all(self.detalles.values())
+
+    def procesar_pago(self):
+        # Llamar al servidor para procesar el pago
+        return self.api.procesar_pago("Tarjeta", self.detalles)
+
+
+class PagoPayPal(MetodoPago):
+    def iniciar_pago(self):
+        dialog = QDialog()
+        dialog.setWindowTitle("Pago con PayPal")
+        layout = QFormLayout(dialog)
+        self.email = QLineEdit()
+        self.password = QLineEdit()
+        layout.addRow("Email:", self.email)
+        layout.addRow("Contraseña:", self.password)
+        botones = QHBoxLayout()
+        boton_aceptar = QPushButton("Aceptar")
+        boton_aceptar.clicked.connect(dialog.accept)
+        boton_cancelar = QPushButton("Cancelar")
+        boton_cancelar.clicked.connect(dialog.reject)
+        botones.addWidget(boton_aceptar)
+        botones.addWidget(boton_cancelar)
+        layout.addRow(botones)
+        if dialog.exec_() == QDialog.Accepted:
+            self.detalles = {
+                "email": self.email.text(),
+                "password": self.password.text(),
+            }
+            return True
+        return False
+
+    def validar_informacion(self):
+        # Verificar que todos los campos tengan información
+        return all(self.detalles.values())
+
+    def procesar_pago(self):
+        # Llamar al servidor para procesar el pago
+        return self.api.procesar_pago("PayPal", self.detalles)
+
+
+class PagoCripto(MetodoPago):
+    def iniciar_pago(self):
+        dialog = QDialog()
+        dialog.setWindowTitle("Pago con Criptomoneda")
+        layout = QFormLayout(dialog)
+        self.wallet_address = QLineEdit()
+        layout.addRow("Dirección de Wallet:", self.wallet_address)
+        botones = QHBoxLayout()
+        boton_aceptar = QPushButton("Aceptar")
+        boton_aceptar.clicked.connect(dialog.accept)
+        boton_cancelar = QPushButton("Cancelar")
+        boton_cancelar.clicked.connect(dialog.reject)
+        botones.addWidget(boton_aceptar)
+        botones.addWidget(boton_cancelar)
+        layout.addRow(botones)
+        if dialog.exec_() == QDialog.Accepted:
+            self.detalles = {
+                "wallet_address": self.wallet_address.text(),
+            }
+            return True
+        return False
+
+    def validar_informacion(self):
+        # Verificar que todos los campos tengan información
+        return all(self.detalles.values())
+
+    def procesar_pago(self):
+        # Llamar al servidor para procesar el pago
+        return self.api.procesar_pago("Criptomoneda", self.detalles)
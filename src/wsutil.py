@@ -0,0 +1,130 @@
+"""Utilidades mínimas de WebSocket (RFC 6455) sobre sockets de la biblioteca
+estándar, para las herramientas de prueba que corren sin Qt."""
+
+import base64
+import hashlib
+import os
+import socket
+import struct
+from urllib.parse import urlsplit
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+def accept_key(key):
+    """Valor de Sec-WebSocket-Accept para la clave enviada por el cliente"""
+    digest = hashlib.sha1((key + GUID).encode()).digest()
+    return base64.b64encode(digest).decode()
+
+
+def read_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Conexión WebSocket cerrada")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def read_frame(sock):
+    """Lee un frame y devuelve (fin, opcode, payload)"""
+    first, second = read_exact(sock, 2)
+    fin = bool(first & 0x80)
+    opcode = first & 0x0F
+    masked = bool(second & 0x80)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", read_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", read_exact(sock, 8))[0]
+    mask = read_exact(sock, 4) if masked else None
+    payload = read_exact(sock, length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return fin, opcode, payload
+
+
+def read_message(sock):
+    """Lee un mensaje completo respondiendo pings; devuelve (opcode, payload)"""
+    opcode = None
+    parts = []
+    while True:
+        fin, frame_opcode, payload = read_frame(sock)
+        if frame_opcode == OP_PING:
+            write_frame(sock, OP_PONG, payload, mask=True)
+            continue
+        if frame_opcode == OP_PONG:
+            continue
+        if frame_opcode == OP_CLOSE:
+            raise ConnectionError("El servidor cerró la conexión WebSocket")
+        if frame_opcode != OP_CONTINUATION:
+            opcode = frame_opcode
+        parts.append(payload)
+        if fin:
+            return opcode, b"".join(parts)
+
+
+def write_frame(sock, opcode, payload, mask=False):
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header.extend(struct.pack("!H", length))
+    else:
+        header.append(mask_bit | 127)
+        header.extend(struct.pack("!Q", length))
+    if mask:
+        key = os.urandom(4)
+        header.extend(key)
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    sock.sendall(bytes(header) + payload)
+
+
+def connect(url, timeout=10):
+    """Abre una conexión WebSocket de cliente (solo ws://) y devuelve el socket"""
+    parts = urlsplit(url)
+    if parts.scheme != "ws":
+        raise ValueError(f"Esquema no soportado: {parts.scheme}")
+    port = parts.port or 80
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    sock = socket.create_connection((parts.hostname, port), timeout=timeout)
+    key = base64.b64encode(os.urandom(16)).decode()
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {parts.hostname}:{port}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\n"
+        "Sec-WebSocket-Version: 13\r\n"
+        "\r\n"
+    )
+    sock.sendall(request.encode())
+    response = bytearray()
+    while b"\r\n\r\n" not in response:
+        response.extend(read_exact(sock, 1))
+    status_line, *header_lines = response.decode("latin-1").split("\r\n")
+    if " 101 " not in status_line + " ":
+        sock.close()
+        raise ConnectionError(f"Handshake WebSocket rechazado: {status_line}")
+    headers = {}
+    for line in header_lines:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    if headers.get("sec-websocket-accept") != accept_key(key):
+        sock.close()
+        raise ConnectionError("Sec-WebSocket-Accept inválido")
+    return sock